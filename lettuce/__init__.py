@@ -20,18 +20,11 @@ __version__ = version = '0.2.18'
 release = 'kryptonite'
 
 import os
+import re
 import sys
 import traceback
-try:
-    from imp import reload
-except ImportError:
-    # python 2.5 fallback
-    pass
-
 import random
 
-from lettuce.core import Feature, TotalResult
-
 from lettuce.terrain import after
 from lettuce.terrain import before
 from lettuce.terrain import world
@@ -41,19 +34,11 @@ from lettuce.registry import call_hook
 from lettuce.registry import STEP_REGISTRY
 from lettuce.registry import CALLBACK_REGISTRY
 from lettuce.exceptions import StepLoadingError
-from lettuce.plugins import (
-    xunit_output,
-    autopdb
-)
 from lettuce import fs
+from lettuce import budget
+from lettuce.index import SuiteIndex
 from lettuce import exceptions
 
-try:
-    from colorama import init as ms_windows_workaround
-    ms_windows_workaround()
-except ImportError:
-    pass
-
 
 __all__ = [
     'after',
@@ -63,20 +48,34 @@ __all__ = [
     'STEP_REGISTRY',
     'CALLBACK_REGISTRY',
     'call_hook',
+    'load_terrain',
 ]
 
-try:
-    terrain = fs.FileSystem._import("terrain")
-    reload(terrain)
-except Exception, e:
-    if not "No module named terrain" in str(e):
-        string = 'Lettuce has tried to load the conventional environment ' \
-            'module "terrain"\nbut it has errors, check its contents and ' \
-            'try to run lettuce again.\n\nOriginal traceback below:\n\n'
+_terrain = None
+
+
+def load_terrain():
+    """ Imports the conventional environment module "terrain" from the
+    current directory, once per process. Called by lettuce.Runner, so
+    that merely importing lettuce has no side effects
+    """
+    global _terrain
+    if _terrain is not None:
+        return _terrain
+
+    try:
+        _terrain = fs.FileSystem._import("terrain")
+    except Exception, e:
+        if not "No module named terrain" in str(e):
+            string = 'Lettuce has tried to load the conventional environment ' \
+                'module "terrain"\nbut it has errors, check its contents and ' \
+                'try to run lettuce again.\n\nOriginal traceback below:\n\n'
+
+            sys.stderr.write(string)
+            sys.stderr.write(exceptions.traceback.format_exc(e))
+            raise SystemExit(1)
 
-        sys.stderr.write(string)
-        sys.stderr.write(exceptions.traceback.format_exc(e))
-        raise SystemExit(1)
+    return _terrain
 
 
 class Runner(object):
@@ -86,25 +85,50 @@ class Runner(object):
     features and step definitions on there.
     """
     def __init__(self, base_path, scenarios=None, verbosity=0, random=False,
-                 enable_xunit=False, xunit_filename=None, tags=None,
-                 failfast=False, auto_pdb=False):
+                 enable_xunit=False, xunit_filename=None,
+                 xunit_per_scenario=False, xunit_ids=False,
+                 jsonl_output=None,
+                 cucumber_json=None, tags=None,
+                 failfast=False, auto_pdb=False, time_budget=None,
+                 history_file=None, outline_sample=None,
+                 outline_pairwise=False, outline_seed=0, index_file=None,
+                 ignored_dirs=None, discovery_manifest=None,
+                 profile_steps=False, profile_top=20, profile_file=None,
+                 cprofile=None, cprofile_dir=None, cprofile_threshold=None,
+                 sampling_profile=None, sampling_interval=None,
+                 trace_file=None, resource_usage=False, history_db=None,
+                 save_baseline=None, compare_baseline=None,
+                 max_regression=0.2, dry_run=False, preflight=False):
         """ lettuce.Runner will try to find a terrain.py file and
         import it from within `base_path`
         """
+        load_terrain()
 
         self.tags = tags
         self.single_feature = None
+        self.line = None
+
+        found = re.match(r'^(.+[.]feature):(\d+)$', base_path)
+        if found and os.path.isfile(found.group(1)):
+            base_path, self.line = found.group(1), int(found.group(2))
 
         if os.path.isfile(base_path) and os.path.exists(base_path):
             self.single_feature = base_path
             base_path = os.path.dirname(base_path)
 
         sys.path.insert(0, base_path)
-        self.loader = fs.FeatureLoader(base_path)
+        self.loader = fs.FeatureLoader(base_path,
+                                       ignored_dirs=ignored_dirs,
+                                       manifest_file=discovery_manifest)
         self.verbosity = verbosity
         self.scenarios = scenarios and map(int, scenarios.split(",")) or None
         self.failfast = failfast
+        self.outline_sample = outline_sample
+        self.outline_pairwise = outline_pairwise
+        self.outline_seed = outline_seed
+        self.index = index_file and SuiteIndex.load(index_file) or None
         if auto_pdb:
+            from lettuce.plugins import autopdb
             autopdb.enable(self)
 
         sys.path.remove(base_path)
@@ -121,24 +145,138 @@ class Runner(object):
             from lettuce.plugins import colored_shell_output as output
 
         self.random = random
+        self.dry_run = dry_run
+        self.preflight = preflight
+
+        from lettuce import resources
+        resources.enable(resource_usage)
 
         if enable_xunit:
-            xunit_output.enable(filename=xunit_filename)
+            from lettuce.plugins import xunit_output
+            xunit_output.enable(filename=xunit_filename,
+                                per_scenario=xunit_per_scenario,
+                                with_ids=xunit_ids)
+
+        if jsonl_output:
+            from lettuce.plugins import jsonl_output as jsonl
+            jsonl.enable(jsonl_output)
+
+        if cucumber_json:
+            from lettuce.plugins import cucumber_json_output
+            cucumber_json_output.enable(cucumber_json)
 
-        reload(output)
+        if trace_file:
+            from lettuce.plugins import trace_output
+            trace_output.enable(trace_file)
+
+        output.enable()
 
         self.output = output
 
+        self.budget = None
+        database = None
+        if history_db:
+            from lettuce import history as history_store
+            database = history_store.HistoryDatabase(history_db)
+            history_store.enable(database)
+
+        if time_budget is not None or history_file:
+            if database and not history_file:
+                history = database.budget_history()
+            else:
+                history = budget.History.load(history_file)
+            if time_budget is not None:
+                self.budget = budget.TimeBudget(time_budget, history)
+
+            budget.enable(history, self.budget)
+
+        if profile_steps:
+            from lettuce.plugins import step_profile
+            step_profile.enable(top=profile_top, filename=profile_file)
+
+        if cprofile:
+            from lettuce.plugins import cprofile as cprofile_output
+            cprofile_output.enable(cprofile, directory=cprofile_dir,
+                                   threshold=cprofile_threshold)
+
+        if sampling_profile:
+            from lettuce.plugins import sampler
+            sampler.enable(sampling_profile, interval=sampling_interval)
+
+        if save_baseline or compare_baseline:
+            from lettuce import baseline
+            baseline.enable(save=save_baseline, compare=compare_baseline,
+                            max_regression=max_regression)
+
+    def load_features(self, features_files):
+        """ Parses each feature file, yielding it along with the numbers
+        of the scenarios to run within it. With a suite index, the
+        feature files that have nothing to run are not even parsed
+        """
+        from lettuce import core
+
+        for filename in features_files:
+            entry = self.index and self.index.lookup(filename)
+            if entry:
+                scenarios = self.scenarios_at(self.index.scenario_at, entry)
+                if not self.index.may_run(entry, scenarios, self.tags):
+                    continue
+
+            feature = core.Feature.from_file(filename)
+            if not entry:
+                scenarios = self.scenarios_at(core.Feature.scenario_at,
+                                              feature)
+
+            if self.index and not entry:
+                entry = self.index.add(filename, feature)
+                if not self.index.may_run(entry, scenarios, self.tags):
+                    continue
+
+            yield feature, scenarios
+
+    def scenarios_at(self, scenario_at, where):
+        """The numbers of the scenarios to run: the one spanning over the
+        line given along with the feature file, if any"""
+        if self.line is not None:
+            number = scenario_at(where, self.line)
+            if number:
+                return [number]
+
+        return self.scenarios
+
+    def features_to_run(self, features_files):
+        """ Yields each feature to be ran along with the scenarios to
+        run within it, which are chosen by the time budget when there
+        is one
+        """
+        features = self.load_features(features_files)
+        if not self.budget:
+            for feature, scenarios in features:
+                yield feature, scenarios
+
+            return
+
+        for feature, scenarios in self.budget.plan(list(features),
+                                                   self.tags):
+            yield feature, scenarios
+
     def run(self):
         """ Find and load step definitions, and them find and load
         features under `base_path` specified on constructor
         """
+        from lettuce import core
+        from lettuce import terminal
+        from lettuce.benchmark import load_steps
+
         try:
             self.loader.find_and_load_step_definitions()
         except StepLoadingError, e:
             print "Error loading step definitions:\n", e
             return
 
+        # the steps of lettuce itself, which check @benchmark scenarios
+        load_steps()
+
         results = []
         if self.single_feature:
             features_files = [self.single_feature]
@@ -151,22 +289,46 @@ class Runner(object):
             self.output.print_no_features_found(self.loader.base_dir)
             return
 
+        features = self.features_to_run(features_files)
+        if self.dry_run or self.preflight:
+            from lettuce.preflight import Preflight
+            try:
+                features = list(features)
+                check = Preflight.check(features, self.tags)
+            except exceptions.LettuceSyntaxError, e:
+                sys.stderr.write(e.msg)
+                raise SystemExit(2)
+
+            if self.dry_run or not check.passed:
+                terminal.sink.write(check.report())
+                terminal.sink.flush()
+
+            if not check.passed:
+                return
+
+            if self.dry_run:
+                return core.TotalResult([])
+
         call_hook('before', 'all')
 
         failed = False
         try:
-            for filename in features_files:
-                feature = Feature.from_file(filename)
+            for feature, scenarios in features:
                 results.append(
-                    feature.run(self.scenarios,
+                    feature.run(scenarios,
                                 tags=self.tags,
-                                random=self.random,
-                                failfast=self.failfast))
+                                random=self.random and not self.budget,
+                                failfast=self.failfast,
+                                outline_sample=self.outline_sample,
+                                outline_pairwise=self.outline_pairwise,
+                                outline_seed=self.outline_seed))
 
         except exceptions.LettuceSyntaxError, e:
             sys.stderr.write(e.msg)
             failed = True
         except:
+            # whatever the output plugin buffered goes out first
+            terminal.sink.flush()
             if not self.failfast:
                 e = sys.exc_info()[1]
                 print "Died with %s" % str(e)
@@ -179,8 +341,12 @@ class Runner(object):
             failed = True
 
         finally:
-            total = TotalResult(results)
+            if self.index:
+                self.index.save()
+
+            total = core.TotalResult(results)
             call_hook('after', 'all', total)
+            terminal.sink.flush()
 
             if failed:
                 raise SystemExit(2)
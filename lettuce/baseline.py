@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Compares the timings of a run with a baseline saved from a reference
+run, failing the run when scenarios or step definitions got
+significantly slower.
+
+A baseline keeps every duration measured for each scenario and each
+step definition. Saving a baseline over an existing one adds the new
+durations to it, so that running the reference a few times gives
+distributions to compare against. A slowdown is a regression when it
+is beyond the allowed percentage and Welch's t-test tells it apart
+from noise."""
+import os
+import json
+import math
+import time
+
+from lettuce import terminal
+from lettuce.history import mean, deviation
+from lettuce.benchmark import format_seconds
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+# durations kept for each scenario or step definition of a baseline
+MAX_SAMPLES = 200
+
+# the probability of a slowdown being noise, under which it is
+# deemed significant
+SIGNIFICANCE = 0.05
+
+# slowdowns smaller than this many seconds are never regressions, as
+# the relative change of very fast steps is mostly noise
+MINIMUM_SLOWDOWN = 0.001
+
+KINDS = ('scenario', 'step')
+
+
+LANCZOS = (0.99999999999980993, 676.5203681218851, -1259.1392167224028,
+           771.32342877765313, -176.61502916214059, 12.507343278686905,
+           -0.13857109526572012, 9.9843695780195716e-6,
+           1.5056327351493116e-7)
+
+
+def lanczos_lgamma(x):
+    """The logarithm of the gamma function, with the approximation of
+    Lanczos, for python 2.6 which has no math.lgamma"""
+    if x < 0.5:
+        return math.log(math.pi / abs(math.sin(math.pi * x))) - \
+            lanczos_lgamma(1.0 - x)
+
+    x -= 1.0
+    total = LANCZOS[0]
+    for i, coefficient in enumerate(LANCZOS[1:]):
+        total += coefficient / (x + i + 1)
+
+    t = x + len(LANCZOS) - 1.5
+    return 0.5 * math.log(2 * math.pi) + (x + 0.5) * math.log(t) - t + \
+        math.log(total)
+
+
+lgamma = getattr(math, 'lgamma', lanczos_lgamma)
+
+
+def incomplete_beta(x, a, b):
+    """The regularized incomplete beta function I_x(a, b), worked out
+    with its continued fraction"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+
+    if x > (a + 1.0) / (a + b + 2.0):
+        return 1.0 - incomplete_beta(1.0 - x, b, a)
+
+    front = math.exp(lgamma(a + b) - lgamma(a) - lgamma(b) +
+                     a * math.log(x) + b * math.log(1.0 - x)) / a
+
+    tiny = 1e-30
+    f, c, d = 1.0, 1.0, 0.0
+    for i in range(400):
+        m = i // 2
+        if i == 0:
+            numerator = 1.0
+        elif i % 2 == 0:
+            numerator = (m * (b - m) * x) / ((a + 2.0 * m - 1) * (a + 2.0 * m))
+        else:
+            numerator = -((a + m) * (a + b + m) * x) / \
+                ((a + 2.0 * m) * (a + 2.0 * m + 1))
+
+        d = 1.0 + numerator * d
+        if abs(d) < tiny:
+            d = tiny
+        d = 1.0 / d
+        c = 1.0 + numerator / c
+        if abs(c) < tiny:
+            c = tiny
+        f *= c * d
+        if abs(1.0 - c * d) < 1e-12:
+            break
+
+    return front * (f - 1.0)
+
+
+def welch(before, after):
+    """Welch's t-test of `after` being slower than `before`, returning
+    the one-sided p-value, or None when there are too few samples.
+
+    A single duration on one side is taken as exact, which turns the
+    test into a one-sample t-test against the other side."""
+    if len(before) < 2 and len(after) < 2:
+        return None
+
+    terms = [deviation(values) ** 2 / len(values)
+             for values in (before, after)]
+    difference = mean(after) - mean(before)
+    spread = sum(terms)
+    if not spread:
+        if difference > 0:
+            return 0.0
+        return 1.0
+
+    t = difference / math.sqrt(spread)
+    freedom = spread ** 2 / sum([term ** 2 / (len(values) - 1)
+                                 for term, values in zip(terms,
+                                                         (before, after))
+                                 if len(values) > 1])
+
+    tail = 0.5 * incomplete_beta(freedom / (freedom + t * t),
+                                 freedom / 2.0, 0.5)
+    if t > 0:
+        return tail
+    return 1.0 - tail
+
+
+class Baseline(object):
+    """The durations of each scenario and step definition"""
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.timings = dict([(kind, {}) for kind in KINDS])
+
+    @classmethod
+    def load(cls, filename):
+        baseline = cls(filename)
+        if not os.path.exists(filename):
+            return baseline
+
+        with open(filename) as saved:
+            data = json.load(saved)
+
+        for kind in KINDS:
+            baseline.timings[kind].update(data.get(kind, {}))
+
+        return baseline
+
+    def save(self, filename=None):
+        with open(filename or self.filename, 'w') as output:
+            json.dump(self.timings, output, indent=1, sort_keys=True)
+
+    def add(self, kind, key, name, seconds):
+        timing = self.timings[kind].setdefault(
+            key, {'name': name, 'samples': []})
+        timing['samples'].append(seconds)
+
+    def extend(self, other):
+        """Adds the durations of `other` baseline, keeping the latest
+        MAX_SAMPLES of each"""
+        for kind in KINDS:
+            for key, timing in other.timings[kind].items():
+                mine = self.timings[kind].setdefault(
+                    key, {'name': timing['name'], 'samples': []})
+                mine['name'] = timing['name']
+                mine['samples'] = \
+                    (mine['samples'] + timing['samples'])[-MAX_SAMPLES:]
+
+    def compare(self, reference, max_regression):
+        """The changes from the `reference` baseline of what ran both
+        times, from the worst slowdown to the best speedup"""
+        changes = []
+        for kind in KINDS:
+            for key, timing in self.timings[kind].items():
+                before = reference.timings[kind].get(key)
+                if before and before['samples'] and timing['samples']:
+                    changes.append(Change(kind, key, timing['name'],
+                                          before['samples'],
+                                          timing['samples'],
+                                          max_regression))
+
+        return sorted(changes, key=lambda change: change.ratio,
+                      reverse=True)
+
+
+class Change(object):
+    """How the durations of a scenario or step definition changed"""
+
+    def __init__(self, kind, key, name, before, after, max_regression):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        self.before = mean(before)
+        self.after = mean(after)
+        self.samples = (len(before), len(after))
+        self.p_value = welch(before, after)
+        self.max_regression = max_regression
+
+    @property
+    def ratio(self):
+        if not self.before:
+            return self.after and float('inf') or 1.0
+
+        return self.after / self.before
+
+    @property
+    def significant(self):
+        return self.p_value is not None and self.p_value < SIGNIFICANCE
+
+    @property
+    def regression(self):
+        return (self.significant and
+                self.ratio - 1 > self.max_regression and
+                self.after - self.before >= MINIMUM_SLOWDOWN)
+
+    def __unicode__(self):
+        p_value = self.p_value is None and u"n/a" or u"%.3f" % self.p_value
+        return u"%-9s %+8.1f%% %9s %9s %7s  %s %s" % (
+            self.regression and u"REGRESSED" or u"",
+            (self.ratio - 1) * 100, format_seconds(self.before),
+            format_seconds(self.after), p_value, self.kind,
+            self.key == self.name and self.key or
+            u"%s (%s)" % (self.key, self.name))
+
+
+def report(changes, max_regression, top=10):
+    """The regressions, followed by the `top` other changes"""
+    regressions = [change for change in changes if change.regression]
+    others = [change for change in changes if not change.regression]
+    lines = [
+        u"",
+        u"Compared %d timings with the baseline: %d regressed by more "
+        u"than %g%%" % (len(changes), len(regressions),
+                         max_regression * 100),
+        u"%-9s %9s %9s %9s %7s  %s" % (u"", u"change", u"baseline",
+                                        u"now", u"p", u"what"),
+    ]
+    lines.extend([unicode(change) for change in regressions + others[:top]])
+
+    untested = [change for change in changes if change.p_value is None]
+    if untested:
+        lines.append(
+            u"Warning: %d timings have a single duration both in the "
+            u"baseline and in this run, too few samples to tell a "
+            u"regression from noise; save the baseline from a few runs" %
+            len(untested))
+
+    return u"\n".join(lines) + u"\n"
+
+
+def enable(save=None, compare=None, max_regression=0.2):
+    """Times the scenarios and step definitions, saving their durations
+    into the `save` baseline and checking them against the `compare`
+    one, in which case the regressions are set on the total result"""
+    current = Baseline()
+    reference = compare and Baseline.load(compare) or None
+    started = {}
+
+    @before.each_scenario
+    def time_scenario(scenario):
+        started['scenario'] = scenario
+        started['at'] = time.time()
+
+    @after.each_scenario
+    def record_scenario(scenario):
+        if started.get('scenario') is scenario:
+            current.add('scenario', scenario.stable_id, scenario.stable_id,
+                        time.time() - started['at'])
+
+    @after.each_step
+    def record_step(step):
+        definition = step.defined_at
+        if not step.ran or not definition or step.wall_time is None:
+            return
+
+        current.add('step', u"%s:%d" % (definition.file, definition.line),
+                    definition.function.__name__, step.wall_time)
+
+    @after.all
+    def check_baseline(total):
+        if reference is not None:
+            changes = current.compare(reference, max_regression)
+            total.regressions = [change for change in changes
+                                 if change.regression]
+            terminal.sink.write(report(changes, max_regression))
+
+        if save:
+            saved = Baseline.load(save)
+            saved.extend(current)
+            saved.save()
+
+    return current
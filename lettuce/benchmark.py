@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Scenarios tagged with @benchmark are ran many times over, so that
+their steps can assert on the distribution of their durations rather
+than on a single, noisy, one.
+
+    @benchmark(runs=50,warmup=5)
+    Scenario: Search quickly
+      Given I search for "lettuce"
+      Then p95 latency should be under 200ms
+
+The steps that check the durations, such as the "Then" above, are told
+apart from the ones being measured by their definitions, which are
+decorated with `statistic` instead of `step`. The steps being measured
+run `warmup` times, then `runs` times while their durations are
+sampled, without calling the hooks of steps. Then the whole scenario
+runs once more as usual, where the statistic steps check the samples
+taken."""
+import re
+import math
+
+from lettuce.decorators import step
+from lettuce.registry import STEP_REGISTRY
+from lettuce.exceptions import LettuceSyntaxError
+
+DEFAULT_RUNS = 10
+DEFAULT_WARMUP = 1
+
+UNITS = {'ms': 0.001, 's': 1}
+
+
+class REP(object):
+    "RegEx Pattern"
+    setting = re.compile(r'^\s*(runs|warmup)\s*=\s*(\d+)\s*$')
+
+
+def percentile(values, percent):
+    """The nearest-rank percentile of `values`"""
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return u"%.1fms" % (seconds * 1000)
+
+    return u"%.3fs" % seconds
+
+
+class Statistics(object):
+    """The durations sampled from the runs of a benchmark, as a whole
+    and for each step"""
+
+    def __init__(self, runs, warmup):
+        self.runs = runs
+        self.warmup = warmup
+        self.samples = []
+        self.steps = []
+        self.error = None
+
+    def add(self, steps):
+        durations = [step.wall_time or 0.0 for step in steps]
+        if not self.steps:
+            self.steps = [(step.sentence, []) for step in steps]
+
+        for (sentence, samples), duration in zip(self.steps, durations):
+            samples.append(duration)
+
+        self.samples.append(sum(durations))
+
+    @property
+    def mean(self):
+        return sum(self.samples) / len(self.samples)
+
+    @property
+    def deviation(self):
+        mean = self.mean
+        return math.sqrt(sum([(sample - mean) ** 2 for sample in
+                              self.samples]) / max(len(self.samples) - 1, 1))
+
+    def statistic(self, name):
+        """The statistic called `name`: mean, median, min, max or a
+        percentile such as p95"""
+        if not self.samples:
+            return None
+
+        if name == 'mean':
+            return self.mean
+
+        if name in ('min', 'minimum'):
+            return min(self.samples)
+
+        if name in ('max', 'maximum'):
+            return max(self.samples)
+
+        if name == 'median':
+            return percentile(self.samples, 50)
+
+        return percentile(self.samples, float(name[1:]))
+
+    def summary(self):
+        if not self.samples:
+            return u"no run completed"
+
+        figures = [u"%s %s" % (name, format_seconds(self.statistic(name)))
+                   for name in ('min', 'mean', 'p50', 'p95', 'p99', 'max')]
+        return u"%d runs after %d warm-up: %s" % (
+            len(self.samples), self.warmup, u", ".join(figures))
+
+    def to_dict(self):
+        data = {
+            'runs': len(self.samples),
+            'warmup': self.warmup,
+            'samples': self.samples,
+            'steps': [{'step': sentence, 'samples': samples}
+                      for sentence, samples in self.steps],
+        }
+        if self.samples:
+            for name in ('min', 'mean', 'p50', 'p95', 'p99', 'max'):
+                data[name] = self.statistic(name)
+
+            data['deviation'] = self.deviation
+
+        if self.error:
+            data['error'] = self.error
+
+        return data
+
+
+class Benchmark(object):
+    def __init__(self, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP):
+        self.runs = runs
+        self.warmup = warmup
+
+    @classmethod
+    def from_tags(cls, tags, arguments=None):
+        """The benchmark asked for by a @benchmark or
+        @benchmark(runs=N,warmup=M) tag, if any, given the names of the
+        tags and the arguments of the tags that have some"""
+        if 'benchmark' not in (tags or []):
+            return None
+
+        given = (arguments or {}).get('benchmark') or ''
+        settings = {}
+        for setting in filter(None, given.split(',')):
+            valid = REP.setting.match(setting)
+            if not valid:
+                raise LettuceSyntaxError(None, (
+                    'Invalid setting %r in the tag @benchmark(%s), try '
+                    'something like @benchmark(runs=50,warmup=5)' % (
+                        setting, given)))
+
+            settings[valid.group(1)] = int(valid.group(2))
+
+        return cls(**settings)
+
+    def run(self, steps, ignore_case, background=None, outline=None):
+        """Runs the `steps` being measured over and over again, without
+        calling their hooks, and returns the durations sampled"""
+        statistics = Statistics(self.runs, self.warmup)
+        for number in range(self.warmup + self.runs):
+            ran = []
+            try:
+                # copies run, since the steps keep whether they failed,
+                # and the scenario runs them once more afterwards
+                for one in background and background.steps or []:
+                    copied = one.copy()
+                    copied.background = one.background
+                    copied.run(ignore_case)
+
+                for one in steps:
+                    if outline:
+                        copied = one.solve_and_clone(outline)
+                    else:
+                        copied = one.copy()
+                        copied.scenario = one.scenario
+
+                    copied.run(ignore_case)
+                    ran.append(copied)
+
+            except Exception, e:
+                statistics.error = u"run %d of %d failed: %s" % (
+                    number + 1, self.warmup + self.runs, e)
+                break
+
+            if number >= self.warmup:
+                statistics.add(ran)
+
+        return statistics
+
+
+def statistic(regex):
+    """Decorates a step definition that checks the durations sampled by
+    a benchmark, found at `step.scenario.benchmark_statistics`, so that
+    it is not measured along with the others"""
+    def wrap(function):
+        function.benchmark_statistic = True
+        return step(regex)(function)
+
+    return wrap
+
+
+def is_statistic(step_definition):
+    return getattr(step_definition.function, 'benchmark_statistic', False)
+
+
+STATISTIC_STEP = (ur'(?:the )?(p\d+(?:\.\d+)?|mean|median|min|max)'
+                  ur' (?:latency|duration|time) should be'
+                  ur' (?:under|below|less than) (\d+(?:\.\d+)?) ?(ms|s)$')
+
+
+def statistic_should_be_under(step, name, limit, unit):
+    statistics = step.scenario and step.scenario.benchmark_statistics
+    assert statistics, u"The scenario is not a benchmark, tag it with " \
+        u"@benchmark"
+    assert not statistics.error, statistics.error
+
+    seconds = statistics.statistic(name)
+    limit = float(limit) * UNITS[unit]
+    assert seconds < limit, u"The %s latency is %s, over %s (%s)" % (
+        name, format_seconds(seconds), format_seconds(limit),
+        statistics.summary())
+
+
+def load_steps():
+    """Defines the steps that check the durations of a benchmark, unless
+    they already are: the runner calls this once it loaded the step
+    definitions of the project"""
+    if STEP_REGISTRY.get(STATISTIC_STEP) is not statistic_should_be_under:
+        statistic(STATISTIC_STEP)(statistic_should_be_under)
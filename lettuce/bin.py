@@ -20,9 +20,97 @@ import sys
 import optparse
 
 import lettuce
+from lettuce import tags as tag_options
+from lettuce.budget import parse_duration, parse_percentage
+
+
+def merge_reports(args):
+    parser = optparse.OptionParser(
+        usage="%prog merge-reports -o OUTPUT REPORT_OR_DIR...",
+        version=lettuce.version)
+
+    parser.add_option("-o", "--output",
+                      dest="output",
+                      default=None,
+                      type="string",
+                      help='Where to write the merged report; "-" writes '
+                      'JSON lines to stdout')
+
+    options, args = parser.parse_args(args)
+    if not options.output or not args:
+        parser.error('an output and at least one report are needed')
+
+    from lettuce import merge
+    try:
+        merged = merge.merge_reports(args, options.output)
+    except (IOError, ValueError, SyntaxError), e:
+        parser.error(str(e))
+
+    sys.stderr.write(unicode(merged).encode('utf-8') + "\n")
+
+
+def history(args):
+    from lettuce import history as history_store
+
+    parser = optparse.OptionParser(
+        usage="%prog history [options]",
+        version=lettuce.version)
+
+    parser.add_option("--history-db",
+                      dest="history_db",
+                      default=history_store.DEFAULT_DATABASE,
+                      type="string",
+                      help='The database written by --history-db, '
+                      'defaults to %s' % history_store.DEFAULT_DATABASE)
+
+    parser.add_option("--runs",
+                      dest="runs",
+                      default=history_store.DEFAULT_WINDOW,
+                      type="int",
+                      help='How many of the last runs to look at')
+
+    parser.add_option("--sigmas",
+                      dest="sigmas",
+                      default=3.0,
+                      type="float",
+                      help='How many standard deviations above its usual '
+                      'duration a scenario must take to have regressed')
+
+    parser.add_option("--top",
+                      dest="top",
+                      default=10,
+                      type="int",
+                      help='How many scenarios or step definitions to list '
+                      'at most in each section')
+
+    options, args = parser.parse_args(args)
+    if not os.path.exists(options.history_db):
+        parser.error('there is no history database at %s' %
+                     options.history_db)
+
+    database = history_store.HistoryDatabase(options.history_db)
+    sections = [
+        ("Scenarios that got slower",
+         database.regressions(options.runs, options.sigmas)),
+        ("Flaky scenarios", database.flaky(options.runs)),
+        ("Step definitions getting slower",
+         database.growing_definitions(options.runs)),
+    ]
+    database.close()
+
+    for title, found in sections:
+        sys.stdout.write("%s:\n" % title)
+        for item in found[:options.top] or [u"none"]:
+            sys.stdout.write((u"  %s\n" % unicode(item)).encode('utf-8'))
 
 
 def main(args=sys.argv[1:]):
+    if args and args[0] == 'merge-reports':
+        return merge_reports(args[1:])
+
+    if args and args[0] == 'history':
+        return history(args[1:])
+
     base_path = os.path.join(os.path.dirname(os.curdir), 'features')
     parser = optparse.OptionParser(
         usage="%prog or type %prog -h (--help) for help",
@@ -45,7 +133,9 @@ def main(args=sys.argv[1:]):
                       help='Tells lettuce to run the specified tags only; '
                       'can be used multiple times to define more tags'
                       '(prefixing tags with "-" will exclude them and '
-                      'prefixing with "~" will match approximate words)')
+                      'prefixing with "~" will match approximate words). '
+                      'Boolean expressions such as "@api and not @slow" '
+                      'are accepted as well')
 
     parser.add_option("-r", "--random",
                       dest="random",
@@ -66,6 +156,35 @@ def main(args=sys.argv[1:]):
                       help='Write JUnit XML to this file. Defaults to '
                       'lettucetests.xml')
 
+    parser.add_option("--jsonl-output",
+                      dest="jsonl_output",
+                      default=None,
+                      type="string",
+                      help='Write one JSON object per event of the run to '
+                      'this file, to stdout when "-" or to the file '
+                      'descriptor N when "fd:N"')
+
+    parser.add_option("--cucumber-json",
+                      dest="cucumber_json",
+                      default=None,
+                      type="string",
+                      help='Write a Cucumber JSON report to this file')
+
+    parser.add_option("--xunit-per-scenario",
+                      dest="xunit_per_scenario",
+                      action="store_true",
+                      default=False,
+                      help='Write one JUnit test case per scenario and '
+                      'outline example, instead of one per step')
+
+    parser.add_option("--xunit-ids",
+                      dest="xunit_ids",
+                      action="store_true",
+                      default=False,
+                      help='Write the id of each JUnit test case into its '
+                      'properties, so that `lettuce merge-reports` tells '
+                      'apart the scenarios named alike')
+
     parser.add_option("--failfast",
                       dest="failfast",
                       default=False,
@@ -78,6 +197,187 @@ def main(args=sys.argv[1:]):
                       action="store_true",
                       help='Launches an interactive debugger upon error')
 
+    parser.add_option("--budget",
+                      dest="budget",
+                      default=None,
+                      type="string",
+                      help='Run only the most valuable scenarios that fit '
+                      'in the given time, such as "90s" or "5m". Scenarios '
+                      'that failed or changed recently, or that rarely run, '
+                      'are preferred')
+
+    parser.add_option("--history-file",
+                      dest="history_file",
+                      default=None,
+                      type="string",
+                      help='Records the durations and outcomes of the '
+                      'scenarios into this file, which is used by --budget. '
+                      'Defaults to .lettuce-history')
+
+    parser.add_option("--history-db",
+                      dest="history_db",
+                      default=None,
+                      type="string",
+                      help='Records the durations and outcomes of every '
+                      'scenario and step into this SQLite database, which '
+                      'is read by `lettuce history` and, without '
+                      '--history-file, by --budget')
+
+    parser.add_option("--outline-sample",
+                      dest="outline_sample",
+                      default=None,
+                      type="int",
+                      help='Run only K randomly chosen examples of each '
+                      'scenario outline')
+
+    parser.add_option("--outline-pairwise",
+                      dest="outline_pairwise",
+                      default=False,
+                      action="store_true",
+                      help='Run only the examples of each scenario outline '
+                      'needed to cover every pair of column values')
+
+    parser.add_option("--outline-seed",
+                      dest="outline_seed",
+                      default=0,
+                      type="int",
+                      help='Seed used by --outline-sample to choose the '
+                      'examples. Defaults to 0')
+
+    parser.add_option("--index-file",
+                      dest="index_file",
+                      default=None,
+                      type="string",
+                      help='Keeps an index of the tags and scenarios of '
+                      'each feature file in this file, so that runs '
+                      'selecting tags or scenarios only parse the feature '
+                      'files they need')
+
+    parser.add_option("--trace-file",
+                      dest="trace_file",
+                      default=None,
+                      type="string",
+                      help='Records the features, scenarios, steps and hooks '
+                      'ran into this file, as a timeline for the trace '
+                      'viewers of Chrome or Perfetto')
+
+    parser.add_option("--resource-usage",
+                      dest="resource_usage",
+                      action="store_true",
+                      default=False,
+                      help='Accounts for the CPU time, memory, disk I/O and '
+                      'context switches of each scenario and step, in the '
+                      'xunit and JSON lines outputs')
+
+    parser.add_option("--ignore-dir",
+                      dest="ignored_dirs",
+                      default=None,
+                      action='append',
+                      help='Directory name or glob pattern to skip when '
+                      'looking for step definitions and features; can be '
+                      'used multiple times. Version control, virtualenv '
+                      'and tox directories are always skipped')
+
+    parser.add_option("--discovery-manifest",
+                      dest="discovery_manifest",
+                      default=None,
+                      type="string",
+                      help='Caches in this file the step definition files '
+                      'found, so that they are not looked for again until '
+                      'a directory changes')
+
+    parser.add_option("--profile-steps",
+                      dest="profile_steps",
+                      action="store_true",
+                      default=False,
+                      help='Times each step definition and hook, and prints '
+                      'the slowest ones at the end')
+
+    parser.add_option("--profile-top",
+                      dest="profile_top",
+                      default=20,
+                      type="int",
+                      help='How many of the slowest step definitions and '
+                      'hooks --profile-steps prints')
+
+    parser.add_option("--profile-file",
+                      dest="profile_file",
+                      default=None,
+                      type="string",
+                      help='Writes every timing taken by --profile-steps to '
+                      'this file, as JSON')
+
+    parser.add_option("--cprofile",
+                      dest="cprofile",
+                      default=None,
+                      type="choice",
+                      choices=['scenario', 'feature', 'run'],
+                      help='Runs cProfile around each scenario, each feature '
+                      'or the whole run, writing a .pstats file for each '
+                      'plus run.pstats for the whole run')
+
+    parser.add_option("--cprofile-dir",
+                      dest="cprofile_dir",
+                      default=None,
+                      type="string",
+                      help='Where --cprofile writes its .pstats files, '
+                      '"lettuce-profiles" by default')
+
+    parser.add_option("--cprofile-threshold",
+                      dest="cprofile_threshold",
+                      default=None,
+                      help='Only keeps the profiles of the scenarios or '
+                      'features that took longer than this, such as "2s"')
+
+    parser.add_option("--sampling-profile",
+                      dest="sampling_profile",
+                      default=None,
+                      type="string",
+                      help='Samples the stacks of the run at a regular '
+                      'interval of CPU time, and writes them collapsed to '
+                      'this file for flame graph tools')
+
+    parser.add_option("--sampling-interval",
+                      dest="sampling_interval",
+                      default=None,
+                      help='How often --sampling-profile samples the stacks, '
+                      '"10ms" by default')
+
+    parser.add_option("--save-baseline",
+                      dest="save_baseline",
+                      default=None,
+                      help='Saves the timings of the scenarios and step '
+                      'definitions into this file, adding to the ones '
+                      'already there')
+
+    parser.add_option("--compare-baseline",
+                      dest="compare_baseline",
+                      default=None,
+                      help='Compares the timings of the run with the '
+                      'baseline saved in this file, failing on regressions')
+
+    parser.add_option("--max-regression",
+                      dest="max_regression",
+                      default="20%",
+                      help='How much slower than the baseline a scenario or '
+                      'step definition may get before it fails the run, '
+                      '"20%" by default')
+
+    parser.add_option("--dry-run",
+                      dest="dry_run",
+                      default=False,
+                      action="store_true",
+                      help='Resolves every step against the step definitions '
+                      'without running anything, reporting the undefined and '
+                      'ambiguous steps and the unused step definitions')
+
+    parser.add_option("--preflight",
+                      dest="preflight",
+                      default=False,
+                      action="store_true",
+                      help='Runs nothing when a step is undefined or '
+                      'ambiguous, after checking them all like --dry-run')
+
     options, args = parser.parse_args(args)
     if args:
         base_path = os.path.abspath(args[0])
@@ -87,9 +387,45 @@ def main(args=sys.argv[1:]):
     except ValueError:
         pass
 
-    tags = None
-    if options.tags:
-        tags = [tag.strip('@') for tag in options.tags]
+    time_budget = None
+    if options.budget:
+        try:
+            time_budget = parse_duration(options.budget)
+        except ValueError, e:
+            parser.error(str(e))
+
+    cprofile_threshold = None
+    if options.cprofile_threshold:
+        try:
+            cprofile_threshold = parse_duration(options.cprofile_threshold)
+        except ValueError, e:
+            parser.error(str(e))
+
+    sampling_interval = None
+    if options.sampling_interval:
+        try:
+            sampling_interval = parse_duration(options.sampling_interval)
+        except ValueError, e:
+            parser.error(str(e))
+
+    if options.outline_sample is not None and options.outline_sample < 0:
+        parser.error("--outline-sample must not be negative, got %d" %
+                     options.outline_sample)
+
+    try:
+        max_regression = parse_percentage(options.max_regression)
+    except ValueError, e:
+        parser.error(str(e))
+
+    if options.compare_baseline and \
+       not os.path.exists(options.compare_baseline):
+        parser.error("The baseline %r does not exist" %
+                     options.compare_baseline)
+
+    try:
+        tags = tag_options.parse(options.tags)
+    except ValueError, e:
+        parser.error(str(e))
 
     runner = lettuce.Runner(
         base_path,
@@ -98,13 +434,42 @@ def main(args=sys.argv[1:]):
         random=options.random,
         enable_xunit=options.enable_xunit,
         xunit_filename=options.xunit_file,
+        xunit_per_scenario=options.xunit_per_scenario,
+        xunit_ids=options.xunit_ids,
+        jsonl_output=options.jsonl_output,
+        cucumber_json=options.cucumber_json,
+        trace_file=options.trace_file,
+        resource_usage=options.resource_usage,
         failfast=options.failfast,
         auto_pdb=options.auto_pdb,
         tags=tags,
+        time_budget=time_budget,
+        history_file=options.history_file,
+        history_db=options.history_db,
+        outline_sample=options.outline_sample,
+        outline_pairwise=options.outline_pairwise,
+        outline_seed=options.outline_seed,
+        index_file=options.index_file,
+        ignored_dirs=options.ignored_dirs,
+        discovery_manifest=options.discovery_manifest,
+        profile_steps=options.profile_steps or bool(options.profile_file),
+        profile_top=options.profile_top,
+        profile_file=options.profile_file,
+        cprofile=options.cprofile,
+        cprofile_dir=options.cprofile_dir,
+        cprofile_threshold=cprofile_threshold,
+        sampling_profile=options.sampling_profile,
+        sampling_interval=sampling_interval,
+        save_baseline=options.save_baseline,
+        compare_baseline=options.compare_baseline,
+        max_regression=max_regression,
+        dry_run=options.dry_run,
+        preflight=options.preflight,
     )
 
     result = runner.run()
-    failed = result is None or result.steps != result.steps_passed
+    failed = result is None or result.steps != result.steps_passed or \
+        bool(result.regressions)
     raise SystemExit(int(failed))
 
 if __name__ == '__main__':
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import re
+import sys
+import json
+import time
+
+from lettuce import terminal
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+DEFAULT_HISTORY_FILE = '.lettuce-history'
+
+# weights of each heuristic when estimating how likely a scenario is
+# to find a fault
+FAILURE_WEIGHT = 3.0
+CHANGE_WEIGHT = 2.0
+RARITY_WEIGHT = 1.0
+
+# seconds assumed for scenarios that never ran, when there is no
+# recorded duration at all to estimate from
+DEFAULT_DURATION = 1.0
+
+DURATION_UNITS = {
+    'ms': 0.001,
+    's': 1,
+    'm': 60,
+    'h': 3600,
+}
+
+
+class REP(object):
+    "RegEx Pattern"
+    duration = re.compile(r'^(?:\d+(?:\.\d+)?(?:ms|s|m|h)?)+$')
+    duration_part = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)?')
+
+
+def parse_duration(string):
+    """Converts a human readable duration into seconds.
+
+    Examples::
+
+    >>> from lettuce.budget import parse_duration
+    >>> assert parse_duration('90') == 90
+    >>> assert parse_duration('5m') == 300
+    >>> assert parse_duration('1m30s') == 90
+    """
+    string = str(string).strip().lower()
+    if not REP.duration.match(string):
+        raise ValueError('Invalid duration: %r, try something like '
+                         '"90s", "5m" or "1h"' % string)
+
+    seconds = 0.0
+    for amount, unit in REP.duration_part.findall(string):
+        seconds += float(amount) * DURATION_UNITS[unit or 's']
+
+    return seconds
+
+
+def parse_percentage(string):
+    """Converts "20%" or "20" into 0.2
+
+    >>> from lettuce.budget import parse_percentage
+    >>> assert parse_percentage('20%') == 0.2
+    """
+    try:
+        value = float(str(string).strip().rstrip('%'))
+    except ValueError:
+        raise ValueError('Invalid percentage: %r, try something like '
+                         '"20%%"' % string)
+
+    if value < 0:
+        raise ValueError('Invalid percentage: %r, it must not be '
+                         'negative' % string)
+
+    return value / 100.0
+
+
+def format_duration(seconds):
+    if seconds >= 60 and not seconds % 60:
+        return '%dm' % (seconds / 60)
+
+    return '%gs' % seconds
+
+
+class History(object):
+    """Durations and outcomes of the scenarios ran previously, persisted
+    as json and keyed by `Scenario.stable_id`"""
+
+    def __init__(self, filename=None):
+        self.filename = filename or DEFAULT_HISTORY_FILE
+        self.scenarios = {}
+
+    @classmethod
+    def load(cls, filename=None):
+        history = cls(filename)
+        if not os.path.exists(history.filename):
+            return history
+
+        try:
+            f = open(history.filename)
+            try:
+                history.scenarios = json.load(f).get('scenarios', {})
+            finally:
+                f.close()
+        except ValueError:
+            sys.stderr.write('Ignoring the corrupted history file %s\n' %
+                             history.filename)
+
+        return history
+
+    def save(self):
+        f = open(self.filename, 'w')
+        try:
+            json.dump({'scenarios': self.scenarios}, f, indent=1)
+        finally:
+            f.close()
+
+    def get(self, scenario_id):
+        return self.scenarios.get(scenario_id)
+
+    def duration_of(self, scenario_id):
+        entry = self.get(scenario_id)
+        if entry:
+            return entry['duration']
+
+    def record(self, scenario_id, duration, failed, when=None):
+        when = when or time.time()
+        entry = self.scenarios.setdefault(scenario_id, {
+            'runs': 0,
+            'duration': duration,
+            'failed_at': None,
+        })
+        # moving average, so that a single slow run does not ruin
+        # the estimates
+        entry['duration'] = entry['duration'] * 0.7 + duration * 0.3
+        entry['runs'] += 1
+        entry['ran_at'] = when
+        if failed:
+            entry['failed_at'] = when
+
+
+class Candidate(object):
+    """A scenario that could be ran within the budget"""
+
+    def __init__(self, feature, index, scenario, cost, value):
+        self.feature = feature
+        self.index = index
+        self.scenario = scenario
+        self.cost = cost
+        self.value = value
+
+    @property
+    def ratio(self):
+        return self.value / max(self.cost, 0.001)
+
+    def __repr__(self):
+        return u'<Candidate: "%s" cost=%.2fs value=%.2f>' % (
+            self.scenario.name, self.cost, self.value)
+
+
+class TimeBudget(object):
+    """Chooses and orders the subset of scenarios that fits within
+    `seconds`, preferring the ones that are more likely to find
+    faults: recently failed, recently changed or rarely ran."""
+
+    def __init__(self, seconds, history=None):
+        self.seconds = seconds
+        self.history = history or History()
+        self.deferred = []
+
+    def value_of(self, scenario, filename, now):
+        entry = self.history.get(scenario.stable_id)
+        if not entry:
+            return FAILURE_WEIGHT + CHANGE_WEIGHT + RARITY_WEIGHT
+
+        value = RARITY_WEIGHT / entry['runs']
+        if entry.get('failed_at'):
+            days_ago = (now - entry['failed_at']) / 86400.0
+            value += FAILURE_WEIGHT * (0.5 ** days_ago)
+
+        if filename and os.path.exists(filename):
+            if os.path.getmtime(filename) > entry.get('ran_at', 0):
+                value += CHANGE_WEIGHT
+
+        return value
+
+    def estimated_cost(self):
+        durations = sorted([entry['duration'] for entry in
+                            self.history.scenarios.values()])
+        if not durations:
+            return DEFAULT_DURATION
+
+        return durations[len(durations) / 2]
+
+    def candidates(self, features, tags=None):
+        now = time.time()
+        unknown_cost = self.estimated_cost()
+        for feature, scenarios in features:
+            filename = getattr(feature.described_at, 'file', None)
+            for index, scenario in enumerate(feature.scenarios):
+                if scenarios and (index + 1) not in scenarios:
+                    continue
+
+                if not scenario.matches_tags(tags):
+                    continue
+
+                cost = self.history.duration_of(scenario.stable_id)
+                if cost is None:
+                    cost = unknown_cost
+
+                value = self.value_of(scenario, filename, now)
+                yield Candidate(feature, index, scenario, cost, value)
+
+    def plan(self, features, tags=None):
+        """Takes a list of (feature, [scenario numbers or None]) and
+        returns the list of (feature, [scenario numbers]) to be ran,
+        features with the most valuable scenarios come first. The
+        scenarios left out are kept at `self.deferred`"""
+
+        candidates = sorted(self.candidates(features, tags),
+                            key=lambda c: c.ratio, reverse=True)
+        chosen = []
+        self.deferred = []
+        remaining = self.seconds
+        for candidate in candidates:
+            if candidate.cost <= remaining:
+                chosen.append(candidate)
+                remaining -= candidate.cost
+            else:
+                self.deferred.append(candidate)
+
+        chosen.sort(key=lambda c: c.value, reverse=True)
+        order = []
+        by_feature = {}
+        for candidate in chosen:
+            if candidate.feature not in by_feature:
+                by_feature[candidate.feature] = []
+                order.append(candidate.feature)
+
+            by_feature[candidate.feature].append(candidate.index + 1)
+
+        return [(feature, sorted(by_feature[feature])) for feature in order]
+
+
+def enable(history, budget=None):
+    """Records the duration and outcome of each scenario into
+    `history`, and reports the scenarios deferred by `budget`"""
+
+    current = {}
+
+    @before.each_scenario
+    def time_scenario(scenario):
+        current['scenario'] = scenario
+        current['started'] = time.time()
+        current['failed'] = False
+
+    @after.each_step
+    def check_step(step):
+        # undefined steps fail the scenario too, as they do the run
+        if step.failed or not step.defined_at:
+            current['failed'] = True
+
+    @after.each_scenario
+    def record_scenario(scenario):
+        if current.get('scenario') is scenario:
+            history.record(scenario.stable_id,
+                           time.time() - current['started'],
+                           current['failed'])
+
+    @after.all
+    def save_history(total):
+        history.save()
+        if not budget or not budget.deferred:
+            return
+
+        word = len(budget.deferred) > 1 and "scenarios" or "scenario"
+        terminal.sink.write("\n%d %s deferred to fit the budget of %s:\n" % (
+            len(budget.deferred), word, format_duration(budget.seconds)))
+        for candidate in budget.deferred:
+            terminal.sink.write(u"  %s\n" % candidate.scenario.stable_id)
@@ -17,15 +17,20 @@
 
 
 import re
+import time
 import codecs
 import unicodedata
 
-from copy import deepcopy
-from fuzzywuzzy import fuzz
+from copy import copy, deepcopy
 from itertools import chain
 from random import shuffle
 
 from lettuce import strings
+from lettuce import sampling
+from lettuce import resources
+from lettuce.benchmark import Benchmark, is_statistic
+from lettuce.tags import tags_match
+from lettuce.index import scenario_at
 from lettuce import languages
 from lettuce.fs import FileSystem
 from lettuce.registry import STEP_REGISTRY
@@ -36,6 +41,14 @@ from lettuce.exceptions import LettuceSyntaxError
 
 fs = FileSystem()
 
+# strings kept parsed by Step.parsed_from, before starting over
+MAX_PARSED_STRINGS = 1000
+
+# what a step keeps about its run, which a copy of it leaves out
+STATE = ('ran', 'passed', 'failed', 'why', 'defined_at', 'has_definition',
+         'started_at', 'wall_time', 'cpu_time', 'resources',
+         'related_outline', 'scenario', 'background', 'subsequent_outline')
+
 
 class REP(object):
     "RegEx Pattern"
@@ -45,8 +58,13 @@ class REP(object):
     within_double_quotes = re.compile(r'("[^"]+")')
     within_single_quotes = re.compile(r"('[^']+')")
     only_whitespace = re.compile('^\s*$')
-    tag_extraction_regex = re.compile(r'(?:(?:^|\s+)[@]([^@\s]+))')
-    tag_strip_regex = re.compile(ur'(?:(?:^\s*|\s+)[@]\S+\s*)+$', re.DOTALL)
+    # tags may take arguments within parentheses, spaces included, as
+    # in @benchmark(runs=50, warmup=5), which are kept apart from the
+    # name of the tag
+    tag_extraction_regex = re.compile(
+        r'(?:(?:^|\s+)[@]([^@\s(]+)(?:\(([^)@]*)\))?)')
+    tag_strip_regex = re.compile(
+        ur'(?:(?:^\s*|\s+)[@](?:[^@\s(]+\([^)@]*\)|\S+)\s*)+$', re.DOTALL)
     comment_strip1 = re.compile(ur'(^[^\'"]*)[#]([^\'"]*)$')
     comment_strip2 = re.compile(ur'(^[^\'"]+)[#](.*)$')
 
@@ -137,8 +155,9 @@ class StepDefinition(object):
 
     def __call__(self, *args, **kw):
         """Method that actually wrapps the call to step definition
-        callback. Sends step object as first argument
-        """
+        callback. Sends step object as first argument, and times it"""
+        started, cpu_started = time.time(), time.clock()
+        usage = resources.snapshot()
         try:
             ret = self.function(self.step, *args, **kw)
             self.step.passed = True
@@ -146,6 +165,11 @@ class StepDefinition(object):
             self.step.failed = True
             self.step.why = ReasonToFail(self.step, e)
             raise
+        finally:
+            self.step.started_at = started
+            self.step.wall_time = time.time() - started
+            self.step.cpu_time = time.clock() - cpu_started
+            self.step.resources = resources.since(usage)
 
         return ret
 
@@ -167,13 +191,18 @@ class ScenarioDescription(object):
     """A simple object that holds filename and line number of a scenario
     description (scenario within feature file)"""
 
-    def __init__(self, scenario, filename, string, language):
+    def __init__(self, scenario, filename, string, language, after=0):
         self.file = fs.relpath(filename)
         self.line = None
 
-        for pline, part in enumerate(string.splitlines()):
-            part = part.strip()
-            if re.match(u"%s:[ ]+" % language.scenario_separator + re.escape(scenario.name), part):
+        # the whole name, so that "Login" is not found at "Login fails"
+        regex = re.compile(u"(?:%s):[ ]+%s$" % (language.scenario_separator,
+                                               re.escape(scenario.name)))
+        lines = string.splitlines()
+        # scenarios come in order, so the search starts past the line
+        # of the previous one, which tells same-named scenarios apart
+        for pline in xrange(after, len(lines)):
+            if regex.match(lines[pline].strip()):
                 self.line = pline + 1
                 break
 
@@ -212,20 +241,108 @@ class Step(object):
     ran = False
     passed = None
     failed = None
+    started_at = None
+    wall_time = None
+    cpu_time = None
+    resources = None
     related_outline = None
     scenario = None
     background = None
+    _parsed = {}
+
+    # what is only worked out when first asked for, since most steps
+    # have no table and, as long as they pass, are never asked where
+    # they are or what their definition could look like
+    _keys = None
+    _hashes = None
+    _multiline = None
+    _described_at = None
+    _proposal = None
+    _line_lookup = None
 
     def __init__(self, sentence, remaining_lines, line=None, filename=None):
         self.sentence = sentence
         self.original_sentence = sentence
         self._remaining_lines = remaining_lines
-        keys, hashes, self.multiline = self._parse_remaining_lines(remaining_lines)
+        self._line = line
+        self._filename = filename
+
+    def _parse_lines(self):
+        keys, hashes, multiline = \
+            self._parse_remaining_lines(self._remaining_lines)
+        if self._keys is None:
+            self._keys = tuple(keys)
+        if self._hashes is None:
+            self._hashes = HashList(self, hashes)
+        if self._multiline is None:
+            self._multiline = multiline
+
+    @property
+    def keys(self):
+        if self._keys is None:
+            self._parse_lines()
+
+        return self._keys
+
+    @keys.setter
+    def keys(self, keys):
+        self._keys = keys
+
+    @property
+    def hashes(self):
+        if self._hashes is None:
+            self._parse_lines()
+
+        return self._hashes
+
+    @hashes.setter
+    def hashes(self, hashes):
+        self._hashes = hashes
+
+    @property
+    def multiline(self):
+        if self._multiline is None:
+            self._parse_lines()
+
+        return self._multiline
+
+    @multiline.setter
+    def multiline(self, multiline):
+        self._multiline = multiline
+
+    @property
+    def described_at(self):
+        if self._described_at is None:
+            if self._line_lookup is not None:
+                self._line = self._line_in(*self._line_lookup)
+
+            self._described_at = StepDescription(self._line, self._filename)
+
+        return self._described_at
 
-        self.keys = tuple(keys)
-        self.hashes = HashList(self, hashes)
-        self.described_at = StepDescription(line, filename)
-        self.proposed_method_name, self.proposed_sentence = self.propose_definition()
+    @property
+    def proposed_method_name(self):
+        if self._proposal is None:
+            self._proposal = self.propose_definition()
+
+        return self._proposal[0]
+
+    @property
+    def proposed_sentence(self):
+        if self._proposal is None:
+            self._proposal = self.propose_definition()
+
+        return self._proposal[1]
+
+    @staticmethod
+    def _line_in(sentence, original_string):
+        line = None
+        for pline, line in enumerate(original_string.splitlines()):
+            if sentence in line:
+                line = pline + 1
+                break
+
+        return line
 
     def propose_definition(self):
         sentence = unicode(self.original_sentence)
@@ -336,14 +453,11 @@ class Step(object):
         return keys, hashes, multiline
 
     def _get_match(self, ignore_case):
-        matched, func = None, lambda: None
+        pattern, func = STEP_REGISTRY.match(self.sentence, ignore_case)
+        if pattern is None:
+            return None, StepDefinition(self, lambda: None)
 
-        for regex, func in STEP_REGISTRY.items():
-            matched = re.search(regex, self.sentence, ignore_case and re.I or 0)
-            if matched:
-                break
-
-        return matched, StepDefinition(self, func)
+        return pattern.search(self.sentence), StepDefinition(self, func)
 
     def pre_run(self, ignore_case, with_outline=None):
         matched, step_definition = self._get_match(ignore_case)
@@ -358,6 +472,31 @@ class Step(object):
 
         return matched, step_definition
 
+    @classmethod
+    def parsed_from(cls, string):
+        """The steps parsed from `string`, which is only parsed the first
+        time: steps that run others tend to run the same ones over and
+        over. The steps are never ran, but copied with `copy`"""
+        try:
+            return cls._parsed[string]
+        except KeyError:
+            pass
+
+        if len(cls._parsed) >= MAX_PARSED_STRINGS:
+            cls._parsed.clear()
+
+        steps = cls._parsed[string] = cls.many_from_lines(string.split('\n'))
+        return steps
+
+    def copy(self):
+        """A new step, just like this one before running"""
+        new = copy(self)
+        for name in STATE:
+            new.__dict__.pop(name, None)
+
+        new.hashes = HashList(new, [dict(row) for row in self.hashes])
+        return new
+
     def given(self, string):
         return self.behave_as(string)
 
@@ -385,8 +524,7 @@ class Step(object):
         execution of the step) if a subordinate step fails.
 
         """
-        lines = string.split('\n')
-        steps = self.many_from_lines(lines)
+        steps = [step.copy() for step in self.parsed_from(string)]
 
         if hasattr(self, 'scenario'):
             for step in steps:
@@ -519,17 +657,12 @@ class Step(object):
         lines = strings.get_stripped_lines(string)
         sentence = lines.pop(0)
 
-        line = None
+        step = cls(sentence, remaining_lines=lines, filename=with_file)
         if with_file and original_string:
-            for pline, line in enumerate(original_string.splitlines()):
-                if sentence in line:
-                    line = pline + 1
-                    break
+            # looked up in the feature file only when first asked for
+            step._line_lookup = (sentence, original_string)
 
-        return cls(sentence,
-                   remaining_lines=lines,
-                   line=line,
-                   filename=with_file)
+        return step
 
 
 class Scenario(object):
@@ -537,6 +670,13 @@ class Scenario(object):
     described_at = None
     indentation = 2
     table_indentation = indentation + 2
+    outlines_skipped = 0
+    resources = None
+    benchmark_statistics = None
+    _benchmark = False
+    _max_length = None
+    namesake = 0
+    _examples_sizes = None
 
     def __init__(self, name, remaining_lines, keys, outlines,
                  with_file=None,
@@ -562,15 +702,17 @@ class Scenario(object):
         self.previous_scenario = previous_scenario
 
         if with_file and original_string:
-            scenario_definition = ScenarioDescription(self, with_file,
-                                                      original_string,
-                                                      language)
+            previous = previous_scenario and previous_scenario.described_at
+            scenario_definition = ScenarioDescription(
+                self, with_file, original_string, language,
+                after=previous and previous.line or 0)
             self._set_definition(scenario_definition)
 
         self.solved_steps = list(self._resolve_steps(
             self.steps, self.outlines, with_file, original_string))
         self._add_myself_to_steps()
 
+        self.tag_arguments = {}
         if original_string and '@' in self.original_string:
             self.tags = self._find_tags_in(original_string)
         else:
@@ -578,6 +720,14 @@ class Scenario(object):
 
     @property
     def max_length(self):
+        # a scenario never changes once parsed, so its width is measured
+        # only once rather than each time one of its steps is printed
+        if self._max_length is None:
+            self._max_length = self._measure_max_length()
+
+        return self._max_length
+
+    def _measure_max_length(self):
         if self.outlines:
             prefix = self.language.first_of_scenario_outline + ":"
         else:
@@ -620,50 +770,29 @@ class Scenario(object):
     def __repr__(self):
         return u'<Scenario: "%s">' % self.name
 
-    def matches_tags(self, tags):
-        if tags is None:
-            return True
-
-        has_exclusionary_tags = any([t.startswith('-') for t in tags])
-
-        if not self.tags and not has_exclusionary_tags:
-            return False
-
-        matched = []
-
-        if isinstance(self.tags, list):
-            for tag in self.tags:
-                if tag in tags:
-                    return True
+    @property
+    def stable_id(self):
+        """Identifies the scenario across runs, regardless of the
+        position of the scenario within its feature file. Scenarios
+        named after an earlier one of the same feature get "::2",
+        "::3" and so on appended"""
+        if self.described_at:
+            where = self.described_at.file
+        elif self.feature:
+            where = self.feature.name
         else:
-            self.tags = []
+            where = u''
 
-        for tag in tags:
-            exclude = tag.startswith('-')
-            if exclude:
-                tag = tag[1:]
+        if self.namesake:
+            return u"%s::%s::%d" % (where, self.name, self.namesake + 1)
 
-            fuzzable = tag.startswith('~')
-            if fuzzable:
-                tag = tag[1:]
+        return u"%s::%s" % (where, self.name)
 
-            result = tag in self.tags
-            if fuzzable:
-                fuzzed = []
-                for internal_tag in self.tags:
-                    ratio = fuzz.ratio(tag, internal_tag)
-                    if exclude:
-                        fuzzed.append(ratio <= 80)
-                    else:
-                        fuzzed.append(ratio > 80)
-
-                result = any(fuzzed)
-            elif exclude:
-                result = tag not in self.tags
-
-            matched.append(result)
+    def matches_tags(self, tags):
+        if not isinstance(self.tags, list):
+            self.tags = []
 
-        return all(matched)
+        return tags_match(self.tags, tags)
 
     @property
     def evaluated(self):
@@ -689,7 +818,18 @@ class Scenario(object):
     def failed(self):
         return any([step.failed for step in self.steps])
 
-    def run(self, ignore_case, failfast=False):
+    def select_outlines(self, sample=None, pairwise=False, seed=None):
+        """Returns the indexes of the examples to be ran, either all of
+        them or a reduced set chosen by random sampling and/or pairwise
+        coverage of the column values"""
+        if sample is None and not pairwise:
+            return range(len(self.outlines))
+
+        return sampling.select(self.outlines, self.keys, sample, pairwise,
+                               seed=u"%s:%s" % (seed, self.stable_id))
+
+    def run(self, ignore_case, failfast=False, outline_sample=None,
+            outline_pairwise=False, outline_seed=None):
         """Runs a scenario, running each of its steps. Also call
         before_each and after_each callbacks for steps and scenario"""
 
@@ -697,7 +837,12 @@ class Scenario(object):
         call_hook('before_each', 'scenario', self)
 
         def run_scenario(almost_self, order=-1, outline=None, subsequent_outline=False):
+            usage = resources.snapshot()
             try:
+                if self.benchmark:
+                    self.benchmark_statistics = self.run_benchmark(
+                        ignore_case, outline)
+
                 if self.background:
                     self.background.run(ignore_case)
 
@@ -710,6 +855,7 @@ class Scenario(object):
             skip = lambda x: x not in steps_passed and x not in steps_undefined and x not in steps_failed
 
             steps_skipped = filter(skip, all_steps)
+            self.resources = resources.since(usage)
             if outline:
                 call_hook('outline', 'scenario', self, order, outline,
                         reasons_to_fail)
@@ -719,12 +865,19 @@ class Scenario(object):
                 steps_passed,
                 steps_failed,
                 steps_skipped,
-                steps_undefined
+                steps_undefined,
+                resources=self.resources
             )
 
         if self.outlines:
+            self.outline_indexes = self.select_outlines(
+                outline_sample, outline_pairwise, outline_seed)
+            self.outlines_skipped = \
+                len(self.outlines) - len(self.outline_indexes)
+
             first = True
-            for index, outline in enumerate(self.outlines):
+            for index in self.outline_indexes:
+                outline = self.outlines[index]
                 results.append(run_scenario(self, index, outline, subsequent_outline = not first))
                 first = False
         else:
@@ -733,6 +886,27 @@ class Scenario(object):
         call_hook('after_each', 'scenario', self)
         return results
 
+    @property
+    def benchmark(self):
+        """The settings of the @benchmark tag of the scenario, if any"""
+        if self._benchmark is False:
+            self._benchmark = Benchmark.from_tags(self.tags,
+                                                  self.tag_arguments)
+
+        return self._benchmark
+
+    def run_benchmark(self, ignore_case, outline=None):
+        """Samples the durations of the steps of a @benchmark scenario,
+        leaving out the ones that check those durations"""
+        measured = []
+        for step in self.steps:
+            matched, step_definition = step._get_match(ignore_case)
+            if not matched or not is_statistic(step_definition):
+                measured.append(step)
+
+        return self.benchmark.run(measured, ignore_case, self.background,
+                                  outline)
+
     def _add_myself_to_steps(self):
         for step in self.steps:
             step.scenario = self
@@ -772,7 +946,15 @@ class Scenario(object):
         return []
 
     def _extract_tag(self, item):
-        return REP.tag_extraction_regex.findall(item)
+        tags = []
+        for found in REP.tag_extraction_regex.finditer(item):
+            name, arguments = found.groups()
+            if arguments is not None:
+                self.tag_arguments[name] = arguments
+
+            tags.append(name)
+
+        return tags
 
     def _resolve_steps(self, steps, outlines, with_file, original_string):
         for outline in outlines:
@@ -802,7 +984,9 @@ class Scenario(object):
 
         head_parts = []
         if self.tags:
-            tags = ['@%s' % t for t in self.tags]
+            tags = [t in self.tag_arguments and
+                    '@%s(%s)' % (t, self.tag_arguments[t]) or '@%s' % t
+                    for t in self.tags]
             head_parts.append(u' ' * self.indentation)
             head_parts.append(' '.join(tags) + '\n')
 
@@ -826,6 +1010,24 @@ class Scenario(object):
         lines = strings.dicts_to_string(self.outlines, self.keys).splitlines()
         return "\n".join([(u" " * self.table_indentation) + line for line in lines]) + '\n'
 
+    @property
+    def examples_sizes(self):
+        # measured once, so that each example row can be printed as it
+        # runs without rendering the whole table again
+        if self._examples_sizes is None:
+            self._examples_sizes = strings.column_sizes(self.outlines,
+                                                        self.keys)
+
+        return self._examples_sizes
+
+    def represent_examples_head(self):
+        head = dict(zip(self.keys, self.keys))
+        return strings.row_to_string(head, self.keys, self.examples_sizes)
+
+    def represent_example(self, order):
+        return strings.row_to_string(self.outlines[order], self.keys,
+                                     self.examples_sizes)
+
     @classmethod
     def from_string(new_scenario, string,
                     with_file=None,
@@ -940,6 +1142,7 @@ class Background(object):
 class Feature(object):
     """ Object that represents a feature."""
     described_at = None
+    _max_length = None
 
     def __init__(self, name, remaining_lines, with_file, original_string,
                  language=None):
@@ -974,6 +1177,14 @@ class Feature(object):
 
     @property
     def max_length(self):
+        # every step printed is aligned to the feature width, so it is
+        # measured once per feature instead of once per printed line
+        if self._max_length is None:
+            self._max_length = self._measure_max_length()
+
+        return self._max_length
+
+    def _measure_max_length(self):
         max_length = strings.column_width(u"%s: %s" % (
             self.language.first_of_feature, self.name))
 
@@ -994,8 +1205,11 @@ class Feature(object):
         return max_length
 
     def _add_myself_to_scenarios(self):
+        named = {}
         for scenario in self.scenarios:
             scenario.feature = self
+            scenario.namesake = named.get(scenario.name, 0)
+            named[scenario.name] = scenario.namesake + 1
             if scenario.tags and self.tags:
                 scenario.tags.extend(self.tags)
 
@@ -1032,6 +1246,14 @@ class Feature(object):
     def get_head(self):
         return u"%s: %s" % (self.language.first_of_feature, self.name)
 
+    def scenario_at(self, line):
+        """Returns the number of the scenario that spans over the given
+        line of the feature file, or None when the line comes before
+        the first scenario"""
+        return scenario_at([scenario.described_at and
+                            scenario.described_at.line
+                            for scenario in self.scenarios], line)
+
     def represented(self):
         length = self.max_length + 1
 
@@ -1195,7 +1417,9 @@ class Feature(object):
 
         return background, scenarios, description
 
-    def run(self, scenarios=None, ignore_case=True, tags=None, random=False, failfast=False):
+    def run(self, scenarios=None, ignore_case=True, tags=None, random=False,
+            failfast=False, outline_sample=None, outline_pairwise=False,
+            outline_seed=None):
         call_hook('before_each', 'feature', self)
         scenarios_ran = []
 
@@ -1216,7 +1440,12 @@ class Feature(object):
                 if not scenario.matches_tags(tags):
                     continue
 
-                scenarios_ran.extend(scenario.run(ignore_case, failfast=failfast))
+                scenarios_ran.extend(scenario.run(
+                    ignore_case,
+                    failfast=failfast,
+                    outline_sample=outline_sample,
+                    outline_pairwise=outline_pairwise,
+                    outline_seed=outline_seed))
         except:
             if failfast:
                 call_hook('after_each', 'feature', self)
@@ -1241,9 +1470,10 @@ class FeatureResult(object):
 class ScenarioResult(object):
     """Object that holds results of each step ran from within a scenario"""
     def __init__(self, scenario, steps_passed, steps_failed, steps_skipped,
-                 steps_undefined):
+                 steps_undefined, resources=None):
 
         self.scenario = scenario
+        self.resources = resources
 
         self.steps_passed = steps_passed
         self.steps_failed = steps_failed
@@ -1259,6 +1489,9 @@ class ScenarioResult(object):
 
 
 class TotalResult(object):
+    # the changes of timing that failed a comparison with a baseline
+    regressions = ()
+
     def __init__(self, feature_results):
         self.feature_results = feature_results
         self.scenario_results = []
@@ -1266,10 +1499,17 @@ class TotalResult(object):
         self.steps_failed = 0
         self.steps_skipped = 0
         self.steps_undefined = 0
+        self.outlines_skipped = 0
         self._proposed_definitions = []
         self.steps = 0
         for feature_result in self.feature_results:
+            scenarios = set()
             for scenario_result in feature_result.scenario_results:
+                if scenario_result.scenario not in scenarios:
+                    scenarios.add(scenario_result.scenario)
+                    self.outlines_skipped += \
+                        scenario_result.scenario.outlines_skipped
+
                 self.scenario_results.append(scenario_result)
                 self.steps_passed += len(scenario_result.steps_passed)
                 self.steps_failed += len(scenario_result.steps_failed)
@@ -24,7 +24,11 @@ from django.test.utils import setup_test_environment
 from django.test.utils import teardown_test_environment
 
 from lettuce import Runner
+from lettuce import load_terrain
 from lettuce import registry
+from lettuce import tags as tag_options
+from lettuce.load import LoadTest
+from lettuce.budget import parse_duration
 
 from lettuce.django.server import Server
 from lettuce.django import harvest_lettuces
@@ -79,11 +83,23 @@ class Command(BaseCommand):
         make_option('--xunit-file', action='store', dest='xunit_file', default=None,
             help='Write JUnit XML to this file. Defaults to lettucetests.xml'),
 
+        make_option('--xunit-per-scenario', action='store_true', dest='xunit_per_scenario', default=False,
+            help='Write one JUnit test case per scenario and outline example, instead of one per step'),
+
         make_option("--failfast", dest="failfast", default=False,
                     action="store_true", help='Stop running in the first failure'),
 
         make_option("--pdb", dest="auto_pdb", default=False,
                     action="store_true", help='Launches an interactive debugger upon error'),
+
+        make_option("--load", dest="load", default=None, type="int",
+                    help='Instead of testing, replays the selected scenarios '
+                    'with this many concurrent virtual users against the '
+                    'test server and reports their throughput and latencies'),
+
+        make_option("--duration", dest="duration", default="60s",
+                    help='How long the --load test lasts, e.g. 90s or 5m '
+                    '(default: 60s)'),
     )
 
     def stopserver(self, failed=False):
@@ -102,15 +118,29 @@ class Command(BaseCommand):
 
         return paths
 
+    def load_test(self, paths, options, tags):
+        try:
+            seconds = parse_duration(options.get('duration'))
+        except ValueError, e:
+            raise SystemExit(e)
+
+        paths = [isinstance(path, tuple) and path[0] or path
+                 for path in paths]
+        load = LoadTest(paths, options['load'], seconds,
+                        options.get('scenarios'), tags).run()
+        sys.stdout.write(load.report().encode('utf-8'))
+        return load.passed
+
     def handle(self, *args, **options):
         setup_test_environment()
+        load_terrain()
 
         verbosity = int(options.get('verbosity', 4))
         apps_to_run = tuple(options.get('apps', '').split(","))
         apps_to_avoid = tuple(options.get('avoid_apps', '').split(","))
         run_server = not options.get('no_server', False)
         test_database = options.get('test_database', False)
-        tags = options.get('tags', None)
+        tags = tag_options.parse(options.get('tags', None))
         failfast = options.get('failfast', False)
         auto_pdb = options.get('auto_pdb', False)
 
@@ -151,6 +181,10 @@ class Command(BaseCommand):
         registry.call_hook('before', 'harvest', locals())
         results = []
         try:
+            if options.get('load'):
+                failed = not self.load_test(paths, options, tags)
+                paths = []
+
             for path in paths:
                 app_module = None
                 if isinstance(path, tuple) and len(path) is 2:
@@ -162,6 +196,7 @@ class Command(BaseCommand):
                 runner = Runner(path, options.get('scenarios'), verbosity,
                                 enable_xunit=options.get('enable_xunit'),
                                 xunit_filename=options.get('xunit_file'),
+                                xunit_per_scenario=options.get('xunit_per_scenario'),
                                 tags=tags, failfast=failfast, auto_pdb=auto_pdb)
 
                 result = runner.run()
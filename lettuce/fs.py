@@ -14,10 +14,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import re
 import os
 import imp
 import sys
+import json
+import re
 import codecs
 import fnmatch
 import zipfile
@@ -26,46 +27,197 @@ from glob import glob
 from os.path import abspath, join, dirname, curdir, exists
 
 
+# directories that never hold step definitions, and can be huge
+IGNORED_DIRS = (
+    '.git',
+    '.hg',
+    '.svn',
+    '.bzr',
+    '.tox',
+    '.venv',
+    'venv',
+    'node_modules',
+    '__pycache__',
+    '*.egg-info',
+)
+
+
+# the step definition files loaded so far by FeatureLoader, by path
+_loaded_step_files = set()
+
+
+def source_file(module):
+    """The absolute path of the python file a module was loaded from"""
+    filename = getattr(module, '__file__', None)
+    if not filename:
+        return None
+
+    if filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+
+    return FileSystem.abspath(filename)
+
+
+def imported_files(names, wanted):
+    """The files among `wanted` imported as the modules `names`"""
+    files = set([source_file(sys.modules.get(name)) for name in names])
+    return files & wanted
+
+
+def module_name(name, filename):
+    """The name a step definitions file is loaded as: its own, unless
+    a module of another file already took it"""
+    taken = sys.modules.get(name)
+    if taken is None or source_file(taken) == filename:
+        return name
+
+    return 'lettuce_steps_%s' % re.sub(r'\W', '_', filename)
+
+
 class FeatureLoader(object):
     """Loader class responsible for findind features and step
     definitions along a given path on filesystem"""
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, ignored_dirs=None, manifest_file=None):
         self.base_dir = FileSystem.abspath(base_dir)
+        self.ignored_dirs = list(IGNORED_DIRS) + list(ignored_dirs or [])
+        self.manifest_file = manifest_file
+
+    def find_step_definitions(self):
+        """Returns the python files under `base_dir`, or under the first
+        parent directory that has any, which may hold step
+        definitions. When there is a discovery manifest, the files
+        found in a previous run are reused as long as none of the
+        directories walked changed."""
+        manifest = None
+        if self.manifest_file:
+            manifest = DiscoveryManifest.load(self.manifest_file)
+            files = manifest.lookup(self.base_dir)
+            if files is not None:
+                return files
+
+            # the manifest may live inside one of the directories about
+            # to be walked, so it is created beforehand to keep it from
+            # changing their mtimes when saved
+            manifest.touch()
 
-    def find_and_load_step_definitions(self):
         # find steps, possibly up several directories
+        files = []
+        visited = {}
         base_dir = self.base_dir
         while base_dir != '/':
-            files = FileSystem.locate(base_dir, '*.py')
+            files = FileSystem.locate(base_dir, '*.py',
+                                      ignore=self.ignored_dirs,
+                                      visited=visited)
             if files:
                 break
-            base_dir = FileSystem.join(base_dir, '..')
+            base_dir = FileSystem.abspath(FileSystem.join(base_dir, '..'))
+
+        if manifest:
+            manifest.store(self.base_dir, files, visited)
+            manifest.save()
+
+        return files
 
+    def find_and_load_step_definitions(self):
+        # every file is loaded by its path, so that files of the same
+        # name in different directories are all loaded, and is executed
+        # exactly once, always taking fresh meat :) the files imported
+        # otherwise, say by terrain or by another step file, already ran
+        files = [FileSystem.abspath(name)
+                 for name in self.find_step_definitions()]
+        wanted = set(files)
+        names = set(sys.modules)
+        ran = imported_files(names, wanted) - _loaded_step_files
         for filename in files:
+            if filename in ran:
+                _loaded_step_files.add(filename)
+                continue
+
+            to_load = FileSystem.filename(filename, with_extension=False)
+            if not to_load:
+                # such as the lock files of some editors, ".#steps.py"
+                continue
+
             root = FileSystem.dirname(filename)
             sys.path.insert(0, root)
-            to_load = FileSystem.filename(filename, with_extension=False)
             try:
-                module = __import__(to_load)
+                imp.load_source(module_name(to_load, filename), filename)
             except ValueError, e:
-                import traceback
-                err_msg = traceback.format_exc(e)
-                if 'empty module name' in err_msg.lower():
-                    continue
-                else:
-                    e.args = ('{0} when importing {1}'
-                              .format(e, filename)),
-                    raise e
+                e.args = ('{0} when importing {1}'
+                          .format(e, filename)),
+                raise e
+            finally:
+                sys.path.remove(root)
 
-            reload(module)  # always take fresh meat :)
-            sys.path.remove(root)
+            ran.add(filename)
+            _loaded_step_files.add(filename)
+            if len(sys.modules) != len(names):
+                # step files imported by the one just loaded
+                new = set(sys.modules) - names
+                ran.update(imported_files(new, wanted))
+                names.update(new)
 
     def find_feature_files(self):
-        paths = FileSystem.locate(self.base_dir, "*.feature")
+        paths = FileSystem.locate(self.base_dir, "*.feature",
+                                  ignore=self.ignored_dirs)
         paths.sort()
         return paths
 
 
+class DiscoveryManifest(object):
+    """Remembers the step definition files found for each base dir,
+    along with the modification time of every directory walked to find
+    them, so that unchanged trees are not walked again"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+
+    @classmethod
+    def load(cls, filename):
+        manifest = cls(filename)
+        if FileSystem.exists(filename):
+            f = open(filename)
+            try:
+                manifest.entries = json.load(f)
+            except ValueError:
+                pass
+            finally:
+                f.close()
+
+        return manifest
+
+    def touch(self):
+        if not FileSystem.exists(self.filename):
+            open(self.filename, 'w').close()
+
+    def save(self):
+        f = open(self.filename, 'w')
+        try:
+            json.dump(self.entries, f)
+        finally:
+            f.close()
+
+    def lookup(self, base_dir):
+        """Returns the files found for `base_dir`, or None when any of
+        the directories walked changed since then"""
+        entry = self.entries.get(base_dir)
+        if not entry:
+            return None
+
+        for path, mtime in entry['dirs'].items():
+            try:
+                if os.path.getmtime(path) != mtime:
+                    return None
+            except OSError:
+                return None
+
+        return entry['files']
+
+    def store(self, base_dir, files, visited):
+        self.entries[base_dir] = {'files': files, 'dirs': visited}
+
+
 class FileSystem(object):
     """File system abstraction, mainly used for indirection, so that
     lettuce can be well unit-tested :)
@@ -77,17 +229,18 @@ class FileSystem(object):
 
     @classmethod
     def _import(cls, name):
-        sys.path.insert(0, cls.current_dir())
-        fp, pathname, description = imp.find_module(name)
-
+        current_dir = cls.current_dir()
+        sys.path.insert(0, current_dir)
         try:
-            module = imp.load_module(name, fp, pathname, description)
-            sys.path.remove(cls.current_dir())
-            return module
+            fp, pathname, description = imp.find_module(name)
+            try:
+                return imp.load_module(name, fp, pathname, description)
+            finally:
+                # Since we may exit via an exception, close fp explicitly.
+                if fp:
+                    fp.close()
         finally:
-            # Since we may exit via an exception, close fp explicitly.
-            if fp:
-                fp.close()
+            sys.path.remove(current_dir)
 
     @classmethod
     def pushd(cls, *path):
@@ -172,7 +325,10 @@ class FileSystem(object):
         '''Returns the absolute path for the given path.'''
         current_path = cls.current_dir()
         absolute_path = cls.abspath(path)
-        return re.sub("^" + re.escape(current_path), '', absolute_path).lstrip("/")
+        if absolute_path.startswith(current_path):
+            absolute_path = absolute_path[len(current_path):]
+
+        return absolute_path.lstrip("/")
 
     @classmethod
     def join(cls, *args):
@@ -190,12 +346,22 @@ class FileSystem(object):
         return os.walk(path)
 
     @classmethod
-    def locate(cls, path, match, recursive=True):
-        """Locate files recursively in a given path"""
+    def locate(cls, path, match, recursive=True, ignore=None, visited=None):
+        """Locate files recursively in a given path, skipping the
+        directories that match any of the `ignore` patterns. The
+        modification time of each directory walked is stored in the
+        `visited` dict, if given."""
         root_path = cls.abspath(path)
         if recursive:
             return_files = []
             for path, dirs, files in cls.walk(root_path):
+                if ignore and dirs:
+                    dirs[:] = [d for d in dirs if not any(
+                        fnmatch.fnmatch(d, pattern) for pattern in ignore)]
+
+                if visited is not None:
+                    visited[path] = os.path.getmtime(path)
+
                 for filename in fnmatch.filter(files, match):
                     return_files.append(cls.join(path, filename))
             return return_files
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A SQLite database of the results of every run: the duration and
+outcome of each scenario and step, along with the git revision and the
+host it ran on.
+
+Nothing is written while the run goes on: the results are kept in
+memory and inserted in a single transaction at the end. The database
+tells which scenarios got slower, which ones are flaky and which step
+definitions keep getting slower, and it can stand for the history file
+used by `--budget`."""
+import math
+import time
+import socket
+import sqlite3
+import subprocess
+
+from lettuce import budget
+from lettuce.plugins.jsonl_output import step_status
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+DEFAULT_DATABASE = '.lettuce-history.db'
+
+# runs looked at when estimating durations or looking for flaky
+# scenarios, by default
+DEFAULT_WINDOW = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    revision TEXT,
+    host TEXT,
+    passed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    scenario TEXT NOT NULL,
+    duration REAL NOT NULL,
+    passed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    definition TEXT,
+    sentence TEXT NOT NULL,
+    duration REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_by_id ON scenarios (scenario, run_id);
+CREATE INDEX IF NOT EXISTS steps_by_definition ON steps (definition, run_id);
+"""
+
+
+def git_revision(path=None):
+    """The commit checked out at `path`, if it is within a git
+    repository"""
+    try:
+        process = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=path,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        output = process.communicate()[0]
+    except OSError:
+        return None
+
+    return process.returncode == 0 and output.strip() or None
+
+
+def mean(values):
+    return sum(values) / float(len(values))
+
+
+def deviation(values):
+    average = mean(values)
+    return math.sqrt(sum([(value - average) ** 2 for value in values]) /
+                     max(len(values) - 1, 1))
+
+
+def slope(points):
+    """The slope of the least squares line through (x, y) `points`"""
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    x_mean, y_mean = mean(xs), mean(ys)
+    spread = sum([(x - x_mean) ** 2 for x in xs])
+    if not spread:
+        return 0.0
+
+    return sum([(x - x_mean) * (y - y_mean) for x, y in points]) / spread
+
+
+class Regression(object):
+    def __init__(self, scenario, latest, usual, spread, runs):
+        self.scenario = scenario
+        self.latest = latest
+        self.usual = usual
+        self.spread = spread
+        self.runs = runs
+
+    def __unicode__(self):
+        return u"%s: %.3fs, usually %.3fs +/- %.3fs over %d runs" % (
+            self.scenario, self.latest, self.usual, self.spread, self.runs)
+
+
+class Flaky(object):
+    def __init__(self, scenario, flips, failures, runs):
+        self.scenario = scenario
+        self.flips = flips
+        self.failures = failures
+        self.runs = runs
+
+    def __unicode__(self):
+        return u"%s: failed %d of %d runs, flipped %d times" % (
+            self.scenario, self.failures, self.runs, self.flips)
+
+
+class Growth(object):
+    def __init__(self, definition, per_run, latest, runs):
+        self.definition = definition
+        self.per_run = per_run
+        self.latest = latest
+        self.runs = runs
+
+    def __unicode__(self):
+        return u"%s: %+.3fms per run over %d runs, now %.3fs" % (
+            self.definition, self.per_run * 1000, self.runs, self.latest)
+
+
+class HistoryDatabase(object):
+    def __init__(self, filename=None):
+        self.filename = filename or DEFAULT_DATABASE
+        self.connection = sqlite3.connect(self.filename)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def save_run(self, started, duration, passed, scenarios, steps,
+                 revision=None, host=None):
+        """Inserts a run along with its `scenarios`, as (stable id,
+        duration, passed) and its `steps`, as (definition, sentence,
+        duration, status), at once"""
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (started, duration, revision, host, passed)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (started, duration, revision, host, int(passed)))
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO scenarios (run_id, scenario, duration, passed) '
+                'VALUES (?, ?, ?, ?)',
+                [(run_id, scenario, seconds, int(ok))
+                 for scenario, seconds, ok in scenarios])
+            self.connection.executemany(
+                'INSERT INTO steps (run_id, definition, sentence, duration, '
+                'status) VALUES (?, ?, ?, ?, ?)',
+                [(run_id,) + tuple(step) for step in steps])
+
+        return run_id
+
+    def run_ids(self, window=DEFAULT_WINDOW):
+        """The ids of the last `window` runs, oldest first"""
+        rows = self.connection.execute(
+            'SELECT id FROM runs ORDER BY id DESC LIMIT ?', (window,))
+        return sorted([row[0] for row in rows])
+
+    def scenario_runs(self, window=DEFAULT_WINDOW):
+        """The results of each scenario over the last `window` runs, as
+        {stable id: [(run id, started, duration, passed), ...]}"""
+        ids = self.run_ids(window)
+        results = {}
+        if not ids:
+            return results
+
+        rows = self.connection.execute(
+            'SELECT scenarios.scenario, runs.id, runs.started, '
+            'scenarios.duration, scenarios.passed '
+            'FROM scenarios JOIN runs ON runs.id = scenarios.run_id '
+            'WHERE runs.id >= ? ORDER BY runs.id', (ids[0],))
+        for scenario, run_id, started, duration, passed in rows:
+            results.setdefault(scenario, []).append(
+                (run_id, started, duration, bool(passed)))
+
+        return results
+
+    def regressions(self, window=DEFAULT_WINDOW, sigmas=3.0, minimum=0.05):
+        """The scenarios whose last duration is more than `sigmas`
+        standard deviations above their usual one, leaving out the ones
+        that got slower by less than `minimum` seconds"""
+        found = []
+        for scenario, runs in self.scenario_runs(window).items():
+            durations = [duration for _, _, duration, _ in runs]
+            if len(durations) < 3:
+                continue
+
+            latest, previous = durations[-1], durations[:-1]
+            usual, spread = mean(previous), deviation(previous)
+            if latest - usual > max(sigmas * spread, minimum):
+                found.append(Regression(scenario, latest, usual, spread,
+                                        len(previous)))
+
+        return sorted(found, key=lambda r: r.latest - r.usual, reverse=True)
+
+    def flaky(self, window=DEFAULT_WINDOW, flips=2):
+        """The scenarios that went from passing to failing, or back, at
+        least `flips` times"""
+        found = []
+        for scenario, runs in self.scenario_runs(window).items():
+            outcomes = [passed for _, _, _, passed in runs]
+            changes = len([1 for one, other in zip(outcomes, outcomes[1:])
+                           if one != other])
+            if changes >= flips:
+                found.append(Flaky(scenario, changes, outcomes.count(False),
+                                   len(outcomes)))
+
+        return sorted(found, key=lambda f: f.flips, reverse=True)
+
+    def growing_definitions(self, window=DEFAULT_WINDOW, minimum=0.001):
+        """The step definitions whose mean duration grows by more than
+        `minimum` seconds from one run to the next, the fastest growing
+        first"""
+        ids = self.run_ids(window)
+        if len(ids) < 3:
+            return []
+
+        rows = self.connection.execute(
+            'SELECT definition, run_id, AVG(duration) FROM steps '
+            'WHERE run_id >= ? AND definition IS NOT NULL '
+            'AND duration IS NOT NULL '
+            'GROUP BY definition, run_id ORDER BY run_id', (ids[0],))
+        by_definition = {}
+        for definition, run_id, duration in rows:
+            by_definition.setdefault(definition, []).append(
+                (ids.index(run_id), duration))
+
+        found = []
+        for definition, points in by_definition.items():
+            if len(points) < 3:
+                continue
+
+            per_run = slope(points)
+            if per_run > minimum:
+                found.append(Growth(definition, per_run, points[-1][1],
+                                    len(points)))
+
+        return sorted(found, key=lambda g: g.per_run, reverse=True)
+
+    def budget_history(self, window=DEFAULT_WINDOW):
+        """The durations and outcomes known to the database, in the
+        shape `--budget` expects"""
+        history = DatabaseHistory()
+        for scenario, runs in self.scenario_runs(window).items():
+            failed = [started for _, started, _, passed in runs
+                      if not passed]
+            history.scenarios[scenario] = {
+                'runs': len(runs),
+                'duration': mean([duration for _, _, duration, _ in runs]),
+                'failed_at': failed and max(failed) or None,
+                'ran_at': runs[-1][1],
+            }
+
+        return history
+
+
+class DatabaseHistory(budget.History):
+    """A history read from the database, which records the runs by
+    itself"""
+
+    def save(self):
+        pass
+
+
+def enable(database, revision=None):
+    """Records the run into `database` once it is over"""
+    current = {'scenarios': [], 'steps': [], 'failed': False}
+
+    @before.all
+    def start_recording():
+        current['started'] = time.time()
+
+    @before.each_scenario
+    def time_scenario(scenario):
+        current['scenario_started'] = time.time()
+        current['failed'] = False
+
+    @after.each_step
+    def record_step(step):
+        # undefined steps fail the scenario too, as they do the run
+        if step.failed or not step.defined_at:
+            current['failed'] = True
+
+        definition = step.defined_at
+        current['steps'].append((
+            definition and u"%s:%d" % (definition.file, definition.line),
+            step.sentence,
+            step.ran and step.wall_time or None,
+            step_status(step),
+        ))
+
+    @after.each_scenario
+    def record_scenario(scenario):
+        current['scenarios'].append((
+            scenario.stable_id,
+            time.time() - current['scenario_started'],
+            not current['failed'],
+        ))
+
+    @after.all
+    def save_run(total):
+        started = current.get('started') or time.time()
+        database.save_run(started, time.time() - started,
+                          total.steps == total.steps_passed,
+                          current['scenarios'], current['steps'],
+                          revision=revision or git_revision(),
+                          host=socket.gethostname())
+        database.close()
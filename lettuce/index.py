@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import json
+
+from lettuce.tags import tags_match
+
+DEFAULT_INDEX_FILE = '.lettuce-index'
+VERSION = 1
+
+
+def scenario_at(lines, line):
+    """Returns the number of the scenario that spans over `line`, given
+    the `lines` each scenario starts at, or None when it comes before
+    the first scenario"""
+    number = None
+    for index, start in enumerate(lines):
+        if start and start <= line:
+            number = index + 1
+
+    return number
+
+
+class SuiteIndex(object):
+    """Persistent index of the tags, names and lines of the scenarios of
+    each feature file, so that runs selecting scenarios by tag or by
+    number can skip parsing the feature files that have nothing to run.
+
+    Entries are keyed by absolute path and get refreshed whenever the
+    size or the modification time of the feature file change.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or DEFAULT_INDEX_FILE
+        self.features = {}
+        self.changed = False
+
+    @classmethod
+    def load(cls, filename=None):
+        index = cls(filename)
+        if not os.path.exists(index.filename):
+            return index
+
+        try:
+            f = open(index.filename)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except ValueError:
+            sys.stderr.write('Ignoring the corrupted index file %s\n' %
+                             index.filename)
+            return index
+
+        if data.get('version') == VERSION:
+            index.features = data.get('features', {})
+
+        return index
+
+    def save(self):
+        if not self.changed:
+            return
+
+        f = open(self.filename, 'w')
+        try:
+            json.dump({'version': VERSION, 'features': self.features}, f)
+        finally:
+            f.close()
+
+        self.changed = False
+
+    def _stat(self, filename):
+        stat = os.stat(filename)
+        return stat.st_mtime, stat.st_size
+
+    def lookup(self, filename):
+        """Returns the entry of the given feature file, or None when it
+        was not indexed yet or changed since then"""
+        entry = self.features.get(os.path.abspath(filename))
+        if entry and (entry['mtime'], entry['size']) == self._stat(filename):
+            return entry
+
+    def add(self, filename, feature):
+        """Indexes an already parsed feature"""
+        mtime, size = self._stat(filename)
+        scenarios = []
+        for scenario in feature.scenarios:
+            line = scenario.described_at and scenario.described_at.line
+            tags = isinstance(scenario.tags, list) and scenario.tags or []
+            scenarios.append({
+                'name': scenario.name,
+                'line': line,
+                'tags': tags,
+            })
+
+        entry = {
+            'mtime': mtime,
+            'size': size,
+            'scenarios': scenarios,
+        }
+        self.features[os.path.abspath(filename)] = entry
+        self.changed = True
+        return entry
+
+    def scenario_at(self, entry, line):
+        """The number of the indexed scenario spanning over `line`"""
+        return scenario_at([scenario['line']
+                            for scenario in entry['scenarios']], line)
+
+    def may_run(self, entry, scenarios=None, tags=None):
+        """Tells whether any scenario of the indexed feature would be ran
+        for the given scenario numbers and tags"""
+        for number, scenario in enumerate(entry['scenarios']):
+            if scenarios and (number + 1) not in scenarios:
+                continue
+
+            if tags_match(scenario['tags'], tags):
+                return True
+
+        return False
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Replays features as a load test: a number of virtual users, each a
+thread with its own copy of the features, run the selected scenarios
+over and over until the time is up. The throughput, error rate and
+latency percentiles are then reported for each step definition.
+
+Step definitions and hooks are shared by the virtual users, while
+`world` is kept apart for each of them, as it is local to threads."""
+import os
+import sys
+import time
+import thread
+import threading
+
+from lettuce import fs
+from lettuce import core
+from lettuce import benchmark
+from lettuce import load_terrain
+from lettuce.registry import call_hook
+from lettuce.benchmark import percentile, format_seconds
+from lettuce.terrain import after
+
+
+class Latencies(object):
+    """What one step definition did during the load test"""
+
+    def __init__(self, location, name):
+        self.location = location
+        self.name = name
+        self.durations = []
+        self.errors = 0
+
+    def merge(self, other):
+        self.durations.extend(other.durations)
+        self.errors += other.errors
+
+    @property
+    def calls(self):
+        return len(self.durations) + self.errors
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, number, features, deadline, scenarios=None,
+                 tags=None):
+        super(VirtualUser, self).__init__(name='lettuce-user-%d' % number)
+        self.daemon = True
+        self.features = features
+        self.deadline = deadline
+        self.scenarios = scenarios
+        self.tags = tags
+        self.ran = 0
+        self.failed = 0
+        self.errors = []
+
+    def selected(self, feature):
+        for index, scenario in enumerate(feature.scenarios):
+            if self.scenarios and (index + 1) not in self.scenarios:
+                continue
+
+            if scenario.matches_tags(self.tags):
+                yield scenario
+
+    def run(self):
+        while time.time() < self.deadline:
+            # the steps keep what happened when they ran, so each pass
+            # parses the features again, and no two users share a step
+            for filename in self.features:
+                feature = core.Feature.from_file(filename)
+                if not self.run_feature(feature):
+                    return
+
+    def run_feature(self, feature):
+        """Runs the selected scenarios of `feature`, telling whether
+        there is time left"""
+        call_hook('before_each', 'feature', feature)
+        try:
+            for scenario in self.selected(feature):
+                if time.time() >= self.deadline:
+                    return False
+
+                try:
+                    results = scenario.run(True)
+                except Exception, e:
+                    self.errors.append(e)
+                    results = []
+                    self.failed += 1
+
+                self.ran += len(results)
+                self.failed += len([r for r in results if not r.passed])
+        finally:
+            call_hook('after_each', 'feature', feature)
+
+        return time.time() < self.deadline
+
+
+class LoadTest(object):
+    """Runs the features found at `paths` with `users` virtual users
+    for `seconds`"""
+
+    def __init__(self, paths, users, seconds, scenarios=None, tags=None):
+        self.paths = paths
+        self.users = users
+        self.seconds = seconds
+        self.scenarios = scenarios and map(int, scenarios.split(",")) or None
+        self.tags = tags
+        self.latencies = {}
+        self.elapsed = 0.0
+        self.ran = 0
+        self.failed = 0
+        self.by_thread = {}
+
+    def find_features(self):
+        """Loads the step definitions and finds the feature files of
+        each path, which is either a directory or a feature file"""
+        features = []
+        for path in self.paths:
+            if os.path.isfile(path):
+                loader = fs.FeatureLoader(os.path.dirname(path))
+                files = [path]
+            else:
+                loader = fs.FeatureLoader(path)
+                files = loader.find_feature_files()
+
+            sys.path.insert(0, loader.base_dir)
+            try:
+                loader.find_and_load_step_definitions()
+            finally:
+                sys.path.remove(loader.base_dir)
+
+            features.extend(files)
+
+        return features
+
+    def record(self, step):
+        """Counts a step ran by one of the virtual users, which record
+        in latencies of their own so that they do not need a lock"""
+        definition = step.defined_at
+        # the steps skipped after a failure neither ran nor failed
+        if definition and not step.ran and not step.failed:
+            return
+
+        latencies = self.by_thread.setdefault(thread.get_ident(), {})
+        if definition:
+            key = u"%s:%d" % (definition.file, definition.line)
+            name = definition.function.__name__
+        else:
+            key, name = u"(undefined)", step.sentence
+
+        if key not in latencies:
+            latencies[key] = Latencies(key, name)
+
+        if step.failed or not definition:
+            latencies[key].errors += 1
+        else:
+            latencies[key].durations.append(step.wall_time or 0.0)
+
+    def run(self):
+        load_terrain()
+        features = self.find_features()
+        benchmark.load_steps()
+        after.each_step(self.record)
+
+        call_hook('before', 'all')
+        started = time.time()
+        users = [VirtualUser(number, features, started + self.seconds,
+                             self.scenarios, self.tags)
+                 for number in range(self.users)]
+        for user in users:
+            user.start()
+
+        for user in users:
+            user.join()
+
+        self.elapsed = time.time() - started
+        self.ran = sum([user.ran for user in users])
+        self.failed = sum([user.failed for user in users])
+        for latencies in self.by_thread.values():
+            for key, found in latencies.items():
+                if key not in self.latencies:
+                    self.latencies[key] = Latencies(key, found.name)
+
+                self.latencies[key].merge(found)
+
+        call_hook('after', 'all', core.TotalResult([]))
+        return self
+
+    @property
+    def passed(self):
+        return self.ran > 0 and not self.failed
+
+    def report(self):
+        elapsed = self.elapsed or 1.0
+        lines = [
+            u"%d virtual users for %.1fs" % (self.users, self.elapsed),
+            u"%d scenarios ran (%.1f/s), %d failed (%.1f%%)" % (
+                self.ran, self.ran / elapsed, self.failed,
+                self.ran and 100.0 * self.failed / self.ran or 0),
+            u"",
+            u"%8s %8s %7s %9s %9s %9s  %s" % (
+                u"calls", u"rate/s", u"errors", u"p50", u"p95", u"p99",
+                u"step definition"),
+        ]
+        ordered = sorted(self.latencies.values(),
+                         key=lambda latencies: latencies.calls, reverse=True)
+        for latencies in ordered:
+            durations = latencies.durations or [0.0]
+            lines.append(u"%8d %8.1f %6.1f%% %9s %9s %9s  %s (%s)" % (
+                latencies.calls, latencies.calls / elapsed,
+                100.0 * latencies.errors / (latencies.calls or 1),
+                format_seconds(percentile(durations, 50)),
+                format_seconds(percentile(durations, 95)),
+                format_seconds(percentile(durations, 99)),
+                latencies.location, latencies.name))
+
+        return u"\n".join(lines) + u"\n"
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Merges the reports written by several runs of lettuce, such as the
+shards of a suite split across machines, into a single report with the
+right totals.
+
+The inputs are read one at a time and, except for the Cucumber JSON
+ones, as a stream, while the merged report is written as they are
+read; so thousands of shard reports can be merged without holding them
+in memory. Only the identifiers of the scenarios already merged are
+kept: a scenario found in more than one input, say because its shard
+was retried, is taken from the first input it was found in."""
+import os
+import json
+from xml.etree import cElementTree as ElementTree
+
+from lettuce.plugins.jsonl_output import EventStream, open_target
+from lettuce.plugins.xunit_output import XUnitReport
+
+XUNIT = 'xunit'
+JSONL = 'jsonl'
+CUCUMBER = 'cucumber'
+
+FORMATS = {'<': XUNIT, '{': JSONL, '[': CUCUMBER}
+
+# the totals of the merged reports, in the order they are told in
+JSONL_TOTALS = ('features', 'features_passed', 'scenarios',
+                'scenarios_passed', 'steps', 'steps_passed', 'steps_failed',
+                'steps_skipped', 'steps_undefined')
+XUNIT_TOTALS = ('tests', 'failures', 'errors', 'skipped')
+TOTALS = JSONL_TOTALS + XUNIT_TOTALS
+
+
+def sniff(filename):
+    """Tells the format of a report from its first character, or None
+    for an empty one"""
+    with open(filename) as stream:
+        head = stream.read(64).lstrip('\xef\xbb\xbf \t\r\n')
+
+    if not head:
+        return None
+
+    if head[0] not in FORMATS:
+        raise ValueError('%s is not a xunit, JSON lines or Cucumber JSON '
+                         'report' % filename)
+
+    return FORMATS[head[0]]
+
+
+def expand(paths):
+    """Yields the files given, looking into the directories given for
+    the files within"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for name in sorted(os.listdir(path)):
+            filename = os.path.join(path, name)
+            if os.path.isfile(filename):
+                yield filename
+
+
+class Merge(object):
+    """Counts what went into a merged report"""
+
+    def __init__(self):
+        self.inputs = 0
+        self.duplicates = 0
+        self.totals = {}
+
+    def __unicode__(self):
+        totals = u", ".join([u"%s %s" % (self.totals[key], key)
+                             for key in TOTALS if key in self.totals])
+        return u"%d reports merged (%s), %d duplicates dropped" % (
+            self.inputs, totals, self.duplicates)
+
+
+def case_id(testcase):
+    """The id written into the properties of a xunit test case, if any"""
+    for prop in testcase.iterfind('properties/property'):
+        if prop.get('name') == 'scenario.id':
+            return prop.get('value')
+
+
+def merge_xunit(filenames, output):
+    merge = Merge()
+    report = XUnitReport(output)
+    timestamps = []
+    seconds = 0.0
+    seen = set()
+
+    report.start()
+    for filename in filenames:
+        merge.inputs += 1
+        merged = set()
+        root = None
+        for event, element in ElementTree.iterparse(filename,
+                                                    ('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                    if root.get('timestamp'):
+                        timestamps.append(root.get('timestamp'))
+                continue
+
+            if element.tag != 'testcase':
+                continue
+
+            # test cases written without --xunit-ids fall back to
+            # their names
+            key = case_id(element) or (element.get('classname'),
+                                       element.get('name'))
+            if key in seen:
+                merge.duplicates += 1
+            else:
+                merged.add(key)
+                kind = None
+                for child in element:
+                    if child.tag in ('failure', 'error', 'skipped'):
+                        kind = child.tag
+
+                seconds += float(element.get('time') or 0)
+                element.tail = None
+                report.write(ElementTree.tostring(element, 'utf-8'), kind)
+
+            # drops the test cases read so far
+            root.clear()
+
+        seen.update(merged)
+
+    if timestamps:
+        report.timestamp = min(timestamps)
+
+    merge.totals.update([
+        ('tests', report.counts['tests']),
+        ('failures', report.counts['failure']),
+        ('errors', report.counts['error']),
+        ('skipped', report.counts['skipped']),
+    ])
+    report.finish(seconds=seconds)
+    return merge
+
+
+def merge_jsonl(filenames, output):
+    merge = Merge()
+    stream = open_target(output)
+    events = EventStream(stream)
+    # the features and proposals in the order they were first found
+    features = {}
+    feature_order = []
+    proposals = []
+    proposed = set()
+    seen = set()
+    totals = dict([(key, 0) for key in JSONL_TOTALS])
+
+    events.emit('run_start', shards=len(filenames))
+
+    for filename in filenames:
+        merge.inputs += 1
+        merged = set()
+        feature = scenario = None
+        outline = False
+        statuses = []
+        skipping = False
+
+        for line in open(filename):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                # the last line of a shard that got killed
+                continue
+
+            event = data.get('event')
+            if event in ('run_start', 'run_end'):
+                continue
+
+            if event == 'proposal':
+                if data['sentence'] not in proposed:
+                    proposed.add(data['sentence'])
+                    proposals.append(line)
+                continue
+
+            if event == 'feature_start':
+                feature = data.get('file') or data.get('feature')
+                if feature not in features:
+                    features[feature] = {'name': data.get('feature'),
+                                         'duration': 0.0, 'passed': True}
+                    feature_order.append(feature)
+                    stream.write(line)
+                continue
+
+            if event == 'feature_end':
+                features[feature]['duration'] += data.get('duration') or 0
+                continue
+
+            if event == 'scenario_start':
+                scenario = data['id']
+                outline = data.get('outline')
+                statuses = []
+                skipping = scenario in seen
+                if skipping:
+                    merge.duplicates += 1
+                else:
+                    merged.add(scenario)
+
+            if skipping:
+                continue
+
+            stream.write(line)
+            if event == 'step' and not data.get('background'):
+                totals['steps'] += 1
+                totals['steps_%s' % data['status']] += 1
+                statuses.append(data['status'])
+
+            elif event == 'outline_row' or (event == 'scenario_end' and
+                                            not outline):
+                # outlines count as one scenario for each example ran
+                totals['scenarios'] += 1
+                if statuses and set(statuses) == set(['passed']):
+                    totals['scenarios_passed'] += 1
+                else:
+                    features[feature]['passed'] = False
+
+                statuses = []
+
+        seen.update(merged)
+
+    for feature in [features[key] for key in feature_order]:
+        totals['features'] += 1
+        totals['features_passed'] += int(feature['passed'])
+        events.emit('feature_end', feature=feature['name'],
+                    duration=feature['duration'])
+
+    for line in proposals:
+        stream.write(line)
+
+    events.emit('run_end', **totals)
+    events.flush()
+    if output != '-':
+        stream.close()
+
+    merge.totals.update(totals)
+    return merge
+
+
+def merge_cucumber(filenames, output):
+    merge = Merge()
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    seen = set()
+    uris = set()
+    written = 0
+    totals = {'features': 0, 'scenarios': 0, 'steps': 0}
+
+    stream = open(output, 'w')
+    stream.write('[')
+    for filename in filenames:
+        merge.inputs += 1
+        merged = set()
+        # a Cucumber JSON report is a single document, so each is loaded
+        # on its own
+        with open(filename) as report:
+            features = json.load(report)
+
+        for feature in features:
+            elements = []
+            background = None
+            for element in feature.get('elements', []):
+                if element.get('type') == 'background':
+                    background = element
+                    continue
+
+                # the element ids number the scenarios named alike, just
+                # like their stable ids
+                key = (feature.get('uri'), element.get('id'))
+                if key in seen:
+                    merge.duplicates += 1
+                else:
+                    merged.add(key)
+                    elements.extend(background and [background] or [])
+                    elements.append(element)
+                    totals['scenarios'] += 1
+                    totals['steps'] += len(element.get('steps', []))
+
+                background = None
+
+            if not elements:
+                continue
+
+            uris.add(feature.get('uri'))
+            feature['elements'] = elements
+            stream.write((written and ',' or '') + encode(feature))
+            written += 1
+
+        seen.update(merged)
+        del features
+
+    stream.write(']')
+    stream.close()
+
+    totals['features'] = len(uris)
+    merge.totals.update(totals)
+    return merge
+
+
+MERGERS = {XUNIT: merge_xunit, JSONL: merge_jsonl, CUCUMBER: merge_cucumber}
+
+
+def merge_reports(paths, output):
+    """Merges the reports found in `paths`, which must all be of the
+    same format, into `output`"""
+    filenames = []
+    kinds = set()
+    for filename in expand(paths):
+        if os.path.abspath(filename) == os.path.abspath(output):
+            continue
+
+        kind = sniff(filename)
+        if kind is None:
+            continue
+
+        kinds.add(kind)
+        filenames.append(filename)
+
+    if not filenames:
+        raise ValueError('there are no reports to merge')
+
+    if len(kinds) > 1:
+        raise ValueError('can not merge reports of different formats: %s' %
+                         ', '.join(sorted(kinds)))
+
+    return MERGERS[kinds.pop()](filenames, output)
@@ -16,21 +16,24 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import re
-import sys
 
 from lettuce import core
-from lettuce import strings
 from lettuce import terminal
 
 from lettuce.terrain import after
 from lettuce.terrain import before
 from lettuce.terrain import world
 
+if os.name == 'nt':
+    try:
+        from colorama import init as ms_windows_workaround
+        ms_windows_workaround()
+    except ImportError:
+        pass
+
 
 def wrt(what):
-    if isinstance(what, unicode):
-        what = what.encode('utf-8')
-    sys.stdout.write(what)
+    terminal.sink.write(what)
 
 
 def wrap_file_and_line(string, start, end):
@@ -56,11 +59,16 @@ def write_out(what):
     wrt(wp(what))
 
 
-@before.each_step
 def print_step_running(step):
     if not step.defined_at:
         return
 
+    outline = step.scenario and step.scenario.outlines
+    if terminal.sink.append_only and not outline:
+        # the step gets printed once it ran, since the line can not be
+        # rewritten afterwards
+        return
+
     color = '\033[1;30m'
 
     if step.scenario and step.scenario.outlines:
@@ -74,7 +82,6 @@ def print_step_running(step):
             write_out("\033[1;30m%s\033[0m\n" % line)
 
 
-@after.each_step
 def print_step_ran(step):
 
     if step.subsequent_outline:
@@ -83,7 +90,8 @@ def print_step_ran(step):
     if step.scenario and step.scenario.outlines and (step.failed or step.passed or step.defined_at):
         return
 
-    if step.hashes and step.defined_at:
+    append_only = terminal.sink.append_only
+    if step.hashes and step.defined_at and not append_only:
         write_out("\033[A" * (len(step.hashes) + 1))
 
     string = step.represent_string(step.original_sentence)
@@ -115,6 +123,9 @@ def print_step_ran(step):
         color = "\033[0;33m"
         prefix = ""
 
+    if append_only:
+        prefix = ""
+
     write_out("%s%s%s" % (prefix, color, string))
 
     if step.hashes:
@@ -134,7 +145,6 @@ def print_step_ran(step):
         wrt("\033[0m\n")
 
 
-@before.each_scenario
 def print_scenario_running(scenario):
     if scenario.background:
         # Only print the background on the first scenario run
@@ -151,22 +161,16 @@ def print_scenario_running(scenario):
     write_out("\n\033[1;37m%s" % string)
 
 
-@after.outline
 def print_outline(scenario, order, outline, reasons_to_fail):
-    table = strings.dicts_to_string(scenario.outlines, scenario.keys)
-    lines = table.splitlines()
-    head = lines.pop(0)
-
     wline = lambda x: write_out("\033[0;36m%s%s\033[0m\n" % (" " * scenario.table_indentation, x))
     wline_success = lambda x: write_out("\033[1;32m%s%s\033[0m\n" % (" " * scenario.table_indentation, x))
     wline_red = lambda x: wrt("%s%s" % (" " * scenario.table_indentation, x))
-    if order is 0:
+    if order == scenario.outline_indexes[0]:
         wrt("\n")
         wrt("\033[1;37m%s%s:\033[0m\n" % (" " * scenario.indentation, scenario.language.first_of_examples))
-        wline(head)
+        wline(scenario.represent_examples_head())
 
-    line = lines[order]
-    wline_success(line)
+    wline_success(scenario.represent_example(order))
     if reasons_to_fail:
         elines = reasons_to_fail[0].traceback.splitlines()
         wrt("\033[1;31m")
@@ -178,7 +182,13 @@ def print_outline(scenario, order, outline, reasons_to_fail):
         wrt("\033[0m\n")
 
 
-@before.each_feature
+def print_benchmark(scenario):
+    statistics = scenario.benchmark_statistics
+    if statistics and not scenario.outlines:
+        write_out("\n\033[1;30m%sBenchmark: %s\033[0m\n" % (
+            " " * scenario.table_indentation, statistics.summary()))
+
+
 def print_feature_running(feature):
     string = feature.represented()
     lines = string.splitlines()
@@ -189,7 +199,6 @@ def print_feature_running(feature):
         write_out("\033[1;37m%s\n" % line)
 
 
-@after.all
 def print_end(total):
     write_out("\n")
 
@@ -239,6 +248,12 @@ def print_end(total):
         word,
         content))
 
+    if total.outlines_skipped:
+        word = total.outlines_skipped > 1 and "rows" or "row"
+        write_out("\033[1;37m%d outline %s \033[0;36mskipped by sampling\033[0m\n" % (
+            total.outlines_skipped,
+            word))
+
     if total.proposed_definitions:
         wrt("\n\033[0;33mYou can implement step definitions for undefined steps with these snippets:\n\n")
         wrt("# -*- coding: utf-8 -*-\n")
@@ -265,9 +280,9 @@ def print_no_features_found(where):
     write_out(
         '\033[1;37mcould not find features at '
         '\033[1;33m%s\033[0m\n' % where)
+    terminal.sink.flush()
 
 
-@before.each_background
 def print_background_running(background):
     wrt('\n')
     wrt('\033[1;37m')
@@ -275,7 +290,21 @@ def print_background_running(background):
     wrt('\033[0m\n')
 
 
-@after.each_background
 def print_first_scenario_running(background, results):
     scenario = world.background_scenario_holder[background]
     print_scenario_running(scenario)
+
+
+def enable():
+    before.each_step(print_step_running)
+    after.each_step(print_step_ran)
+    before.each_scenario(print_scenario_running)
+    after.outline(print_outline)
+    before.each_feature(print_feature_running)
+    after.each_scenario(print_benchmark)
+    after.all(print_end)
+    before.each_background(print_background_running)
+    after.each_background(print_first_scenario_running)
+    before.each_step(terminal.sink.flush)
+    after.each_scenario(terminal.sink.flush)
+    after.all(terminal.sink.flush)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Runs cProfile around each scenario, each feature or the whole run,
+writing a .pstats file for each of them plus one for the whole run,
+which can be opened with the pstats module or tools such as snakeviz
+or gprof2dot.
+
+The files of scenarios are named after their stable id, and the ones
+of features after their file, so the profile of a scenario is found at
+the same place from one run to the next."""
+import os
+import re
+import time
+import pstats
+import hashlib
+import cProfile
+
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+UNITS = ('scenario', 'feature', 'run')
+DEFAULT_DIRECTORY = 'lettuce-profiles'
+MERGED_PROFILE = 'run.pstats'
+
+
+def profile_name(identifier):
+    """A file name made of `identifier`, along with a digest of it so
+    that identifiers that only differ by punctuation do not clash"""
+    if isinstance(identifier, unicode):
+        identifier = identifier.encode('utf-8')
+
+    slug = re.sub(r'[^\w.-]+', '_', identifier).strip('_')[-120:]
+    digest = hashlib.md5(identifier).hexdigest()[:8]
+    return '%s-%s.pstats' % (slug, digest)
+
+
+class Profiles(object):
+    """Profiles one unit at a time, adding each of them up into the
+    profile of the whole run"""
+
+    def __init__(self, directory, threshold=None):
+        self.directory = directory
+        self.threshold = threshold
+        self.merged = None
+        self.saved = []
+        self.profiler = None
+
+    def start(self):
+        self.started = time.time()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self, identifier=None):
+        """Stops profiling the current unit, saving its profile when it
+        has an `identifier` and took at least the threshold"""
+        if self.profiler is None:
+            return
+
+        self.profiler.disable()
+        seconds = time.time() - self.started
+        stats = pstats.Stats(self.profiler)
+        self.profiler = None
+
+        if self.merged is None:
+            self.merged = stats
+        else:
+            self.merged.add(stats)
+
+        if identifier is None:
+            return
+
+        if self.threshold is not None and seconds < self.threshold:
+            return
+
+        filename = os.path.join(self.directory, profile_name(identifier))
+        stats.dump_stats(filename)
+        self.saved.append(filename)
+
+    def finish(self):
+        if self.merged is not None:
+            self.merged.dump_stats(os.path.join(self.directory,
+                                                MERGED_PROFILE))
+
+
+def enable(unit='scenario', directory=None, threshold=None):
+    """Profiles each `unit` of the run, either 'scenario', 'feature' or
+    'run', into `directory`. With a `threshold`, in seconds, only the
+    profiles of the scenarios or features that took longer are kept,
+    though all of them add up to the profile of the run"""
+    if unit not in UNITS:
+        raise ValueError('Can not profile each %r, try one of: %s' % (
+            unit, ', '.join(UNITS)))
+
+    directory = directory or DEFAULT_DIRECTORY
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    profiles = Profiles(directory, threshold)
+
+    if unit == 'run':
+        @before.all
+        def profile_run():
+            profiles.start()
+
+    elif unit == 'feature':
+        @before.each_feature
+        def profile_feature(feature):
+            profiles.start()
+
+        @after.each_feature
+        def save_feature(feature):
+            where = feature.described_at
+            profiles.stop(where and where.file or feature.name)
+
+    else:
+        @before.each_scenario
+        def profile_scenario(scenario):
+            profiles.start()
+
+        @after.each_scenario
+        def save_scenario(scenario):
+            profiles.stop(scenario.stable_id)
+
+    @after.all
+    def save_run(total):
+        profiles.stop()
+        profiles.finish()
+
+    return profiles
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Writes the results in the JSON format of Cucumber, which most
+reporting tools understand.
+
+The report is written as the run goes: the head of each feature when
+it starts, each scenario, background or outline example once it ran
+and the closing brackets at the end, so memory use does not grow with
+the size of the suite."""
+import re
+import json
+import time
+
+from lettuce.terrain import after
+from lettuce.terrain import before
+from lettuce.plugins.jsonl_output import location, step_status
+
+
+def slug(name):
+    return re.sub(r'\s+', '-', name.strip().lower())
+
+
+def scenario_slug(scenario):
+    """The slug of the scenario name, numbered like `Scenario.stable_id`
+    when an earlier scenario of the feature has the same name"""
+    if scenario.namesake:
+        return u'%s-%d' % (slug(scenario.name), scenario.namesake + 1)
+
+    return slug(scenario.name)
+
+
+def tags_of(thing, line):
+    return [{'name': u'@%s' % tag, 'line': line}
+            for tag in sorted(thing.tags or [])]
+
+
+def step_json(step, duration):
+    filename, line = location(step)
+    parts = step.sentence.split(u' ', 1)
+    keyword, name = len(parts) == 2 and parts or (u'', parts[0])
+    result = {'status': step_status(step), 'duration': int(duration * 1e9)}
+    if step.failed:
+        result['error_message'] = step.why.traceback
+
+    data = {
+        'keyword': keyword + u' ',
+        'name': name,
+        'line': line,
+        'result': result,
+    }
+    if step.defined_at:
+        data['match'] = {'location': u'%s:%s' % (step.defined_at.file,
+                                                  step.defined_at.line)}
+    return data
+
+
+class CucumberReport(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self.stream = None
+        self.encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def start(self):
+        self.stream = open(self.filename, 'w')
+        self.stream.write('[')
+        self.features = 0
+
+    def start_feature(self, feature):
+        filename, line = location(feature)
+        head = self.encode({
+            'uri': filename,
+            'id': slug(feature.name),
+            'keyword': feature.language.first_of_feature,
+            'name': feature.name,
+            'description': feature.description,
+            'line': line,
+            'tags': tags_of(feature, line),
+        })
+        # the elements get appended as they run
+        self.stream.write((self.features and ',' or '') + head[:-1] +
+                          ',"elements":[')
+        self.features += 1
+        self.elements = 0
+
+    def add(self, element):
+        self.stream.write((self.elements and ',' or '') +
+                          self.encode(element))
+        self.elements += 1
+
+    def end_feature(self):
+        self.stream.write(']}')
+        self.stream.flush()
+
+    def finish(self):
+        if self.stream is None:
+            return
+
+        self.stream.write(']')
+        self.stream.close()
+        self.stream = None
+
+
+def enable(filename):
+    report = CucumberReport(filename)
+    current = {'started': None, 'steps': [], 'background': []}
+
+    def restart():
+        current['started'] = time.time()
+        current['steps'] = []
+        current['background'] = []
+
+    def add_elements(scenario, keyword, name, element_id):
+        filename, line = location(scenario)
+        if current['background']:
+            report.add({
+                'keyword': u'Background',
+                'name': u'',
+                'description': u'',
+                'line': current['background'][0]['line'],
+                'type': 'background',
+                'steps': current['background'],
+            })
+
+        report.add({
+            'id': element_id,
+            'keyword': keyword,
+            'name': name,
+            'description': u'',
+            'line': line,
+            'type': 'scenario',
+            'tags': tags_of(scenario, line),
+            'steps': current['steps'],
+        })
+
+    @before.all
+    def start_report():
+        report.start()
+
+    @before.each_feature
+    def start_feature(feature):
+        report.start_feature(feature)
+
+    @after.each_feature
+    def end_feature(feature):
+        report.end_feature()
+
+    @before.each_scenario
+    def start_scenario(scenario):
+        restart()
+
+    @before.each_step
+    def time_step(step):
+        step.cucumber_started = time.time()
+
+    @after.each_step
+    def collect_step(step):
+        started = getattr(step, 'cucumber_started', None)
+        duration = started and time.time() - started or 0
+        kind = step.background is not None and 'background' or 'steps'
+        current[kind].append(step_json(step, duration))
+
+    @after.outline
+    def add_example(scenario, order, outline, reasons_to_fail):
+        add_elements(scenario, scenario.language.first_of_scenario_outline,
+                     scenario.name, u'%s;%s;;%d' % (
+                         slug(scenario.feature.name), scenario_slug(scenario),
+                         order + 2))
+        restart()
+
+    @after.each_scenario
+    def add_scenario(scenario):
+        if scenario.outlines:
+            return
+
+        add_elements(scenario, scenario.language.first_of_scenario,
+                     scenario.name, u'%s;%s' % (slug(scenario.feature.name),
+                                                scenario_slug(scenario)))
+
+    @after.all
+    def finish_report(total):
+        report.finish()
+
+    return report
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Writes one JSON object per line for each event of the run: features,
+scenarios, outline examples and steps starting or ending, the time
+taken by the hooks of the project and the definitions proposed for
+undefined steps.
+
+Each line is self-contained, so the stream can be followed while the
+run goes on, and the streams of several workers can be concatenated or
+merged with `lettuce merge-reports`."""
+import os
+import sys
+import json
+import time
+import socket
+
+from lettuce import registry
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+
+def open_target(target):
+    """Opens a path, "-" for stdout or "fd:N" for an inherited file
+    descriptor"""
+    if target == '-':
+        return sys.stdout
+
+    if target.startswith('fd:'):
+        return os.fdopen(int(target[3:]), 'w')
+
+    return open(target, 'w')
+
+
+def step_status(step):
+    if step.failed:
+        return 'failed'
+
+    if step.passed:
+        return 'passed'
+
+    if not step.defined_at:
+        return 'undefined'
+
+    return 'skipped'
+
+
+def location(thing):
+    where = thing.described_at
+    return where and where.file, where and where.line
+
+
+class EventStream(object):
+    def __init__(self, stream):
+        self.stream = stream
+        self.encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def emit(self, event, **data):
+        data['event'] = event
+        data['time'] = time.time()
+        self.stream.write(self.encode(data) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+
+def enable(target):
+    events = EventStream(open_target(target))
+    started = {}
+    current = {'scenario': None, 'statuses': []}
+
+    def elapsed(thing):
+        began = started.pop(thing, None)
+        return began and time.time() - began or 0.0
+
+    @before.all
+    def run_started():
+        events.emit('run_start', pid=os.getpid(), host=socket.gethostname())
+
+    @before.each_feature
+    def feature_started(feature):
+        started[feature] = time.time()
+        filename, line = location(feature)
+        events.emit('feature_start', feature=feature.name, file=filename,
+                    line=line, tags=sorted(feature.tags or []))
+
+    @after.each_feature
+    def feature_ended(feature):
+        events.emit('feature_end', feature=feature.name,
+                    duration=elapsed(feature))
+        events.flush()
+
+    @before.each_scenario
+    def scenario_started(scenario):
+        started[scenario] = time.time()
+        current['scenario'] = scenario
+        current['statuses'] = []
+        filename, line = location(scenario)
+        events.emit('scenario_start', id=scenario.stable_id,
+                    feature=scenario.feature.name, scenario=scenario.name,
+                    file=filename, line=line,
+                    tags=sorted(scenario.tags or []),
+                    outline=bool(scenario.outlines))
+
+    @before.each_step
+    def step_started(step):
+        started[step] = time.time()
+
+    @after.each_step
+    def step_ended(step):
+        status = step_status(step)
+        current['statuses'].append(status)
+        scenario = step.scenario or current['scenario']
+        filename, line = location(step)
+        data = dict(id=scenario and scenario.stable_id, step=step.sentence,
+                    file=filename, line=line, status=status,
+                    duration=elapsed(step),
+                    background=step.background is not None)
+        if step.failed:
+            data['error'] = step.why.traceback
+
+        if step.ran and step.resources:
+            data['resources'] = step.resources.to_dict()
+
+        events.emit('step', **data)
+
+    @after.outline
+    def outline_ended(scenario, order, outline, reasons_to_fail):
+        data = dict(id=scenario.stable_id, index=order, values=outline,
+                    status=reasons_to_fail and 'failed' or 'passed')
+        if scenario.resources:
+            data['resources'] = scenario.resources.to_dict()
+
+        events.emit('outline_row', **data)
+        benchmark_ended(scenario, order)
+
+    def benchmark_ended(scenario, index=None):
+        statistics = scenario.benchmark_statistics
+        if statistics:
+            events.emit('benchmark', id=scenario.stable_id, index=index,
+                        **statistics.to_dict())
+
+    @after.each_scenario
+    def scenario_ended(scenario):
+        statuses = current['statuses']
+        status = 'passed'
+        for kind in ('failed', 'undefined', 'skipped'):
+            if kind in statuses:
+                status = kind
+                break
+
+        data = dict(id=scenario.stable_id, status=status,
+                    duration=elapsed(scenario), steps=len(statuses))
+        if scenario.resources and not scenario.outlines:
+            data['resources'] = scenario.resources.to_dict()
+
+        if not scenario.outlines:
+            benchmark_ended(scenario)
+
+        events.emit('scenario_end', **data)
+
+    @after.all
+    def run_ended(total):
+        for step in total.proposed_definitions:
+            events.emit('proposal', step=step.sentence,
+                        sentence=step.proposed_sentence,
+                        method=step.proposed_method_name)
+
+        events.emit('run_end', features=total.features_ran,
+                    features_passed=total.features_passed,
+                    scenarios=total.scenarios_ran,
+                    scenarios_passed=total.scenarios_passed,
+                    steps=total.steps, steps_passed=total.steps_passed,
+                    steps_failed=total.steps_failed,
+                    steps_skipped=total.steps_skipped,
+                    steps_undefined=total.steps_undefined)
+        events.flush()
+
+    def hook_ran(kind, situation, callback, began, ended, cpu):
+        # only the hooks of the project are timed, the ones of lettuce
+        # and its plugins are its own business
+        module = getattr(callback, '__module__', None) or ''
+        if module.startswith('lettuce.'):
+            return
+
+        events.emit('hook', kind=kind, situation=situation,
+                    name=getattr(callback, '__name__', repr(callback)),
+                    module=module, duration=ended - began)
+
+    registry.HOOK_LISTENERS.append(hook_ran)
+    return events
@@ -21,34 +21,47 @@ from lettuce.terrain import after
 from lettuce.terrain import before
 
 
-@before.each_step
+def quiet():
+    # representing steps and scenarios is the costly part, and it is
+    # wasted whenever nothing is going to log it
+    return not logging.getLogger().isEnabledFor(logging.INFO)
+
+
 def print_step_running(step):
+    if quiet():
+        return
+
     logging.info(step.represent_string(step.sentence))
 
 
-@after.each_step
 def print_step_ran(step):
 
-    if step.subsequent_outline:
+    if step.subsequent_outline or quiet():
         return
-        
+
     logging.info("\033[A" + step.represent_string(step.sentence))
 
 
-@before.each_scenario
 def print_scenario_running(scenario):
+    if quiet():
+        return
+
     logging.info(scenario.represented())
 
 
-@before.each_feature
 def print_feature_running(feature):
+    if quiet():
+        return
+
     logging.info("\n")
     logging.info(feature.represented())
     logging.info("\n")
 
 
-@after.all
 def print_end(total):
+    if quiet():
+        return
+
     logging.info("\n")
     word = total.features_ran > 1 and "features" or "feature"
     logging.info("%d %s (%d passed)\n" % (
@@ -68,6 +81,12 @@ def print_end(total):
         word,
         total.steps_passed))
 
+    if total.outlines_skipped:
+        word = total.outlines_skipped > 1 and "rows" or "row"
+        logging.info("%d outline %s skipped by sampling\n" % (
+            total.outlines_skipped,
+            word))
+
 
 def print_no_features_found(where):
     where = core.fs.relpath(where)
@@ -78,3 +97,11 @@ def print_no_features_found(where):
     logging.info(
         '\033[1;37mcould not find features at '
         '\033[1;33m%s\033[0m\n' % where)
+
+
+def enable():
+    before.each_step(print_step_running)
+    after.each_step(print_step_ran)
+    before.each_scenario(print_scenario_running)
+    before.each_feature(print_feature_running)
+    after.all(print_end)
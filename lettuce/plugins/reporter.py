@@ -1,14 +1,15 @@
-import sys
+from lettuce import terminal
 
 class Reporter(object):
     def __init__(self):
+        self.reset()
+
+    def reset(self):
         self.failed_scenarios = []
         self.scenarios_and_its_fails = {}
 
     def wrt(self, what):
-        if isinstance(what, unicode):
-            what = what.encode('utf-8')
-        sys.stdout.write(what)
+        terminal.sink.write(what)
 
     def store_failed_step(self, step):
         if step.failed and step.scenario not in self.failed_scenarios:
@@ -57,3 +58,9 @@ class Reporter(object):
             total.steps,
             word,
             ", ".join(steps_details)))
+
+        if total.outlines_skipped:
+            word = total.outlines_skipped > 1 and "rows" or "row"
+            self.wrt("%d outline %s skipped by sampling\n" % (
+                total.outlines_skipped,
+                word))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A statistical profiler: SIGPROF interrupts the run at a regular
+interval of CPU time and the stack being run is counted, prefixed with
+the feature, scenario and step it ran for.
+
+The stacks are written in the collapsed format of flamegraph.pl, which
+speedscope and most flame graph tools read as well, one line per
+distinct stack followed by the number of times it was sampled. Since
+nothing is done between samples, the run is only slowed down by the
+time taken to walk the stack at each sample."""
+import sys
+import time
+import signal
+
+from lettuce import terminal
+from lettuce.core import StepDefinition
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+DEFAULT_INTERVAL = 0.01
+
+STEP_CALL = StepDefinition.__call__.im_func.func_code
+
+
+def frame_name(name):
+    """Collapsed stacks are separated by ";" and end with a count"""
+    if isinstance(name, str):
+        name = name.decode('utf-8', 'replace')
+
+    return u" ".join(name.replace(u";", u",").split())
+
+
+class Sampler(object):
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = {}
+        self.labels = {}
+        self.context = []
+        self.samples = 0
+        self.overhead = 0.0
+        self.elapsed = 0.0
+        self.previous = None
+        self.running = False
+
+    def label(self, code):
+        try:
+            return self.labels[code]
+        except KeyError:
+            label = self.labels[code] = frame_name(u"%s (%s:%d)" % (
+                code.co_name, code.co_filename, code.co_firstlineno))
+            return label
+
+    def sample(self, signum, frame):
+        began = time.time()
+        names = []
+        step = None
+        while frame is not None:
+            code = frame.f_code
+            names.append(self.label(code))
+            if code is STEP_CALL:
+                # the outermost step, when steps call others
+                step = frame.f_locals.get('self')
+            frame = frame.f_back
+
+        names.extend(reversed(self.context))
+        if step is not None:
+            names.insert(len(names) - len(self.context),
+                         frame_name(u"step: %s" % step.step.sentence))
+
+        stack = u";".join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+        self.overhead += time.time() - began
+
+    def start(self):
+        self.started = time.time()
+        self.running = True
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        # system calls of the steps carry on instead of failing with EINTR
+        signal.siginterrupt(signal.SIGPROF, False)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        # the timer is disarmed in any case, since a SIGPROF left
+        # without a handler kills the process
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        if not self.running:
+            return
+
+        # signal.signal gives None for handlers not installed from
+        # python, which can not be put back
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+        self.previous = None
+        self.running = False
+        self.elapsed = time.time() - self.started
+
+    def save(self, filename):
+        with open(filename, 'w') as stream:
+            for stack, count in sorted(self.stacks.items()):
+                stream.write((u"%s %d\n" % (stack, count)).encode('utf-8'))
+
+    def summary(self):
+        share = self.elapsed and self.overhead / self.elapsed or 0
+        return u"%d stacks sampled every %gms, %.1f%% of the run spent " \
+               u"sampling" % (self.samples, self.interval * 1000,
+                              share * 100)
+
+
+def enable(filename, interval=None):
+    """Samples the stacks of the run every `interval` seconds of CPU
+    time, writing them collapsed to `filename` at the end"""
+    if not hasattr(signal, 'setitimer'):
+        sys.stderr.write("The sampling profiler needs signal.setitimer, "
+                         "which is not available on this platform\n")
+        return None
+
+    sampler = Sampler(interval or DEFAULT_INTERVAL)
+
+    @before.all
+    def start_sampling():
+        sampler.start()
+
+    @before.each_feature
+    def enter_feature(feature):
+        sampler.context = [frame_name(u"feature: %s" % feature.name)]
+
+    @before.each_scenario
+    def enter_scenario(scenario):
+        sampler.context = sampler.context[:1] + [
+            frame_name(u"scenario: %s" % scenario.name)]
+
+    @after.each_scenario
+    def leave_scenario(scenario):
+        sampler.context = sampler.context[:1]
+
+    @after.each_feature
+    def leave_feature(feature):
+        sampler.context = []
+
+    @after.all
+    def save_samples(total):
+        sampler.stop()
+        sampler.save(filename)
+        terminal.sink.write(u"\n%s into %s\n" % (sampler.summary(),
+                                                    filename))
+
+    return sampler
@@ -17,6 +17,7 @@
 
 import os
 from lettuce import core
+from lettuce import terminal
 from lettuce.terrain import after
 from lettuce.terrain import before
 from lettuce.plugins.reporter import Reporter
@@ -38,10 +39,15 @@ class NameReporter(Reporter):
 
 reporter = NameReporter()
 
-before.each_scenario(reporter.print_scenario_running)
-after.each_scenario(reporter.print_scenario_ran)
-after.each_step(reporter.store_failed_step)
-after.all(reporter.print_end)
+
+def enable():
+    reporter.reset()
+    before.each_scenario(reporter.print_scenario_running)
+    after.each_scenario(reporter.print_scenario_ran)
+    after.each_step(reporter.store_failed_step)
+    after.all(reporter.print_end)
+    after.each_scenario(terminal.sink.flush)
+    after.all(terminal.sink.flush)
 
 
 def print_no_features_found(where):
@@ -51,3 +57,4 @@ def print_no_features_found(where):
 
     reporter.wrt('Oops!\n')
     reporter.wrt('could not find features at %s\n' % where)
+    terminal.sink.flush()
@@ -16,21 +16,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 from lettuce import core
-from lettuce import strings
+from lettuce import terminal
 from lettuce.terrain import after
 from lettuce.terrain import before
 from lettuce.terrain import world
 
 
 def wrt(what):
-    if isinstance(what, unicode):
-        what = what.encode('utf-8')
-    sys.stdout.write(what)
+    terminal.sink.write(what)
 
 
-@after.each_step
 def print_step_running(step):
 
     if step.subsequent_outline:
@@ -51,7 +47,6 @@ def print_step_running(step):
             print_spaced(line)
 
 
-@before.each_scenario
 def print_scenario_running(scenario):
     if scenario.background:
         # Only print the background on the first scenario run
@@ -67,33 +62,25 @@ def print_scenario_running(scenario):
     wrt(scenario.represented())
 
 
-@before.each_background
 def print_background_running(background):
     wrt('\n')
     wrt(background.represented())
     wrt('\n')
 
 
-@after.each_background
 def print_first_scenario_running(background, results):
     scenario = world.background_scenario_holder[background]
     print_scenario_running(scenario)
 
 
-@after.outline
 def print_outline(scenario, order, outline, reasons_to_fail):
-    table = strings.dicts_to_string(scenario.outlines, scenario.keys)
-    lines = table.splitlines()
-    head = lines.pop(0)
-
     wline = lambda x: wrt("%s%s\n" % (" " * scenario.table_indentation, x))
-    if order is 0:
+    if order == scenario.outline_indexes[0]:
         wrt("\n")
         wrt("%s%s:\n" % (" " * scenario.indentation, scenario.language.first_of_examples))
-        wline(head)
+        wline(scenario.represent_examples_head())
 
-    line = lines[order]
-    wline(line)
+    wline(scenario.represent_example(order))
     if reasons_to_fail:
         print_spaced = lambda x: wrt("%s%s\n" % (" " * scenario.table_indentation, x))
         elines = reasons_to_fail[0].traceback.splitlines()
@@ -101,13 +88,18 @@ def print_outline(scenario, order, outline, reasons_to_fail):
             print_spaced(line)
 
 
-@before.each_feature
+def print_benchmark(scenario):
+    statistics = scenario.benchmark_statistics
+    if statistics and not scenario.outlines:
+        wrt("\n%sBenchmark: %s\n" % (" " * scenario.table_indentation,
+                                    statistics.summary()))
+
+
 def print_feature_running(feature):
     wrt("\n")
     wrt(feature.represented())
 
 
-@after.all
 def print_end(total):
     wrt("\n")
     word = total.features_ran > 1 and "features" or "feature"
@@ -136,6 +128,12 @@ def print_end(total):
         word,
         ", ".join(steps_details)))
 
+    if total.outlines_skipped:
+        word = total.outlines_skipped > 1 and "rows" or "row"
+        wrt("%d outline %s skipped by sampling\n" % (
+            total.outlines_skipped,
+            word))
+
     if total.proposed_definitions:
         wrt("\nYou can implement step definitions for undefined steps with these snippets:\n\n")
         wrt("# -*- coding: utf-8 -*-\n")
@@ -154,3 +152,18 @@ def print_no_features_found(where):
 
     wrt('Oops!\n')
     wrt('could not find features at %s\n' % where)
+    terminal.sink.flush()
+
+
+def enable():
+    after.each_step(print_step_running)
+    before.each_scenario(print_scenario_running)
+    before.each_background(print_background_running)
+    after.each_background(print_first_scenario_running)
+    after.outline(print_outline)
+    before.each_feature(print_feature_running)
+    after.each_scenario(print_benchmark)
+    after.all(print_end)
+    before.each_step(terminal.sink.flush)
+    after.each_scenario(terminal.sink.flush)
+    after.all(terminal.sink.flush)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Adds up the wall and CPU time taken by each step definition and by
+each hook of the project, to tell which ones make a suite slow.
+
+Step definitions are told apart by the file and line where they are
+defined, and so are hooks. The time of a step that calls others with
+`step.behave_as` includes theirs."""
+import json
+import time
+
+from lettuce.fs import FileSystem
+from lettuce import registry
+from lettuce import terminal
+from lettuce.benchmark import percentile
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+
+class Timings(object):
+    """The times of the calls to one step definition or hook"""
+
+    def __init__(self, kind, location, name):
+        self.kind = kind
+        self.location = location
+        self.name = name
+        self.walls = []
+        self.cpus = []
+
+    def add(self, wall, cpu):
+        self.walls.append(wall)
+        self.cpus.append(cpu)
+
+    @property
+    def calls(self):
+        return len(self.walls)
+
+    @property
+    def total(self):
+        return sum(self.walls)
+
+    @property
+    def cpu(self):
+        return sum(self.cpus)
+
+    @property
+    def mean(self):
+        return self.total / self.calls
+
+    @property
+    def p95(self):
+        return percentile(self.walls, 95)
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'location': self.location,
+            'name': self.name,
+            'calls': self.calls,
+            'total': self.total,
+            'cpu': self.cpu,
+            'mean': self.mean,
+            'p95': self.p95,
+            'wall_times': self.walls,
+            'cpu_times': self.cpus,
+        }
+
+
+class StepProfile(object):
+    def __init__(self):
+        self.timings = {}
+        self.runtime = 0.0
+
+    def add(self, kind, location, name, wall, cpu):
+        key = (kind, location)
+        if key not in self.timings:
+            self.timings[key] = Timings(kind, location, name)
+
+        self.timings[key].add(wall, cpu)
+
+    def slowest(self, top=None):
+        ordered = sorted(self.timings.values(),
+                         key=lambda timings: timings.total, reverse=True)
+        return ordered[:top]
+
+    def report(self, top):
+        slowest = self.slowest(top)
+        if not slowest:
+            return u""
+
+        lines = [
+            u"\nSlowest step definitions and hooks, out of %.3fs:" %
+            self.runtime,
+            u"%10s %6s %6s %9s %9s %9s  %s" % (
+                u"total", u"share", u"calls", u"mean", u"p95", u"cpu",
+                u"definition"),
+        ]
+        for timings in slowest:
+            share = self.runtime and timings.total / self.runtime or 0
+            lines.append(u"%9.3fs %5.1f%% %6d %8.3fs %8.3fs %8.3fs  %s "
+                         u"(%s %s)" % (
+                             timings.total, share * 100, timings.calls,
+                             timings.mean, timings.p95, timings.cpu,
+                             timings.location, timings.kind, timings.name))
+
+        return u"\n".join(lines) + u"\n"
+
+    def save(self, filename):
+        with open(filename, 'w') as stream:
+            json.dump({
+                'runtime': self.runtime,
+                'definitions': [timings.to_dict()
+                                for timings in self.slowest()],
+            }, stream, indent=1)
+
+
+def enable(top=20, filename=None):
+    """Profiles the step definitions and the hooks of the project,
+    printing the `top` slowest at the end of the run and saving every
+    timing to `filename`"""
+    profile = StepProfile()
+    current = {'started': None}
+
+    @before.all
+    def start_profile():
+        current['started'] = time.time()
+
+    @after.each_step
+    def time_step(step):
+        definition = step.defined_at
+        if not step.ran or not definition or step.wall_time is None:
+            return
+
+        profile.add('step', u"%s:%d" % (definition.file, definition.line),
+                    definition.function.__name__, step.wall_time,
+                    step.cpu_time)
+
+    def time_hook(kind, situation, callback, started, ended, cpu):
+        module = getattr(callback, '__module__', None) or ''
+        code = getattr(callback, 'func_code', None)
+        # the hooks of lettuce and its plugins are left out
+        if module.startswith('lettuce.') or code is None:
+            return
+
+        where = u"%s:%d" % (FileSystem.relpath(code.co_filename),
+                            code.co_firstlineno)
+        profile.add('hook', where, callback.__name__, ended - started, cpu)
+
+    @after.all
+    def report_profile(total):
+        profile.runtime = time.time() - current['started']
+        terminal.sink.write(profile.report(top))
+        if filename:
+            profile.save(filename)
+
+    registry.HOOK_LISTENERS.append(time_hook)
+    return profile
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Records the run as a timeline in the Trace Event format of Chrome,
+which chrome://tracing, Perfetto and speedscope open.
+
+Features, backgrounds and scenarios are spans that begin and end with
+their hooks. Outline examples, step definitions and every hook, the
+ones of lettuce and its plugins included, are complete events, so the
+gaps between them show the time lettuce spends parsing, matching steps
+and printing. Timestamps are absolute and every event carries its
+process and thread, so the traces of workers running side by side can
+be opened together."""
+import os
+import json
+import time
+import socket
+import thread
+
+from lettuce import registry
+from lettuce.terrain import after
+from lettuce.terrain import before
+
+
+def microseconds(seconds):
+    return int(seconds * 1000000)
+
+
+class TraceFile(object):
+    """Writes the events as they come, closing the array at the end"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.stream = None
+        self.pid = os.getpid()
+        self.encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def start(self):
+        self.stream = open(self.filename, 'w')
+        self.stream.write('[')
+        self.events = 0
+        self.emit('process_name', 'M', time.time(),
+                  args={'name': 'lettuce %s' % socket.gethostname()})
+
+    def emit(self, name, phase, when, category='lettuce', **data):
+        if self.stream is None:
+            return
+
+        data.update({
+            'name': name,
+            'ph': phase,
+            'cat': category,
+            'ts': microseconds(when),
+            'pid': self.pid,
+            'tid': thread.get_ident(),
+        })
+        self.stream.write((self.events and ',\n' or '') + self.encode(data))
+        self.events += 1
+
+    def begin(self, name, category, **args):
+        self.emit(name, 'B', time.time(), category, args=args)
+
+    def end(self, name, category):
+        self.emit(name, 'E', time.time(), category)
+
+    def complete(self, name, category, started, seconds, **args):
+        self.emit(name, 'X', started, category, dur=microseconds(seconds),
+                  args=args)
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def finish(self):
+        if self.stream is None:
+            return
+
+        self.stream.write(']\n')
+        self.stream.close()
+        self.stream = None
+
+
+def enable(filename):
+    trace = TraceFile(filename)
+    current = {'row_started': None}
+
+    @before.all
+    def start_trace():
+        trace.start()
+
+    @before.each_feature
+    def begin_feature(feature):
+        trace.begin(feature.name, 'feature')
+
+    @after.each_feature
+    def end_feature(feature):
+        trace.end(feature.name, 'feature')
+        trace.flush()
+
+    @before.each_background
+    def begin_background(background):
+        trace.begin(u'Background', 'background')
+
+    @after.each_background
+    def end_background(background, results):
+        trace.end(u'Background', 'background')
+
+    @before.each_scenario
+    def begin_scenario(scenario):
+        current['row_started'] = time.time()
+        trace.begin(scenario.name, 'scenario', id=scenario.stable_id)
+
+    @after.each_step
+    def step_ran(step):
+        if not step.ran or step.wall_time is None:
+            return
+
+        definition = step.defined_at
+        trace.complete(step.sentence, 'step', step.started_at,
+                       step.wall_time, cpu=step.cpu_time,
+                       definition=u"%s:%d" % (definition.file,
+                                              definition.line))
+
+    @after.outline
+    def outline_ran(scenario, order, outline, reasons_to_fail):
+        now = time.time()
+        started = current['row_started'] or now
+        trace.complete(u"%s | example %d" % (scenario.name, order + 1),
+                       'outline', started, now - started, values=outline)
+        current['row_started'] = now
+
+    @after.each_scenario
+    def end_scenario(scenario):
+        trace.end(scenario.name, 'scenario')
+
+    @after.all
+    def finish_trace(total):
+        trace.finish()
+
+    def hook_ran(kind, situation, callback, started, ended, cpu):
+        trace.complete(getattr(callback, '__name__', repr(callback)), 'hook',
+                       started, ended - started, hook=u"%s %s" % (
+                           situation, kind),
+                       module=getattr(callback, '__module__', None))
+
+    registry.HOOK_LISTENERS.append(hook_ran)
+    return trace
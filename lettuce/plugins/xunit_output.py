@@ -15,82 +15,277 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from datetime import datetime, timedelta
+import time
+import atexit
+from datetime import datetime
+from xml.sax.saxutils import quoteattr
 from lettuce.terrain import after
 from lettuce.terrain import before
-from xml.dom import minidom
-from lettuce.strings import utf8_string
 
+# room kept at the top of the report for the <testsuite> tag, which is
+# only known once every test case has been written
+HEADER_SIZE = 512
 
-def wrt_output(filename, content):
-    f = open(filename, "w")
-    if isinstance(content, unicode):
-        content = content.encode('utf-8')
 
-    f.write(content)
-    f.close()
+def text(value):
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
 
+    return unicode(value)
 
-def write_xml_doc(filename, doc):
-    wrt_output(filename, doc.toxml())
 
+def cdata(value):
+    return u"<![CDATA[%s]]>" % text(value).replace(u"]]>", u"]]]]><![CDATA[>")
 
-def total_seconds(td):
-    return (td.microseconds + (td.seconds + td.days * 24 * 3600) * 1e6) / 1e6
 
+def start_tag(name, attributes):
+    attrs = u"".join([u" %s=%s" % (key, quoteattr(text(value)))
+                      for key, value in attributes if value is not None])
+    return u"<%s%s" % (name, attrs)
 
-def enable(filename=None):
 
-    doc = minidom.Document()
-    root = doc.createElement("testsuite")
-    root.setAttribute("name", "lettuce")
-    root.setAttribute("hostname", "localhost")
-    root.setAttribute("timestamp", datetime.now().strftime("%Y-%m-%dT%H:%M:%S"))
-    output_filename = filename or "lettucetests.xml"
+def element(name, attributes, content=u""):
+    if not content:
+        return start_tag(name, attributes) + u"/>"
 
-    @before.each_step
-    def time_step(step):
-        step.started = datetime.now()
+    return u"%s>%s</%s>" % (start_tag(name, attributes), content, name)
 
-    @after.each_step
-    def create_test_case_step(step):
-        parent = step.scenario or step.background
-        name = getattr(parent, 'name', 'Background')    # Background sections are nameless
-        classname = u"%s : %s" % (parent.feature.name, name)
-        tc = doc.createElement("testcase")
-        tc.setAttribute("classname", classname)
-        tc.setAttribute("name", step.sentence)
-        try:
-            tc.setAttribute("time", str(total_seconds((datetime.now() - step.started))))
-        except AttributeError:
-            tc.setAttribute("time", str(total_seconds(timedelta(seconds=0))))
 
+def outcome(steps):
+    """Tells how a test case made of `steps` went, returning its kind
+    ('failure', 'error', 'skipped' or None when it passed) along with
+    the xml describing it"""
+    for step in steps:
+        if step.failed:
+            return 'failure', element("failure", [
+                ("message", getattr(step.why, 'cause', None)),
+                ("type", step.why.exception.__class__.__name__),
+            ], cdata(step.why.traceback))
+
+    for step in steps:
+        if not step.ran and not step.defined_at:
+            return 'error', element("error", [
+                ("type", u"UndefinedStep(%s)" % text(step.sentence)),
+            ])
+
+    for step in steps:
         if not step.ran:
-            if step.defined_at:
-                 skip = doc.createElement("skipped")
-                 skip.setAttribute("type", "SkippedStep(%s)" % step.sentence)
-            else:
-                 skip = doc.createElement("error")
-                 skip.setAttribute("type", "UndefinedStep(%s)" % step.sentence)
-            tc.appendChild(skip)
+            return 'skipped', element("skipped", [
+                ("type", u"SkippedStep(%s)" % text(step.sentence)),
+            ])
 
-        if step.failed:
-            cdata = doc.createCDATASection(step.why.traceback)
-            failure = doc.createElement("failure")
-            if hasattr(step.why, 'cause'):
-                failure.setAttribute("message", step.why.cause)
-            failure.setAttribute("type", step.why.exception.__class__.__name__)
-            failure.appendChild(cdata)
-            tc.appendChild(failure)
+    return None, u""
+
+
+def number(value):
+    return isinstance(value, float) and "%.6f" % value or value
+
+
+def properties(usage=None, statistics=None, id=None):
+    """The id of a test case, the resources it used and the durations
+    sampled when it is a benchmark, as its <properties>"""
+    values = []
+    if id:
+        values.append((u"scenario.id", id))
+
+    if usage:
+        values.extend([(u"resources.%s" % name, number(value))
+                       for name, value in sorted(usage.to_dict().items())])
+
+    if statistics:
+        for name, value in sorted(statistics.to_dict().items()):
+            if name == 'samples':
+                value = u",".join([number(sample) for sample in value])
+            elif name == 'steps':
+                continue
+
+            values.append((u"benchmark.%s" % name, number(value)))
+
+    if not values:
+        return u""
+
+    return element("properties", [], u"".join([
+        element("property", [("name", name), ("value", value)])
+        for name, value in values]))
+
+
+class XUnitReport(object):
+    """Writes the test cases to the report as soon as they finish, so
+    that memory use does not grow with the suite, and then rewrites the
+    <testsuite> tag at its top once the totals are known"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.stream = None
+
+    def start(self, timestamp=None):
+        self.started = time.time()
+        self.timestamp = timestamp or \
+            datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.counts = {'tests': 0, 'failure': 0, 'error': 0, 'skipped': 0}
+        self.stream = open(self.filename, 'w')
+        self.stream.write(self.header())
+        self.stream.flush()
+
+    def header(self, tests=0, failures=0, errors=0, skipped=0, seconds=None):
+        if seconds is None:
+            seconds = time.time() - self.started
+
+        head = u'<?xml version="1.0" encoding="utf-8"?>' + start_tag(
+            "testsuite", [
+                ("name", "lettuce"),
+                ("hostname", "localhost"),
+                ("timestamp", self.timestamp),
+                ("tests", tests),
+                ("failures", failures),
+                ("errors", errors),
+                ("skipped", skipped),
+                ("time", "%.6f" % seconds),
+            ])
+        # padded, so that the final header overwrites the initial one
+        return (head.ljust(HEADER_SIZE - 2) + u">\n").encode('utf-8')
+
+    def add(self, classname, name, seconds, steps, usage=None,
+            statistics=None, id=None):
+        """Writes a test case; its `id`, when given, identifies it
+        across runs, so that merged reports can tell the retried ones"""
+        if self.stream is None:
+            return
+
+        kind, detail = outcome(steps)
+        self.write(element("testcase", [
+            ("classname", classname),
+            ("name", name),
+            ("time", "%.6f" % seconds),
+        ], properties(usage, statistics, id) + detail).encode('utf-8'), kind)
+
+    def write(self, testcase, kind=None):
+        """Writes a test case already turned into utf-8 encoded xml"""
+        self.counts['tests'] += 1
+        if kind:
+            self.counts[kind] += 1
+
+        self.stream.write(testcase + "\n")
+        self.stream.flush()
 
-        root.appendChild(tc)
+    def finish(self, **totals):
+        """Closes the report, with the totals given or else with the
+        ones counted while writing the test cases"""
+        if self.stream is None:
+            return
+
+        counts = {
+            'tests': self.counts['tests'],
+            'failures': self.counts['failure'],
+            'errors': self.counts['error'],
+            'skipped': self.counts['skipped'],
+        }
+        counts.update(totals)
+
+        self.stream.write("</testsuite>")
+        self.stream.seek(0)
+        self.stream.write(self.header(**counts))
+        self.stream.close()
+        self.stream = None
+
+
+def classname_of(step):
+    parent = step.scenario or step.background
+    name = getattr(parent, 'name', 'Background')    # Background sections are nameless
+    return u"%s : %s" % (text(parent.feature.name), text(name))
+
+
+def case_id(scenario, position=None):
+    """The stable id of the scenario, followed by the position of the
+    step or outline example the test case is made of"""
+    if scenario is None:
+        return None
+
+    if position is None:
+        return scenario.stable_id
+
+    return u"%s#%d" % (scenario.stable_id, position)
+
+
+def enable(filename=None, per_scenario=False, with_ids=False):
+    """Writes a JUnit XML report, with a test case for each step or,
+    when `per_scenario` is set, for each scenario and outline example.
+    With `with_ids`, the properties of each test case hold its id, for
+    lettuce merge-reports to tell the retried ones apart"""
+    report = XUnitReport(filename or "lettucetests.xml")
+    ids = with_ids and case_id or (lambda scenario, position=None: None)
+    current = {'started': None, 'steps': [], 'scenario': None,
+               'position': 0}
+
+    # a report cut short still gets its totals and closing tag
+    atexit.register(report.finish)
+
+    @before.all
+    def start_report():
+        report.start()
 
     @after.all
-    def output_xml(total):
-        root.setAttribute("tests", str(total.steps))
-        root.setAttribute("failures", str(total.steps_failed))
-        root.setAttribute("errors", str(total.steps_undefined))
-        root.setAttribute("skipped", str(total.steps_skipped))
-        root.setAttribute("time", '0')
-        doc.appendChild(root)
-        write_xml_doc(output_filename, doc)
+    def finish_report(total):
+        if per_scenario:
+            report.finish()
+        else:
+            report.finish(tests=total.steps,
+                          failures=total.steps_failed,
+                          errors=total.steps_undefined,
+                          skipped=total.steps_skipped)
+
+    if not per_scenario:
+        @before.each_scenario
+        def number_steps(scenario):
+            current['scenario'] = scenario
+            current['position'] = 0
+
+        @before.each_step
+        def time_step(step):
+            step.started = time.time()
+
+        @after.each_step
+        def create_test_case_step(step):
+            started = getattr(step, 'started', None)
+            seconds = started and time.time() - started or 0
+            scenario = current['scenario']
+            current['position'] += 1
+            report.add(classname_of(step), step.sentence, seconds, [step],
+                       step.ran and step.resources or None,
+                       id=ids(scenario, current['position']))
+
+        return report
+
+    def restart():
+        current['started'] = time.time()
+        current['steps'] = []
+
+    @before.each_scenario
+    def time_scenario(scenario):
+        restart()
+
+    @after.each_step
+    def collect_step(step):
+        current['steps'].append(step)
+
+    @after.outline
+    def create_test_case_example(scenario, order, outline, reasons_to_fail):
+        name = u"%s | %s" % (text(scenario.name), u" | ".join(
+            [text(outline.get(key, u"")) for key in scenario.keys]))
+        report.add(text(scenario.feature.name), name,
+                   time.time() - current['started'], current['steps'],
+                   scenario.resources, scenario.benchmark_statistics,
+                   id=ids(scenario, order))
+        restart()
+
+    @after.each_scenario
+    def create_test_case_scenario(scenario):
+        if scenario.outlines:
+            return
+
+        report.add(text(scenario.feature.name), scenario.name,
+                   time.time() - current['started'], current['steps'],
+                   scenario.resources, scenario.benchmark_statistics,
+                   id=ids(scenario))
+
+    return report
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Resolves every step of the features about to run against the step
+definitions, without running any step or hook, to tell the undefined
+steps, the ambiguous ones and the unused step definitions before
+anything runs.
+
+A step is ambiguous when more than one step definition matches it, as
+the one that runs then depends on the order of the registry. Steps ran
+from step definitions, through `step.behave_as`, can not be told
+before they run."""
+import re
+import time
+
+from lettuce.fs import FileSystem
+from lettuce.registry import STEP_REGISTRY
+
+
+class Resolver(object):
+    """Finds every step definition matching a sentence, compiling their
+    regexes once and matching each distinct sentence once"""
+
+    def __init__(self, ignore_case=True):
+        flags = ignore_case and re.I or 0
+        self.definitions = [(STEP_REGISTRY.compiled(regex, flags), function)
+                            for regex, function in STEP_REGISTRY.items()]
+        self.cache = {}
+
+    def functions(self):
+        return set([function for regex, function in self.definitions])
+
+    def matches(self, sentence):
+        try:
+            return self.cache[sentence]
+        except KeyError:
+            pass
+
+        found = []
+        for regex, function in self.definitions:
+            # one function may be decorated with several regexes
+            if function not in found and regex.search(sentence):
+                found.append(function)
+
+        self.cache[sentence] = found
+        return found
+
+
+def where_defined(function):
+    code = function.func_code
+    return u"%s:%d" % (FileSystem.relpath(code.co_filename),
+                       code.co_firstlineno + 1)
+
+
+def where_described(step):
+    return u"%s:%d" % (step.described_at.file, step.described_at.line)
+
+
+def steps_of(feature, scenarios=None, tags=None):
+    """The scenarios of `feature` that would run, and the steps they
+    would run with every example of their outlines"""
+    background = feature.background and feature.background.steps or []
+    for index, scenario in enumerate(feature.scenarios):
+        if scenarios and (index + 1) not in scenarios:
+            continue
+
+        if not scenario.matches_tags(tags):
+            continue
+
+        steps = scenario.outlines and scenario.solved_steps or scenario.steps
+        yield scenario, background + steps
+
+
+class Preflight(object):
+    """The outcome of resolving the steps of some features"""
+
+    def __init__(self):
+        self.features = 0
+        self.scenarios = 0
+        self.steps = 0
+        self.undefined = {}
+        self.ambiguous = {}
+        self.unused = []
+        self.elapsed = 0.0
+
+    @classmethod
+    def check(cls, features, tags=None, ignore_case=True):
+        """Checks the (feature, scenario numbers) pairs of `features`"""
+        started = time.time()
+        preflight = cls()
+        selected = [(feature, list(steps_of(feature, scenarios, tags)))
+                    for feature, scenarios in features]
+
+        resolver = Resolver(ignore_case)
+        used = set()
+        for feature, found in selected:
+            preflight.features += 1
+            for scenario, steps in found:
+                preflight.scenarios += 1
+                for step in steps:
+                    preflight.steps += 1
+                    functions = resolver.matches(step.sentence)
+                    used.update(functions)
+                    if not functions:
+                        preflight.undefined.setdefault(
+                            step.sentence, []).append(where_described(step))
+                    elif len(functions) > 1:
+                        preflight.ambiguous.setdefault(
+                            step.sentence, (functions, []))[1].append(
+                                where_described(step))
+
+        # the step definitions of lettuce itself are not the project's
+        preflight.unused = sorted([
+            (where_defined(function), function.__name__)
+            for function in resolver.functions() - used
+            if not function.__module__.startswith('lettuce.')])
+        preflight.elapsed = time.time() - started
+        return preflight
+
+    @property
+    def passed(self):
+        return not self.undefined and not self.ambiguous
+
+    def report(self):
+        lines = [u"Resolved %d steps of %d scenarios in %d features "
+                 u"in %.2fs" % (self.steps, self.scenarios, self.features,
+                                self.elapsed)]
+
+        def heading(count, singular, plural):
+            lines.append(u"")
+            lines.append(u"%d %s:" % (count, count > 1 and plural or
+                                      singular))
+
+        def described(places):
+            more = len(places) > 1 and u" (and %d more)" % (
+                len(places) - 1) or u""
+            return u"# %s%s" % (places[0], more)
+
+        if self.undefined:
+            heading(len(self.undefined), u"undefined step",
+                    u"undefined steps")
+            for sentence, places in sorted(self.undefined.items()):
+                lines.append(u"  %s  %s" % (sentence, described(places)))
+
+        if self.ambiguous:
+            heading(len(self.ambiguous), u"ambiguous step",
+                    u"ambiguous steps")
+            for sentence, (functions, places) in \
+                    sorted(self.ambiguous.items()):
+                lines.append(u"  %s  %s" % (sentence, described(places)))
+                for function in functions:
+                    lines.append(u"    matched by %s (%s)" % (
+                        where_defined(function), function.__name__))
+
+        if self.unused:
+            heading(len(self.unused), u"unused step definition",
+                    u"unused step definitions")
+            for where, name in self.unused:
+                lines.append(u"  %s (%s)" % (where, name))
+
+        return u"\n".join(lines) + u"\n"
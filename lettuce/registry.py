@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import re
+import time
 import threading
 import traceback
 
@@ -38,7 +40,85 @@ class CallbackDict(dict):
                 callback_list[:] = []
 
 
-STEP_REGISTRY = {}
+class StepDict(dict):
+    """The step definitions by their regex, along with a version that
+    changes whenever they do. The step definition matching each
+    sentence is looked up once per version."""
+
+    def __init__(self, *args, **kw):
+        super(StepDict, self).__init__(*args, **kw)
+        self.version = 0
+        self._compiled = {}
+        self._matches = {}
+
+    def _changed(self):
+        self.version += 1
+        self._matches.clear()
+
+    def __setitem__(self, regex, function):
+        super(StepDict, self).__setitem__(regex, function)
+        self._changed()
+
+    def __delitem__(self, regex):
+        super(StepDict, self).__delitem__(regex)
+        self._changed()
+
+    def clear(self):
+        super(StepDict, self).clear()
+        self._compiled.clear()
+        self._changed()
+
+    def update(self, *args, **kw):
+        super(StepDict, self).update(*args, **kw)
+        self._changed()
+
+    def setdefault(self, regex, function=None):
+        try:
+            return self[regex]
+        except KeyError:
+            self[regex] = function
+            return function
+
+    def pop(self, *args):
+        try:
+            return super(StepDict, self).pop(*args)
+        finally:
+            self._changed()
+
+    def popitem(self):
+        try:
+            return super(StepDict, self).popitem()
+        finally:
+            self._changed()
+
+    def compiled(self, regex, flags=0):
+        try:
+            return self._compiled[regex, flags]
+        except KeyError:
+            pattern = self._compiled[regex, flags] = re.compile(regex, flags)
+            return pattern
+
+    def match(self, sentence, ignore_case=True):
+        """The compiled regex of the first step definition matching
+        `sentence`, along with its function, or (None, None)"""
+        try:
+            return self._matches[sentence, ignore_case]
+        except KeyError:
+            pass
+
+        found = None, None
+        flags = ignore_case and re.I or 0
+        for regex, function in self.items():
+            pattern = self.compiled(regex, flags)
+            if pattern.search(sentence):
+                found = pattern, function
+                break
+
+        self._matches[sentence, ignore_case] = found
+        return found
+
+
+STEP_REGISTRY = StepDict()
 CALLBACK_REGISTRY = CallbackDict(
     {
         'all': {
@@ -82,10 +162,23 @@ CALLBACK_REGISTRY = CallbackDict(
 )
 
 
+# callables told about every hook ran, along with when it started and
+# ended and the CPU time it took, as in
+# listener(kind, situation, callback, started, ended, cpu)
+HOOK_LISTENERS = []
+
+
 def call_hook(situation, kind, *args, **kw):
     for callback in CALLBACK_REGISTRY[kind][situation]:
         try:
-            callback(*args, **kw)
+            if HOOK_LISTENERS:
+                started, cpu_started = time.time(), time.clock()
+                callback(*args, **kw)
+                ended, cpu = time.time(), time.clock() - cpu_started
+                for listener in HOOK_LISTENERS:
+                    listener(kind, situation, callback, started, ended, cpu)
+            else:
+                callback(*args, **kw)
         except Exception, e:
             print "=" * 1000
             traceback.print_exc(e)
@@ -96,3 +189,4 @@ def call_hook(situation, kind, *args, **kw):
 def clear():
     STEP_REGISTRY.clear()
     CALLBACK_REGISTRY.clear()
+    HOOK_LISTENERS[:] = []
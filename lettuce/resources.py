@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Accounts for the resources used by each scenario and step: CPU time
+of the process and of its children, memory, disk I/O and context
+switches.
+
+Measuring is off unless `enable()` is called, in which case a snapshot
+is taken before and after each scenario and step definition and their
+difference is left on them as `resources`."""
+import os
+import sys
+
+try:
+    import resource
+except ImportError:     # not on Windows
+    resource = None
+
+MEASURING = False
+
+FIELDS = (
+    'user_time',
+    'system_time',
+    'children_user_time',
+    'children_system_time',
+    'max_rss',
+    'max_rss_growth',
+    'rss',
+    'rss_growth',
+    'read_bytes',
+    'write_bytes',
+    'voluntary_switches',
+    'involuntary_switches',
+)
+
+# fields that are a level rather than an amount, kept as they are at
+# the end of what was measured, along with how much they grew
+LEVELS = {'max_rss': 'max_rss_growth', 'rss': 'rss_growth'}
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError):
+    PAGE_SIZE = 4096
+
+
+def rss_unit():
+    """Linux gives ru_maxrss in kilobytes, and BSD and OS X in bytes"""
+    return sys.platform.startswith('linux') and 1024 or 1
+
+
+def enable(measure=True):
+    global MEASURING
+    MEASURING = bool(measure and resource)
+
+
+def read_io():
+    """The bytes read from and written to storage, as Linux tells in
+    /proc/self/io"""
+    try:
+        with open('/proc/self/io') as stream:
+            fields = dict([line.split(':', 1) for line in stream])
+    except (IOError, ValueError):
+        return 0, 0
+
+    return int(fields.get('read_bytes', 0)), int(fields.get('write_bytes', 0))
+
+
+def read_rss():
+    try:
+        with open('/proc/self/statm') as stream:
+            return int(stream.read().split()[1]) * PAGE_SIZE
+    except (IOError, ValueError, IndexError):
+        return 0
+
+
+class Usage(object):
+    """The resources used so far, or used between two snapshots when
+    subtracted from one another"""
+
+    def __init__(self, **values):
+        for field in FIELDS:
+            setattr(self, field, values.get(field, 0))
+
+    @classmethod
+    def now(cls):
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        read_bytes, write_bytes = read_io()
+        return cls(user_time=own.ru_utime,
+                   system_time=own.ru_stime,
+                   children_user_time=children.ru_utime,
+                   children_system_time=children.ru_stime,
+                   max_rss=own.ru_maxrss * rss_unit(),
+                   rss=read_rss(),
+                   read_bytes=read_bytes,
+                   write_bytes=write_bytes,
+                   voluntary_switches=own.ru_nvcsw,
+                   involuntary_switches=own.ru_nivcsw)
+
+    def __sub__(self, earlier):
+        values = {}
+        for field in FIELDS:
+            if field in LEVELS:
+                values[field] = getattr(self, field)
+                values[LEVELS[field]] = \
+                    getattr(self, field) - getattr(earlier, field)
+            elif field not in LEVELS.values():
+                values[field] = getattr(self, field) - getattr(earlier, field)
+
+        return Usage(**values)
+
+    def to_dict(self):
+        return dict([(field, getattr(self, field)) for field in FIELDS])
+
+    def __repr__(self):
+        return '<Usage %s>' % ' '.join(['%s=%s' % (field, getattr(self, field))
+                                        for field in FIELDS])
+
+
+def snapshot():
+    """The resources used so far, or None when not measuring"""
+    return MEASURING and Usage.now() or None
+
+
+def since(earlier):
+    """The resources used since the snapshot `earlier`, if any"""
+    return earlier and Usage.now() - earlier or None
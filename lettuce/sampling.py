@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import random
+from itertools import combinations
+
+
+def sample(outlines, size, seed=None):
+    """Returns the sorted indexes of `size` random rows from
+    `outlines`. The same seed always picks the same rows."""
+    indexes = range(len(outlines))
+    if size >= len(indexes):
+        return indexes
+
+    return sorted(random.Random(seed).sample(indexes, size))
+
+
+def _pairs_of(row, keys):
+    values = [(key, row.get(key)) for key in keys]
+    if len(values) < 2:
+        return set(values)
+
+    return set(combinations(values, 2))
+
+
+def pairwise(outlines, keys):
+    """Returns the sorted indexes of a subset of `outlines` in which
+    every pair of column values found in the whole table still shows
+    up in at least one row, chosen greedily."""
+    pairs = [_pairs_of(row, keys) for row in outlines]
+    uncovered = set()
+    for row_pairs in pairs:
+        uncovered.update(row_pairs)
+
+    chosen = []
+    while uncovered:
+        best, best_covered = None, set()
+        for index, row_pairs in enumerate(pairs):
+            covered = row_pairs & uncovered
+            if len(covered) > len(best_covered):
+                best, best_covered = index, covered
+
+        chosen.append(best)
+        uncovered -= best_covered
+
+    return sorted(chosen)
+
+
+def select(outlines, keys, size=None, use_pairwise=False, seed=None):
+    """Returns the indexes of the rows of `outlines` to be ran"""
+    indexes = range(len(outlines))
+    if use_pairwise:
+        indexes = pairwise(outlines, keys)
+
+    if size is not None and size < len(indexes):
+        picked = sample(indexes, size, seed)
+        indexes = [indexes[i] for i in picked]
+
+    return indexes
@@ -51,6 +51,12 @@ def get_stripped_lines(string, ignore_lines_starting_with=''):
     return lines
 
 
+# the regexes of split_wisely and wise_startswith, compiled once for
+# each separator or seed, as they are called for every line parsed
+SEPARATORS = {}
+SEEDS = {}
+
+
 def split_wisely(string, sep, strip=False):
     string = unicode(string)
     if strip:
@@ -59,7 +65,11 @@ def split_wisely(string, sep, strip=False):
         string = string.strip("\n")
     sep = unicode(sep)
 
-    regex = re.compile(escape_if_necessary(sep),  re.UNICODE | re.M | re.I)
+    try:
+        regex = SEPARATORS[sep]
+    except KeyError:
+        regex = SEPARATORS[sep] = re.compile(escape_if_necessary(sep),
+                                             re.UNICODE | re.M | re.I)
 
     items = filter(lambda x: x, regex.split(string))
     if strip:
@@ -73,8 +83,12 @@ def split_wisely(string, sep, strip=False):
 def wise_startswith(string, seed):
     string = unicode(string).strip()
     seed = unicode(seed)
-    regex = u"^%s" % re.escape(seed)
-    return bool(re.search(regex, string, re.I))
+    try:
+        regex = SEEDS[seed]
+    except KeyError:
+        regex = SEEDS[seed] = re.compile(u"^%s" % re.escape(seed), re.I)
+
+    return bool(regex.search(string))
 
 
 def remove_it(string, what):
@@ -82,8 +96,17 @@ def remove_it(string, what):
 
 
 def column_width(string):
+    string = unicode(string)
+    try:
+        # plain ascii text is one column per character, which spares
+        # looking up the width of every single character
+        string.encode('ascii')
+        return len(string)
+    except UnicodeEncodeError:
+        pass
+
     l = 0
-    for c in unicode(string):
+    for c in string:
         if unicodedata.east_asian_width(c) in "WF":
             l += 2
         else:
@@ -104,41 +127,32 @@ def getlen(string):
     return column_width(unicode(string)) + 1
 
 
-def dicts_to_string(dicts, order):
-    escape = "#{%s}" % unicode(time.time())
-
-    def enline(line):
-        return unicode(line).replace("|", escape)
-
-    def deline(line):
-        return line.replace(escape, '\\|')
-
-    keys_and_sizes = dict([(k, getlen(k)) for k in dicts[0].keys()])
-    for key in keys_and_sizes:
-        for data in dicts:
-            current_size = keys_and_sizes[key]
-            value = unicode(data.get(key, ''))
-            size = getlen(value)
-            if size > current_size:
-                keys_and_sizes[key] = size
-
-    names = []
-    for key in order:
-        size = keys_and_sizes[key]
-        name = u" %s" % rfill(key, size)
-        names.append(enline(name))
-
-    table = [u"|%s|" % "|".join(names)]
+def column_sizes(dicts, order):
+    """Measures how wide each column of a table has to be, in a single
+    pass over its rows"""
+    sizes = dict([(key, getlen(key)) for key in order])
     for data in dicts:
-        names = []
         for key in order:
-            value = data.get(key, '')
-            size = keys_and_sizes[key]
-            names.append(enline(u" %s" % rfill(value, size)))
+            size = getlen(data.get(key, ''))
+            if size > sizes[key]:
+                sizes[key] = size
+
+    return sizes
+
 
-        table.append(u"|%s|" % "|".join(names))
+def row_to_string(data, order, sizes):
+    """Renders a single table row, escaping the pipes within cells"""
+    cells = [u" %s" % rfill(data.get(key, ''), sizes[key]) for key in order]
+    return u"|%s|" % u"|".join([c.replace(u"|", u"\\|") for c in cells])
+
+
+def dicts_to_string(dicts, order):
+    sizes = column_sizes(dicts, order)
+    table = [row_to_string(dict(zip(order, order)), order, sizes)]
+    for data in dicts:
+        table.append(row_to_string(data, order, sizes))
 
-    return deline(u"\n".join(table) + u"\n")
+    return u"\n".join(table) + u"\n"
 
 
 def parse_hashes(lines):
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+
+
+class REP(object):
+    "RegEx Pattern"
+    token = re.compile(r'[()]|[^\s()]+')
+    operator = re.compile(r'(?:^|\s)(?:and|or|not)(?:\s|$)|[()]')
+    arguments = re.compile(r'(^|[\s(])([^\s()]+)\([^()]*\)')
+
+
+OPERATORS = ('and', 'or', 'not', '(', ')')
+
+
+def without_arguments(string):
+    """Drops the arguments of the tags, as in @benchmark(runs=5), which
+    take no part in choosing the scenarios to run"""
+    def drop(found):
+        if found.group(2) in OPERATORS:
+            return found.group(0)
+
+        return found.group(1) + found.group(2)
+
+    return REP.arguments.sub(drop, string)
+
+
+def is_expression(string):
+    """Tells whether the given tag option is a boolean expression, like
+    "@api and not @slow", rather than a single tag"""
+    return bool(REP.operator.search(without_arguments(string).strip()))
+
+
+class TagExpression(object):
+    """A boolean expression of tags compiled into a predicate. Call it
+    with the tags of a scenario to know whether the scenario matches.
+
+    Examples::
+
+    >>> from lettuce.tags import TagExpression
+    >>> expression = TagExpression('@api and not (@slow or @wip)')
+    >>> assert expression(['api', 'fast'])
+    >>> assert not expression(['api', 'wip'])
+    """
+
+    def __init__(self, string):
+        self.string = string
+        self.tokens = REP.token.findall(without_arguments(string))
+        self.position = 0
+        self.predicate = self._parse_or()
+        if self.position < len(self.tokens):
+            self._fail('unexpected "%s"' % self.tokens[self.position])
+
+    def __call__(self, tags):
+        return self.predicate(set(tags or []))
+
+    def __repr__(self):
+        return '<TagExpression "%s">' % self.string
+
+    def _fail(self, reason):
+        raise ValueError('Invalid tag expression "%s": %s' % (
+            self.string, reason))
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            self._fail('unexpected end of expression')
+
+        self.position += 1
+        return token
+
+    def _parse_or(self):
+        operands = [self._parse_and()]
+        while self._peek() == 'or':
+            self._next()
+            operands.append(self._parse_and())
+
+        if len(operands) is 1:
+            return operands[0]
+
+        return lambda tags: any([operand(tags) for operand in operands])
+
+    def _parse_and(self):
+        operands = [self._parse_not()]
+        while self._peek() == 'and':
+            self._next()
+            operands.append(self._parse_not())
+
+        if len(operands) is 1:
+            return operands[0]
+
+        return lambda tags: all([operand(tags) for operand in operands])
+
+    def _parse_not(self):
+        token = self._next()
+        if token == 'not':
+            operand = self._parse_not()
+            return lambda tags: not operand(tags)
+
+        if token == '(':
+            operand = self._parse_or()
+            if self._next() != ')':
+                self._fail('missing ")"')
+
+            return operand
+
+        if token in OPERATORS:
+            self._fail('unexpected "%s"' % token)
+
+        tag = token.lstrip('@')
+        return lambda tags: tag in tags
+
+
+def parse(options):
+    """Turns the tags given in the command line into what
+    `lettuce.Runner` expects: expressions get compiled while single
+    tags just lose their "@" prefix"""
+    if not options:
+        return None
+
+    tags = []
+    for option in options:
+        if is_expression(option):
+            tags.append(TagExpression(option))
+        else:
+            tags.append(without_arguments(option).strip().strip('@'))
+
+    return tags
+
+
+FUZZY_RATIOS = {}
+
+
+def fuzzy_ratio(one, other):
+    """fuzz.ratio memoized, since the same (tag, tag) pairs are compared
+    once per scenario"""
+    key = (one, other)
+    if key not in FUZZY_RATIOS:
+        # imported here since approximate tags are seldom used
+        from fuzzywuzzy import fuzz
+        FUZZY_RATIOS[key] = fuzz.ratio(one, other)
+
+    return FUZZY_RATIOS[key]
+
+
+def tags_match(own_tags, tags):
+    """Tells whether a scenario tagged with `own_tags` should run when
+    lettuce was asked to run `tags`, which may contain plain tags,
+    tags prefixed with "-" or "~" and compiled tag expressions"""
+    if tags is None:
+        return True
+
+    expressions = [t for t in tags if callable(t)]
+    if expressions:
+        if not all([expression(own_tags) for expression in expressions]):
+            return False
+
+        tags = [t for t in tags if not callable(t)]
+        if not tags:
+            return True
+
+    has_exclusionary_tags = any([t.startswith('-') for t in tags])
+
+    if not own_tags and not has_exclusionary_tags:
+        return False
+
+    matched = []
+
+    for tag in own_tags:
+        if tag in tags:
+            return True
+
+    for tag in tags:
+        exclude = tag.startswith('-')
+        if exclude:
+            tag = tag[1:]
+
+        fuzzable = tag.startswith('~')
+        if fuzzable:
+            tag = tag[1:]
+
+        result = tag in own_tags
+        if fuzzable:
+            fuzzed = []
+            for internal_tag in own_tags:
+                ratio = fuzzy_ratio(tag, internal_tag)
+                if exclude:
+                    fuzzed.append(ratio <= 80)
+                else:
+                    fuzzed.append(ratio > 80)
+
+            result = any(fuzzed)
+        elif exclude:
+            result = tag not in own_tags
+
+        matched.append(result)
+
+    return all(matched)
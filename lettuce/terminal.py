@@ -15,11 +15,28 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import sys
+import time
+import signal
 import platform
+import threading
 import struct
 
+_size = None
+
 
 def get_size():
+    """Returns the terminal size, measured once and then again only
+    when the terminal gets resized"""
+    global _size
+    if _size is None:
+        _size = measure_size()
+        refresh_size_on_resize()
+
+    return _size
+
+
+def measure_size():
     if platform.system() == "Windows":
         size = get_terminal_size_win()
     else:
@@ -31,6 +48,95 @@ def get_size():
     return size
 
 
+def refresh_size_on_resize():
+    if not hasattr(signal, 'SIGWINCH'):
+        return
+
+    # signal handlers can only be installed from the main thread
+    if not isinstance(threading.current_thread(), threading._MainThread):
+        return
+
+    previous = signal.getsignal(signal.SIGWINCH)
+
+    def forget_size(signum, frame):
+        global _size
+        _size = None
+        if callable(previous):
+            previous(signum, frame)
+
+    try:
+        signal.signal(signal.SIGWINCH, forget_size)
+    except (ValueError, RuntimeError):
+        pass
+
+
+class OutputSink(object):
+    """Buffers what the output plugins write to stdout, so that the many
+    fragments written for each step reach it in a few writes.
+
+    The buffer gets flushed whenever `flush` is called, which the
+    plugins do on scenario boundaries and before each step runs, so
+    that whatever the step prints stays in place, when the buffer is
+    older than `interval` seconds and, when stdout is a terminal, on
+    every new line.
+
+    When stdout is a file or a pipe, `append_only` tells the plugins to
+    avoid cursor movements, since they would only clutter the logs."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.stream = None
+        self.isatty = False
+        self.append_only = False
+        self.buffer = []
+        self.started = None
+
+    def bind(self):
+        """Follows sys.stdout when it gets replaced, flushing what was
+        meant for the previous one"""
+        if self.stream is sys.stdout:
+            return self.stream
+
+        self.flush()
+        self.stream = sys.stdout
+
+        isatty = getattr(self.stream, 'isatty', None)
+        self.isatty = bool(isatty and isatty())
+        try:
+            self.stream.fileno()
+            self.append_only = not self.isatty
+        except (AttributeError, IOError, ValueError):
+            # in-memory buffers get the same output as a terminal
+            self.append_only = False
+
+        return self.stream
+
+    def write(self, what):
+        self.bind()
+        if isinstance(what, unicode):
+            what = what.encode('utf-8')
+
+        if not self.buffer:
+            self.started = time.time()
+
+        self.buffer.append(what)
+
+        if self.isatty and '\n' in what:
+            self.flush()
+        elif time.time() - self.started >= self.interval:
+            self.flush()
+
+    def flush(self, *args):
+        if not self.buffer:
+            return
+
+        data, self.buffer = ''.join(self.buffer), []
+        self.stream.write(data)
+        self.stream.flush()
+
+sink = OutputSink()
+
+
 def get_terminal_size_win():
     #Windows specific imports
     from ctypes import windll, create_string_buffer
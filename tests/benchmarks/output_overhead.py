@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Measures how much each output plugin adds to every step ran,
+compared with running the same features with no output plugin at all.
+
+    python tests/benchmarks/output_overhead.py [scenarios] [steps]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import lettuce
+from lettuce import core
+from lettuce import registry
+
+STEPS = '''
+from lettuce import step
+
+@step(r'I do step number (\\d+)')
+def do_step(step, number):
+    pass
+'''
+
+VERBOSITIES = (
+    ('no output plugin', None),
+    ('-v 0 (non verbose)', 0),
+    ('-v 1 (dots)', 1),
+    ('-v 2 (scenario names)', 2),
+    ('-v 3 (shell output)', 3),
+    ('-v 4 (colored output)', 4),
+)
+
+
+def make_suite(scenarios, steps):
+    base = tempfile.mkdtemp()
+    lines = ['Feature: Output overhead', '']
+    for scenario in range(scenarios):
+        lines.append('  Scenario: Scenario number %d' % scenario)
+        for number in range(steps):
+            lines.append('    Given I do step number %d' % number)
+        lines.append('')
+
+    open(os.path.join(base, 'overhead.feature'), 'w').write('\n'.join(lines))
+    open(os.path.join(base, 'overhead_steps.py'), 'w').write(STEPS)
+    return base
+
+
+def run_without_plugin(base):
+    registry.clear()
+    runner = lettuce.Runner(base, verbosity=0)
+    registry.CALLBACK_REGISTRY.clear()
+    runner.loader.find_and_load_step_definitions()
+    for filename in runner.loader.find_feature_files():
+        core.Feature.from_file(filename).run()
+
+
+def run_with_plugin(base, verbosity):
+    registry.clear()
+    lettuce.Runner(base, verbosity=verbosity).run()
+
+
+def measure(base, verbosity, repeat=3):
+    best = None
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        for attempt in range(repeat):
+            started = time.time()
+            if verbosity is None:
+                run_without_plugin(base)
+            else:
+                run_with_plugin(base, verbosity)
+            elapsed = time.time() - started
+            best = best is None and elapsed or min(best, elapsed)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    return best
+
+
+def main(args=sys.argv[1:]):
+    scenarios = int(args and args[0] or 50)
+    steps = int(len(args) > 1 and args[1] or 20)
+    total = scenarios * steps
+    base = make_suite(scenarios, steps)
+
+    try:
+        baseline = measure(base, None)
+        print "%d scenarios, %d steps" % (scenarios, total)
+        for name, verbosity in VERBOSITIES:
+            elapsed = verbosity is None and baseline or measure(base, verbosity)
+            overhead = (elapsed - baseline) / total * 1e6
+            print "%-24s %8.3fs %+10.1fus per step" % (name, elapsed, overhead)
+    finally:
+        shutil.rmtree(base)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Measures how long it takes to parse features, alone and along with
+what the runner asks of each step of a suite that passes: its sentence
+and table, but neither its location nor a proposed definition for it.
+
+    python tests/benchmarks/parse_features.py [features] [scenarios] [steps]
+"""
+import sys
+import time
+
+from lettuce import core
+
+TABLE = '''      | name    | city           |
+      | Gabriel | Rio de Janeiro |
+      | Lincoln | Sao Paulo      |'''
+
+
+def make_feature(scenarios, steps):
+    lines = ['Feature: Parsing', '']
+    for scenario in range(scenarios):
+        lines.append('  Scenario: Scenario number %d' % scenario)
+        for number in range(steps):
+            lines.append('    Given I do step "number %d"' % number)
+            if number % 5 == 0:
+                lines.append(TABLE)
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def parse(strings):
+    return [core.Feature.from_string(string, with_file='parsing%d.feature' %
+                                     index)
+            for index, string in enumerate(strings)]
+
+
+def parse_and_run(strings):
+    for feature in parse(strings):
+        for scenario in feature.scenarios:
+            for step in scenario.steps:
+                step.sentence, step.hashes
+
+
+def measure(function, strings, repeat=3):
+    best = None
+    for attempt in range(repeat):
+        started = time.time()
+        function(strings)
+        elapsed = time.time() - started
+        best = best is None and elapsed or min(best, elapsed)
+
+    return best
+
+
+def main(args=sys.argv[1:]):
+    features = int(args and args[0] or 20)
+    scenarios = int(len(args) > 1 and args[1] or 20)
+    steps = int(len(args) > 2 and args[2] or 10)
+    total = features * scenarios * steps
+    strings = [make_feature(scenarios, steps)] * features
+
+    print "%d features, %d scenarios, %d steps" % (
+        features, features * scenarios, total)
+    for name, function in (('parsing', parse),
+                           ('parsing and running', parse_and_run)):
+        elapsed = measure(function, strings)
+        print "%-20s %8.3fs %10.1fus per step" % (
+            name, elapsed, elapsed / total * 1e6)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+Feature: Timings compared with a baseline
+
+  Scenario: Wait a little
+    Given I wait for 5 milliseconds
+    And I wait for 5 milliseconds
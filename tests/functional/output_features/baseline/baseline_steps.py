@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+import time
+from lettuce import step
+
+@step(u'I wait for (\d+) milliseconds')
+def wait_for(step, milliseconds):
+    time.sleep(int(milliseconds) / 1000.0)
@@ -0,0 +1,11 @@
+Feature: Benchmarked searches
+  @benchmark(runs=5,warmup=2)
+  Scenario: Search quickly
+    Given I search for something
+    Then p95 latency should be under 10s
+    And mean latency should be under 10s
+
+  @benchmark(runs=3,warmup=0)
+  Scenario: Search too slowly
+    Given I search for something
+    Then max latency should be under 0ms
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from lettuce import step, world
+
+@step(u'Given I search for something')
+def given_i_search_for_something(step):
+    world.searches = getattr(world, 'searches', 0) + 1
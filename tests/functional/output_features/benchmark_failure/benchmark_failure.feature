@@ -0,0 +1,4 @@
+Feature: Benchmark failing while sampled
+  @benchmark(runs=2,warmup=0)
+  Scenario: Fail only the first time
+    Given I fail the first time only
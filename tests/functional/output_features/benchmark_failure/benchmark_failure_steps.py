@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from lettuce import step, world
+
+@step(u'Given I fail the first time only')
+def fail_the_first_time(step):
+    world.attempts = getattr(world, 'attempts', 0) + 1
+    assert world.attempts > 1, 'first attempt'
@@ -0,0 +1,18 @@
+Feature: Steps resolved before running anything
+
+  Background:
+    Given I count the steps ran
+
+  Scenario: Defined and undefined steps
+    Given I count the steps ran
+    When I do something nobody defined
+    Then I click "OK"
+
+  Scenario Outline: Examples with undefined steps
+    Given I count the steps ran
+    Then I see <number> apples
+
+  Examples:
+    | number |
+    | 1      |
+    | many   |
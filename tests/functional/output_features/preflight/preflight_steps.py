@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from lettuce import step, world
+
+@step(u'I count the steps ran')
+@step(u'I count the steps that ran')
+def count_steps(step):
+    world.steps_ran = getattr(world, 'steps_ran', 0) + 1
+
+@step(u'I click "(.*)"')
+def click(step, button):
+    pass
+
+@step(u'I click "OK"')
+def click_ok(step):
+    pass
+
+@step(u'I see (\d+) apples')
+def see_apples(step, number):
+    pass
+
+@step(u'I never get used')
+def never_used(step):
+    pass
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import json
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_save_baseline_adds_to_the_saved_timings():
+    "Saving a baseline adds the timings of the run to the ones saved before"
+    filename = os.path.join(mkdtemp(), 'baseline.json')
+    for run in range(2):
+        Runner(ojoin('baseline'), verbosity=0, save_baseline=filename).run()
+        registry.clear()
+
+    with open(filename) as saved:
+        baseline = json.load(saved)
+
+    [(scenario, timing)] = baseline['scenario'].items()
+    assert scenario.endswith(u'baseline.feature::Wait a little'), scenario
+    assert_equals(len(timing['samples']), 2)
+    [(definition, timing)] = baseline['step'].items()
+    assert definition.endswith(u'baseline_steps.py:6'), definition
+    assert_equals(timing['name'], u'wait_for')
+    assert_equals(len(timing['samples']), 4)
+    assert min(timing['samples']) >= 0.005
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_compare_baseline_reports_the_regressions():
+    "Comparing with a baseline reports the timings that got significantly slower"
+    filename = os.path.join(mkdtemp(), 'baseline.json')
+    Runner(ojoin('baseline'), verbosity=0, save_baseline=filename).run()
+    registry.clear()
+    with open(filename) as saved:
+        baseline = json.load(saved)
+
+    # as if the step took a millisecond on the reference run
+    for timing in baseline['step'].values():
+        timing['samples'] = [0.001, 0.0011, 0.0009, 0.001]
+    with open(filename, 'w') as saved:
+        json.dump(baseline, saved)
+
+    total = Runner(ojoin('baseline'), verbosity=0,
+                   compare_baseline=filename).run()
+
+    assert_equals(len(total.regressions), 1)
+    regression = total.regressions[0]
+    assert_equals(regression.kind, 'step')
+    assert_equals(regression.samples, (4, 2))
+    assert regression.ratio > 4, regression.ratio
+
+    report = sys.stdout.getvalue()
+    assert u"Compared 2 timings with the baseline: 1 regressed by more " \
+        u"than 20%" in report, report
+    assert u"REGRESSED" in report
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_compare_baseline_passes_without_regressions():
+    "Comparing with the baseline of an identical run finds no regression"
+    filename = os.path.join(mkdtemp(), 'baseline.json')
+    Runner(ojoin('baseline'), verbosity=0, save_baseline=filename).run()
+    registry.clear()
+
+    total = Runner(ojoin('baseline'), verbosity=0, compare_baseline=filename,
+                   max_regression=1.0).run()
+    assert_equals(total.regressions, [])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_compare_baseline_saved_from_a_single_run():
+    "Comparing with a baseline of a single run warns about the untested timings"
+    filename = os.path.join(mkdtemp(), 'baseline.json')
+    Runner(ojoin('baseline'), verbosity=0, save_baseline=filename).run()
+    registry.clear()
+
+    Runner(ojoin('baseline'), verbosity=0, compare_baseline=filename).run()
+    assert u"Warning: 1 timings have a single duration both in the " \
+        u"baseline and in this run" in sys.stdout.getvalue()
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_compare_baseline_saved_from_several_runs():
+    "A baseline saved from several runs finds the scenarios that got slower"
+    filename = os.path.join(mkdtemp(), 'baseline.json')
+    for run in range(3):
+        Runner(ojoin('baseline'), verbosity=0, save_baseline=filename).run()
+        registry.clear()
+
+    with open(filename) as saved:
+        baseline = json.load(saved)
+
+    # as if the scenario took a millisecond on the reference runs
+    for timing in baseline['scenario'].values():
+        timing['samples'] = [0.001, 0.0011, 0.0009]
+    with open(filename, 'w') as saved:
+        json.dump(baseline, saved)
+
+    total = Runner(ojoin('baseline'), verbosity=0,
+                   compare_baseline=filename).run()
+    assert 'scenario' in [change.kind for change in total.regressions]
+    assert u"Warning" not in sys.stdout.getvalue()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+import json
+from os.path import join
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce import tags
+from lettuce.terrain import world
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name
+
+
+def forget_searches():
+    registry.clear()
+    world.searches = 0
+
+
+@with_setup(prepare_stdout, forget_searches)
+def test_benchmark_scenarios():
+    "@benchmark scenarios run many times and check the durations sampled"
+    filename = join(mkdtemp(), 'events.jsonl')
+    total = Runner(feature_name('benchmark'), verbosity=3,
+                   jsonl_output=filename).run()
+
+    # warm-up and sampled runs, plus the one reported, for each scenario
+    assert_equals(world.searches, (2 + 5 + 1) + (0 + 3 + 1))
+    assert_equals(total.scenarios_passed, 1)
+    assert_equals(total.steps_failed, 1)
+
+    events = [json.loads(line) for line in open(filename)]
+    benchmarks = [e for e in events if e['event'] == 'benchmark']
+    assert_equals([len(b['samples']) for b in benchmarks], [5, 3])
+    assert_equals(benchmarks[0]['steps'][0]['step'],
+                  u'Given I search for something')
+
+    output = sys.stdout.getvalue()
+    assert 'Benchmark: 5 runs after 2 warm-up: min ' in output, output
+    assert 'The max latency is ' in output, output
+
+
+@with_setup(prepare_stdout, forget_searches)
+def test_benchmark_failures_do_not_leak_into_the_scenario():
+    "A step failing while a benchmark samples it can still pass afterwards"
+    world.attempts = 0
+    total = Runner(feature_name('benchmark_failure'), verbosity=0).run()
+
+    assert_equals(world.attempts, 2)
+    assert_equals(total.steps_failed, 0)
+    assert_equals(total.steps_passed, 1)
+    [scenario] = total.scenario_results
+    assert scenario.scenario.benchmark_statistics.error
+    assert_equals(scenario.steps_passed[0].failed, None)
+
+
+@with_setup(prepare_stdout, forget_searches)
+def test_benchmark_scenarios_are_chosen_by_the_tag_name():
+    "-t benchmark and -t -benchmark ignore the arguments of the tag"
+    total = Runner(feature_name('benchmark'), verbosity=0,
+                   tags=tags.parse(['-benchmark'])).run()
+    assert_equals(total.scenarios_ran, 0)
+
+    forget_searches()
+    total = Runner(feature_name('benchmark'), verbosity=0,
+                   tags=tags.parse(['@benchmark(runs=1)'])).run()
+    assert_equals(total.scenarios_ran, 2)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import pstats
+import shutil
+from tempfile import mkdtemp
+from nose.tools import assert_equals, assert_raises, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce.plugins import cprofile
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+SCENARIOS = 'tests/functional/output_features/many_successful_scenarios/' \
+            'first.feature::'
+
+
+def run_with_cprofile(unit, **kw):
+    """Runs with cProfile on, returning the names of the profiles written
+    and the profile of the run"""
+    directory = mkdtemp()
+    try:
+        Runner(ojoin('many_successful_scenarios'), cprofile=unit,
+               cprofile_dir=directory, **kw).run()
+        return (sorted(os.listdir(directory)),
+                pstats.Stats(os.path.join(directory, 'run.pstats')))
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_profile_name_is_stable_and_safe():
+    "cProfile files are named after the stable id, without punctuation"
+    name = cprofile.profile_name(u'features/a b.feature::Log in, again')
+    assert_equals(name, cprofile.profile_name(
+        u'features/a b.feature::Log in, again'))
+    assert name.startswith('features_a_b.feature_Log_in_again-'), name
+    assert name.endswith('.pstats'), name
+    assert name != cprofile.profile_name(u'features/a b.feature::Log in again')
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cprofile_each_scenario():
+    "--cprofile=scenario writes a profile per scenario and one for the run"
+    files, stats = run_with_cprofile('scenario')
+
+    assert_equals(files, sorted([
+        cprofile.profile_name(SCENARIOS + 'Do nothing'),
+        cprofile.profile_name(SCENARIOS + 'Do nothing (again)'),
+        'run.pstats',
+    ]))
+
+    functions = [function for filename, line, function in stats.stats]
+    assert_equals(functions.count('do_nothing'), 1)
+    calls = [stats.stats[key][0] for key in stats.stats
+             if key[2] == 'do_nothing']
+    assert_equals(calls, [2])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cprofile_each_feature_and_run():
+    "--cprofile=feature profiles each feature and --cprofile=run the run"
+    files, stats = run_with_cprofile('feature')
+    assert_equals(len(files), 2)
+    assert 'run.pstats' in files
+
+    registry.clear()
+    files, stats = run_with_cprofile('run')
+    assert_equals(files, ['run.pstats'])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cprofile_threshold():
+    "--cprofile-threshold leaves out the profiles of the faster scenarios"
+    files, stats = run_with_cprofile('scenario', cprofile_threshold=60)
+    assert_equals(files, ['run.pstats'])
+
+
+def test_cprofile_unknown_unit():
+    "cProfile can only profile scenarios, features or the run"
+    assert_raises(ValueError, cprofile.enable, 'step', 'profiles')
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import shutil
+from os.path import join
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name, bg_feature_name
+
+
+def run_with_cucumber_json(path, **kw):
+    directory = mkdtemp()
+    filename = join(directory, 'cucumber.json')
+    try:
+        Runner(path, cucumber_json=filename, **kw).run()
+        with open(filename) as stream:
+            return json.load(stream)
+    finally:
+        shutil.rmtree(directory)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cucumber_json_output():
+    "The cucumber json output describes features, scenarios and steps"
+    features = run_with_cucumber_json(feature_name('error_traceback'))
+
+    feature, = features
+    assert_equals(feature['uri'], 'tests/functional/output_features/'
+                  'error_traceback/error_traceback.feature')
+    assert_equals(feature['name'], 'Error traceback for output testing')
+    assert_equals(feature['line'], 1)
+
+    passed, failed = feature['elements']
+    assert_equals(passed['id'], 'error-traceback-for-output-testing;it-should-pass')
+    assert_equals(passed['type'], 'scenario')
+    assert_equals(passed['line'], 2)
+
+    step, = passed['steps']
+    assert_equals(step['keyword'], 'Given ')
+    assert_equals(step['name'], 'my step that passes')
+    assert_equals(step['result']['status'], 'passed')
+    assert step['result']['duration'] > 0
+    assert step['match']['location'].endswith('error_traceback_steps.py:5')
+
+    step, = failed['steps']
+    assert_equals(step['result']['status'], 'failed')
+    assert 'RuntimeError' in step['result']['error_message']
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cucumber_json_output_with_outlines():
+    "The cucumber json output has an element per outline example"
+    features = run_with_cucumber_json(feature_name('fail_outline'))
+
+    elements = features[0]['elements']
+    assert_equals([e['id'].split(';;')[-1] for e in elements], ['2', '3', '4'])
+    statuses = [[s['result']['status'] for s in e['steps']] for e in elements]
+    assert 'failed' in statuses[1]
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_cucumber_json_output_with_background():
+    "The cucumber json output has the background before each scenario"
+    from lettuce import step
+
+    @step(ur'the variable "(\w+)" holds (\d+)')
+    @step(ur'the variable "(\w+)" is equal to (\d+)')
+    def just_pass(step, *args):
+        pass
+
+    features = run_with_cucumber_json(bg_feature_name('simple'))
+
+    background, scenario = features[0]['elements']
+    assert_equals(background['type'], 'background')
+    assert_equals([s['name'] for s in background['steps']],
+                  ['the variable "X" holds 2'])
+    assert_equals(scenario['type'], 'scenario')
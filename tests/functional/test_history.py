@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sqlite3
+from mock import patch
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce.history import HistoryDatabase
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_history_db_records_every_run():
+    "The history database records the scenarios and steps of each run"
+    filename = os.path.join(mkdtemp(), 'history.db')
+    for run in range(2):
+        Runner(ojoin('many_successful_scenarios'), verbosity=0,
+               history_db=filename).run()
+        registry.clear()
+
+    connection = sqlite3.connect(filename)
+    assert_equals(connection.execute(
+        'SELECT COUNT(*), SUM(passed) FROM runs').fetchone(), (2, 2))
+    scenarios = connection.execute(
+        'SELECT scenario FROM scenarios WHERE run_id = 2').fetchall()
+    assert_equals(len(scenarios), 2)
+    assert scenarios[0][0].endswith('first.feature::Do nothing')
+    steps = connection.execute(
+        'SELECT definition, status FROM steps WHERE run_id = 2').fetchall()
+    assert_equals([status for definition, status in steps],
+                  ['passed', 'passed'])
+    assert steps[0][0].endswith('dumb_steps.py:6')
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_history_db_records_undefined_steps_as_failures():
+    "Scenarios with undefined steps are recorded as failed"
+    filename = os.path.join(mkdtemp(), 'history.db')
+    with patch.object(HistoryDatabase, 'close') as close:
+        Runner(ojoin('undefined_steps'), verbosity=0,
+               history_db=filename).run()
+        assert_equals(close.call_count, 1)
+
+    connection = sqlite3.connect(filename)
+    assert_equals(connection.execute(
+        'SELECT COUNT(*), SUM(passed) FROM scenarios').fetchone(), (2, 0))
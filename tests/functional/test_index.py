@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+
+from mock import patch
+from nose.tools import assert_equals, with_setup
+from os.path import dirname, join, abspath
+from lettuce import Runner
+from lettuce.core import Feature
+from lettuce.index import SuiteIndex
+from lettuce.tags import TagExpression
+from tests.asserts import prepare_stdout, assert_stdout_lines
+
+current_dir = abspath(dirname(__file__))
+tjoin = lambda *x: join(current_dir, 'tag_features', *x)
+sjoin = lambda *x: join(current_dir, 'simple_features', *x)
+
+timebound = tjoin('timebound', 'timebound.feature')
+
+
+def test_index_stores_scenario_names_lines_and_tags():
+    "SuiteIndex keeps the names, lines and tags of the scenarios"
+    index = SuiteIndex('unused')
+    entry = index.add(timebound, Feature.from_file(timebound))
+
+    assert_equals(entry['scenarios'], [
+        {'name': u'this one is kinda slow', 'line': 7, 'tags': [u'slow-ish']},
+        {'name': u'this one is fast!!', 'line': 13, 'tags': [u'fast-ish']},
+    ])
+    assert index.lookup(timebound) is entry
+
+
+def test_index_tells_which_features_may_run():
+    "SuiteIndex.may_run evaluates scenario numbers, tags and expressions"
+    index = SuiteIndex('unused')
+    entry = index.add(timebound, Feature.from_file(timebound))
+
+    assert index.may_run(entry)
+    assert index.may_run(entry, tags=['fast-ish'])
+    assert index.may_run(entry, tags=['~fast-is'])
+    assert not index.may_run(entry, tags=['api'])
+    assert not index.may_run(entry, tags=[TagExpression('not @slow-ish and not @fast-ish')])
+    assert index.may_run(entry, scenarios=[2])
+    assert not index.may_run(entry, scenarios=[3])
+
+
+def test_index_is_persisted_and_invalidated_by_changes():
+    "SuiteIndex is saved to disk and forgets feature files that changed"
+    filename = tempfile.mktemp()
+    feature_file = tempfile.mktemp(suffix='.feature')
+    open(feature_file, 'w').write(open(timebound).read())
+
+    try:
+        index = SuiteIndex.load(filename)
+        index.add(feature_file, Feature.from_file(feature_file))
+        index.save()
+
+        index = SuiteIndex.load(filename)
+        assert index.lookup(feature_file)
+
+        open(feature_file, 'a').write('\n')
+        assert_equals(index.lookup(feature_file), None)
+    finally:
+        for path in (filename, feature_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+@with_setup(prepare_stdout)
+def test_runner_with_index_skips_parsing_features_without_matches():
+    "Runner with a suite index does not parse features it will not run"
+    filename = tempfile.mktemp()
+    try:
+        Runner(sjoin(), verbosity=1, tags=['nothing-tagged-like-this'],
+               index_file=filename).run()
+        assert os.path.exists(filename)
+
+        with patch.object(Feature, 'from_file') as from_file:
+            Runner(sjoin(), verbosity=1, tags=['nothing-tagged-like-this'],
+                   index_file=filename).run()
+            assert_equals(from_file.call_count, 0)
+    finally:
+        os.remove(filename)
+
+
+@with_setup(prepare_stdout)
+def test_runner_runs_the_scenario_at_the_given_line():
+    "Runner given path/to/file.feature:LINE runs only that scenario"
+    from lettuce import step
+
+    @step('I wait for (\d+) seconds')
+    def wait_for(step, seconds):
+        assert seconds == '0'
+
+    @step('the time passed is (.*)')
+    def time_passed(step, time):
+        assert time == '0 seconds'
+
+    Runner('%s:15' % timebound, verbosity=1).run()
+
+    assert_stdout_lines(
+        "."
+        "\n"
+        "1 feature (1 passed)\n"
+        "1 scenario (1 passed)\n"
+        "2 steps (2 passed)\n"
+    )
+
+
+NAMESAKES = u'''Feature: Namesakes
+
+  Scenario: Login fails
+    Given I record "first"
+
+  Scenario: Login
+    Given I record "second"
+
+  Scenario: Login fails
+    Given I record "third"
+'''
+
+NAMESAKES_STEPS = '''
+from lettuce import step, world
+
+@step('I record "(.*)"')
+def record(step, what):
+    world.recorded.append(what)
+'''
+
+
+@with_setup(prepare_stdout)
+def test_runner_tells_apart_scenarios_named_alike_by_line():
+    "Runner given file.feature:LINE runs that scenario even if names repeat"
+    from lettuce import world
+
+    folder = tempfile.mkdtemp()
+    feature_file = join(folder, 'namesakes.feature')
+    index_file = join(folder, 'index')
+    with open(feature_file, 'w') as stream:
+        stream.write(NAMESAKES)
+    with open(join(folder, 'namesakes_steps.py'), 'w') as stream:
+        stream.write(NAMESAKES_STEPS)
+
+    try:
+        for index in (None, index_file, index_file):
+            for line, expected in ((3, 'first'), (6, 'second'),
+                                   (9, 'third'), (10, 'third')):
+                world.recorded = []
+                Runner('%s:%d' % (feature_file, line), verbosity=0,
+                       index_file=index).run()
+                assert_equals(world.recorded, [expected])
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import shutil
+from os.path import join
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name, bg_feature_name
+
+
+def run_with_jsonl(path, **kw):
+    directory = mkdtemp()
+    filename = join(directory, 'events.jsonl')
+    try:
+        Runner(path, jsonl_output=filename, **kw).run()
+        with open(filename) as stream:
+            return [json.loads(line) for line in stream]
+    finally:
+        shutil.rmtree(directory)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonl_output_events():
+    "The jsonl output writes an event per line as the run goes"
+    events = run_with_jsonl(feature_name('error_traceback'))
+
+    assert_equals([e['event'] for e in events], [
+        'run_start',
+        'feature_start',
+        'scenario_start', 'step', 'scenario_end',
+        'scenario_start', 'step', 'scenario_end',
+        'feature_end',
+        'run_end',
+    ])
+
+    steps = [e for e in events if e['event'] == 'step']
+    assert_equals([s['status'] for s in steps], ['passed', 'failed'])
+    assert 'RuntimeError' in steps[1]['error']
+    assert_equals(steps[1]['id'], 'tests/functional/output_features/'
+                  'error_traceback/error_traceback.feature::It should '
+                  'raise an exception different of AssertionError')
+
+    ended = [e for e in events if e['event'] == 'scenario_end']
+    assert_equals([e['status'] for e in ended], ['passed', 'failed'])
+    assert_equals(events[-1]['steps_failed'], 1)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonl_output_proposals_and_outlines():
+    "The jsonl output reports outline examples and undefined steps"
+    events = run_with_jsonl(feature_name('xunit_outlines'))
+
+    rows = [e for e in events if e['event'] == 'outline_row']
+    assert rows, 'no outline rows reported'
+    assert all(['values' in row for row in rows])
+
+    proposals = [e for e in events if e['event'] == 'proposal']
+    assert_equals([p['step'] for p in proposals], [
+        'When this test step is undefined',
+        'And this step is undefined',
+        'Then the output is undefined',
+    ])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonl_output_times_project_hooks():
+    "The jsonl output times the hooks of the project"
+    from lettuce import step
+    from lettuce.terrain import before
+
+    @before.each_scenario
+    def project_hook(scenario):
+        pass
+
+    @step(ur'the variable "(\w+)" holds (\d+)')
+    @step(ur'the variable "(\w+)" is equal to (\d+)')
+    def just_pass(step, *args):
+        pass
+
+    events = run_with_jsonl(bg_feature_name('simple'))
+
+    hooks = [e for e in events if e['event'] == 'hook']
+    assert_equals([h['name'] for h in hooks], ['project_hook'])
+    steps = [e for e in events if e['event'] == 'step']
+    assert_equals([s['background'] for s in steps], [True, False])
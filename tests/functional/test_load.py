@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, with_setup
+
+from lettuce import registry
+from lettuce.load import LoadTest
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_load_test_replays_the_scenarios_concurrently():
+    "A load test replays the scenarios with each virtual user until the time is up"
+    load = LoadTest([ojoin('many_successful_scenarios')], 3, 0.2).run()
+
+    assert load.passed
+    assert load.ran >= 3 * 2, load.ran
+    definitions = load.latencies.keys()
+    assert_equals(len(definitions), 1)
+    assert definitions[0].endswith('dumb_steps.py:6')
+    latencies = load.latencies[definitions[0]]
+    assert_equals(latencies.errors, 0)
+    assert_equals(latencies.calls, load.ran)
+    assert_equals(latencies.name, 'do_nothing')
+
+    report = load.report()
+    assert report.startswith(u"3 virtual users for 0.")
+    assert u"step definition" in report
+    assert u"(do_nothing)" in report
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_load_test_runs_only_the_selected_scenarios():
+    "A load test runs only the selected scenarios and counts undefined steps as errors"
+    load = LoadTest([ojoin('undefined_steps')], 2, 0.2, scenarios="1").run()
+
+    assert not load.passed
+    assert_equals(load.failed, load.ran)
+    undefined = load.latencies[u"(undefined)"]
+    assert_equals(undefined.errors, undefined.calls)
+    assert_equals(undefined.calls, load.ran)
+    assert u"this test step is undefined" in load.report()
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_load_test_leaves_out_the_skipped_steps():
+    "A load test counts failing steps as errors and leaves out the ones skipped after them"
+    load = LoadTest([ojoin('failed_table')], 1, 0.1).run()
+
+    assert not load.passed
+    assert load.ran > 0
+    assert_equals(load.failed, load.ran)
+    by_name = dict([(latencies.name, latencies)
+                    for latencies in load.latencies.values()])
+    assert_equals(sorted(by_name), [
+        u'And this one does not even has definition', 'hdstp', 'tof'])
+    assert_equals(by_name['hdstp'].errors, 0)
+    assert_equals(by_name['tof'].errors, by_name['tof'].calls)
+    assert u"(tof)" in load.report()
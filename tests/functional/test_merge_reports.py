@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import shutil
+from os.path import join
+from tempfile import mkdtemp
+from xml.etree import ElementTree
+from nose.tools import assert_equals, assert_raises, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce.merge import case_id, merge_reports
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name
+
+SHARDS = ['error_traceback', 'xunit_outlines', 'error_traceback']
+
+
+def run_shards(option, extension, **kw):
+    """Runs each shard with its report in a directory of its own, the
+    last one being a retry of the first"""
+    folder = mkdtemp()
+    for index, name in enumerate(SHARDS):
+        filename = join(folder, 'shard-%d.%s' % (index, extension))
+        kw[option] = filename
+        Runner(feature_name(name), **kw).run()
+        registry.clear()
+
+    return folder
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_merge_xunit_reports():
+    "merge-reports sums up the xunit shards, leaving out the retried ones"
+    folder = run_shards('xunit_filename', 'xml', enable_xunit=True,
+                        xunit_ids=True)
+    separate = [ElementTree.parse(join(folder, 'shard-%d.xml' % index))
+                for index in range(2)]
+
+    output = join(mkdtemp(), 'merged.xml')
+    merged = merge_reports([folder], output)
+    assert_equals(merged.inputs, 3)
+    assert_equals(merged.duplicates, 2)
+
+    root = ElementTree.parse(output).getroot()
+    assert_equals(unicode(merged), (
+        u"3 reports merged (%s tests, %s failures, %s errors, %s skipped), "
+        u"2 duplicates dropped" % tuple([root.get(total) for total in (
+            'tests', 'failures', 'errors', 'skipped')])))
+    for total in ('tests', 'failures', 'errors', 'skipped'):
+        assert_equals(int(root.get(total)), sum(
+            [int(tree.getroot().get(total)) for tree in separate]))
+
+    cases = root.findall('testcase')
+    assert_equals(len(cases), int(root.get('tests')))
+    ids = [case_id(case) for case in cases]
+    assert None not in ids
+    assert_equals(len(ids), len(set(ids)))
+    assert_equals(root.get('time'), "%.6f" % sum(
+        [float(case.get('time')) for case in cases]))
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_reports_have_no_ids_unless_asked():
+    "the xunit test cases only carry their ids with xunit_ids"
+    folder = mkdtemp()
+    filename = join(folder, 'report.xml')
+    Runner(feature_name('xunit_outlines'), enable_xunit=True,
+           xunit_filename=filename).run()
+
+    cases = ElementTree.parse(filename).getroot().findall('testcase')
+    assert cases
+    assert_equals([case_id(case) for case in cases], [None] * len(cases))
+
+
+def test_merge_xunit_reports_by_test_case_id():
+    "merge-reports tells the xunit test cases apart by their ids"
+    folder = mkdtemp()
+    testcase = ('<testcase classname="F" name="Same" time="1"><properties>'
+                '<property name="scenario.id" value="%s"/>'
+                '</properties></testcase>')
+    shard = ('<testsuite>' + testcase % 'a.feature::Same' + testcase +
+             '</testsuite>')
+    open(join(folder, 'one.xml'), 'w').write(shard % 'b.feature::Same')
+    open(join(folder, 'two.xml'), 'w').write(shard % 'c.feature::Same')
+
+    output = join(mkdtemp(), 'merged.xml')
+    merged = merge_reports([folder], output)
+    assert_equals(merged.duplicates, 1)
+
+    root = ElementTree.parse(output).getroot()
+    assert_equals([case_id(case) for case in root.findall('testcase')],
+                  ['a.feature::Same', 'b.feature::Same', 'c.feature::Same'])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_merge_jsonl_reports():
+    "merge-reports recounts the totals and proposals of JSON line shards"
+    folder = run_shards('jsonl_output', 'jsonl')
+    ends = [json.loads(open(join(folder, 'shard-%d.jsonl' % index))
+                       .readlines()[-1]) for index in range(2)]
+
+    output = join(mkdtemp(), 'merged.jsonl')
+    merge_reports([folder], output)
+    events = [json.loads(line) for line in open(output)]
+
+    assert_equals(events[0]['event'], 'run_start')
+    assert_equals(events[0]['shards'], 3)
+    for total in ('features', 'features_passed', 'scenarios',
+                  'scenarios_passed', 'steps', 'steps_passed',
+                  'steps_failed', 'steps_skipped', 'steps_undefined'):
+        assert_equals(events[-1][total], sum([end[total] for end in ends]))
+
+    started = [e['id'] for e in events if e['event'] == 'scenario_start']
+    assert_equals(len(started), len(set(started)))
+    assert_equals(len([e for e in events if e['event'] == 'proposal']), 3)
+    assert_equals(len([e for e in events if e['event'] == 'feature_end']), 2)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_merge_cucumber_json_reports():
+    "merge-reports joins the features of Cucumber JSON shards"
+    folder = run_shards('cucumber_json', 'json')
+
+    output = join(mkdtemp(), 'merged.json')
+    merged = merge_reports([folder], output)
+    features = json.load(open(output))
+
+    assert_equals(len(features), 2)
+    assert_equals(merged.totals['features'], 2)
+    ids = [element['id'] for feature in features
+           for element in feature['elements']]
+    assert_equals(len(ids), len(set(ids)))
+    assert_equals(merged.totals['scenarios'], len(ids))
+
+
+NAMESAKES = u'''Feature: Namesakes
+
+  Scenario: Login fails
+    Given I log in
+
+  Scenario: Login fails
+    Given I log in
+'''
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_merge_cucumber_json_reports_of_scenarios_named_alike():
+    "merge-reports keeps the Cucumber JSON scenarios named alike apart"
+    folder = mkdtemp()
+    feature_file = join(folder, 'namesakes.feature')
+    with open(feature_file, 'w') as stream:
+        stream.write(NAMESAKES)
+    with open(join(folder, 'namesakes_steps.py'), 'w') as stream:
+        stream.write('from lettuce import step\n'
+                     '@step("I log in")\n'
+                     'def log_in(step):\n'
+                     '    pass\n')
+
+    try:
+        for index, line in enumerate((3, 6)):
+            Runner('%s:%d' % (feature_file, line), cucumber_json=join(
+                folder, 'shard-%d.json' % index)).run()
+            registry.clear()
+
+        output = join(folder, 'merged.json')
+        merged = merge_reports([join(folder, 'shard-0.json'),
+                                join(folder, 'shard-1.json')], output)
+        with open(output) as stream:
+            features = json.load(stream)
+
+        assert_equals(merged.duplicates, 0)
+        assert_equals([element['id'] for feature in features
+                       for element in feature['elements']],
+                      ['namesakes;login-fails', 'namesakes;login-fails-2'])
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_merge_reports_of_different_formats():
+    "merge-reports refuses to merge reports of different formats"
+    folder = mkdtemp()
+    open(join(folder, 'one.xml'), 'w').write('<testsuite/>')
+    open(join(folder, 'two.jsonl'), 'w').write('{"event":"run_start"}\n')
+
+    assert_raises(ValueError, merge_reports, [folder],
+                  join(mkdtemp(), 'merged.xml'))
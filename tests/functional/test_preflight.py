@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce.terrain import world
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+def prepare_world():
+    prepare_stdout()
+    world.steps_ran = 0
+
+
+@with_setup(prepare_world, registry.clear)
+def test_dry_run_reports_without_running_anything():
+    "A dry run reports undefined, ambiguous and unused steps without running any"
+    hooks = []
+    registry.CALLBACK_REGISTRY.append_to(
+        'all', 'before', lambda: hooks.append('before.all'))
+
+    result = Runner(ojoin('preflight'), verbosity=0, dry_run=True).run()
+
+    assert_equals(result, None)
+    assert_equals(world.steps_ran, 0)
+    assert_equals(hooks, [])
+    report = sys.stdout.getvalue()
+    assert report.startswith(
+        "Resolved 9 steps of 2 scenarios in 1 features in "), report
+    assert "\n2 undefined steps:\n" \
+        "  Then I see many apples  # " in report, report
+    assert "preflight.feature:13\n" \
+        "  When I do something nobody defined  # " in report, report
+    assert "\n1 ambiguous step:\n" \
+        "  Then I click \"OK\"  # " in report, report
+    assert "preflight_steps.py:10 (click)\n" in report
+    assert "preflight_steps.py:14 (click_ok)\n" in report
+    assert "\n1 unused step definition:\n" in report
+    assert report.endswith("preflight_steps.py:22 (never_used)\n"), report
+
+
+@with_setup(prepare_world, registry.clear)
+def test_dry_run_passes_when_every_step_resolves():
+    "A dry run of the scenarios whose steps all resolve passes"
+    result = Runner(ojoin('many_successful_scenarios'), verbosity=0,
+                    dry_run=True).run()
+
+    assert_equals(result.steps, 0)
+    report = sys.stdout.getvalue()
+    assert "undefined" not in report, report
+    assert "ambiguous" not in report, report
+    assert report.endswith("\n1 unused step definition:\n  "
+                           "tests/functional/output_features/"
+                           "many_successful_scenarios/dumb_steps.py:8 "
+                           "(see_test_passes)\n"), report
+
+
+@with_setup(prepare_world, registry.clear)
+def test_preflight_runs_nothing_when_a_step_is_undefined():
+    "With a preflight, no step runs when some step is undefined"
+    result = Runner(ojoin('preflight'), verbosity=0, preflight=True).run()
+
+    assert_equals(result, None)
+    assert_equals(world.steps_ran, 0)
+    assert "2 undefined steps:" in sys.stdout.getvalue()
+
+
+@with_setup(prepare_world, registry.clear)
+def test_preflight_runs_the_features_when_every_step_resolves():
+    "With a preflight, the features run when every step resolves"
+    result = Runner(ojoin('many_successful_scenarios'), verbosity=0,
+                    preflight=True).run()
+
+    assert_equals(result.steps, 2)
+    assert_equals(result.steps_passed, 2)
+    assert "Resolved" not in sys.stdout.getvalue()
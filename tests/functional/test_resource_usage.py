@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+from os.path import join
+from tempfile import mkdtemp
+from xml.etree import ElementTree
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce import resources
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name
+
+
+def clear():
+    registry.clear()
+    resources.enable(False)
+
+
+@with_setup(prepare_stdout, clear)
+def test_resource_usage_in_jsonl_output():
+    "The resources used by each step and outline example are streamed"
+    filename = join(mkdtemp(), 'events.jsonl')
+    Runner(feature_name('success_outline'), jsonl_output=filename,
+           resource_usage=True).run()
+    events = [json.loads(line) for line in open(filename)]
+
+    rows = [e for e in events if e['event'] == 'outline_row']
+    assert rows
+    for event in rows + [e for e in events if e['event'] == 'step']:
+        assert_equals(sorted(event['resources']), sorted(resources.FIELDS))
+        assert event['resources']['user_time'] >= 0
+        assert event['resources']['max_rss'] > 0
+
+
+@with_setup(prepare_stdout, clear)
+def test_resource_usage_in_xunit_output():
+    "The resources used by each scenario are xunit test case properties"
+    filename = join(mkdtemp(), 'results.xml')
+    Runner(feature_name('success_outline'), enable_xunit=True,
+           xunit_filename=filename, xunit_per_scenario=True,
+           resource_usage=True).run()
+
+    for case in ElementTree.parse(filename).getroot().findall('testcase'):
+        names = [p.get('name') for p in case.findall('properties/property')]
+        assert_equals(names, sorted(['resources.%s' % field
+                                     for field in resources.FIELDS]))
+
+
+@with_setup(prepare_stdout, clear)
+def test_resource_usage_is_off_by_default():
+    "The resources used are not accounted for unless asked to"
+    filename = join(mkdtemp(), 'events.jsonl')
+    Runner(feature_name('success_outline'), jsonl_output=filename).run()
+
+    for line in open(filename):
+        assert 'resources' not in json.loads(line)
@@ -44,7 +44,7 @@ bjoin = lambda *x: join(current_dir, 'bg_features', *x)
 
 lettuce_path = lambda *x: fs.relpath(join(lettuce_dir, *x))
 
-call_line = StepDefinition.__call__.im_func.func_code.co_firstlineno + 5
+call_line = StepDefinition.__call__.im_func.func_code.co_firstlineno + 6
 
 
 def joiner(callback, name):
@@ -66,7 +66,7 @@ def test_try_to_import_terrain():
 
     try:
         import lettuce
-        reload(lettuce)
+        lettuce.load_terrain()
         raise AssertionError('The runner should raise ImportError !')
     except SystemExit:
         assert_stderr_lines_with_traceback(
@@ -74,10 +74,10 @@ def test_try_to_import_terrain():
             '"terrain"\nbut it has errors, check its contents and '
             'try to run lettuce again.\n\nOriginal traceback below:\n\n'
             "Traceback (most recent call last):\n"
-            '  File "%(lettuce_core_file)s", line 44, in <module>\n'
-            '    terrain = fs.FileSystem._import("terrain")\n'
-            '  File "%(lettuce_fs_file)s", line 63, in _import\n'
-            '    module = imp.load_module(name, fp, pathname, description)\n'
+            '  File "%(lettuce_core_file)s", line 67, in load_terrain\n'
+            '    _terrain = fs.FileSystem._import("terrain")\n'
+            '  File "%(lettuce_fs_file)s", line 191, in _import\n'
+            '    return imp.load_module(name, fp, pathname, description)\n'
             '  File "%(terrain_file)s", line 18\n'
             '    it is here just to cause a syntax error\n'
             "                  ^\n"
@@ -1407,4 +1407,134 @@ def test_output_with_undefined_steps_colorful():
         'def when_this_test_step_is_undefined(step):\n'
         "    assert False, 'This step must be implemented'\x1b[0m\n"
     )
-    
\ No newline at end of file
+    
+
+@with_setup(prepare_stdout)
+def test_run_within_time_budget_reports_deferred_scenarios():
+    "Runner with a time budget runs what fits and reports the rest"
+    import json
+    import tempfile
+
+    filename = ojoin('many_successful_scenarios', 'first.feature')
+    where = fs.relpath(filename)
+    history_file = tempfile.mktemp()
+    f = open(history_file, 'w')
+    json.dump({'scenarios': {
+        u'%s::Do nothing' % where: {
+            'duration': 100.0, 'runs': 3, 'failed_at': None, 'ran_at': 0},
+        u'%s::Do nothing (again)' % where: {
+            'duration': 1.0, 'runs': 3, 'failed_at': None, 'ran_at': 0},
+    }}, f)
+    f.close()
+
+    try:
+        runner = Runner(filename, verbosity=1, time_budget=10,
+                        history_file=history_file)
+        runner.run()
+
+        assert_stdout_lines(
+            "."
+            "\n"
+            "1 feature (1 passed)\n"
+            "1 scenario (1 passed)\n"
+            "1 step (1 passed)\n"
+            "\n"
+            "1 scenario deferred to fit the budget of 10s:\n"
+            "  %s::Do nothing\n" % where
+        )
+
+        history = json.load(open(history_file))['scenarios']
+        assert_equals(history[u'%s::Do nothing (again)' % where]['runs'], 4)
+        assert_equals(history[u'%s::Do nothing' % where]['runs'], 3)
+    finally:
+        os.remove(history_file)
+
+
+@with_setup(prepare_stdout)
+def test_run_with_history_records_undefined_steps_as_failures():
+    "Runner records the scenarios with undefined steps as failed in the history"
+    import json
+    import tempfile
+
+    filename = feature_name('undefined_steps')
+    history_file = tempfile.mktemp()
+
+    try:
+        Runner(filename, verbosity=0, history_file=history_file).run()
+
+        history = json.load(open(history_file))['scenarios']
+        assert_equals(len(history), 2)
+        for entry in history.values():
+            assert entry['failed_at'] is not None
+    finally:
+        os.remove(history_file)
+
+
+@with_setup(prepare_stdout)
+def test_output_with_sampled_outline_colorless():
+    "Sampled outlines print only the examples ran and count the skipped ones"
+
+    runner = Runner(feature_name('success_outline'), verbosity=3,
+                    outline_sample=1, outline_seed=1)
+    runner.run()
+
+    assert_stdout_lines(
+        '\n'
+        'Feature: Successful Scenario Outline                          # tests/functional/output_features/success_outline/success_outline.feature:1\n'
+        '  As lettuce author                                           # tests/functional/output_features/success_outline/success_outline.feature:2\n'
+        '  In order to finish the first release                        # tests/functional/output_features/success_outline/success_outline.feature:3\n'
+        u'  I want to make scenario outlines work ♥                     # tests/functional/output_features/success_outline/success_outline.feature:4\n'
+        '\n'
+        '  Scenario Outline: fill a web form                           # tests/functional/output_features/success_outline/success_outline.feature:6\n'
+        '    Given I open browser at "http://www.my-website.com/"      # tests/functional/output_features/success_outline/success_outline_steps.py:21\n'
+        '    And click on "sign-up"                                    # tests/functional/output_features/success_outline/success_outline_steps.py:25\n'
+        '    When I fill the field "username" with "<username>"        # tests/functional/output_features/success_outline/success_outline_steps.py:29\n'
+        '    And I fill the field "password" with "<password>"         # tests/functional/output_features/success_outline/success_outline_steps.py:29\n'
+        '    And I fill the field "password-confirm" with "<password>" # tests/functional/output_features/success_outline/success_outline_steps.py:29\n'
+        '    And I fill the field "email" with "<email>"               # tests/functional/output_features/success_outline/success_outline_steps.py:29\n'
+        '    And I click "done"                                        # tests/functional/output_features/success_outline/success_outline_steps.py:33\n'
+        '    Then I see the title of the page is "<title>"             # tests/functional/output_features/success_outline/success_outline_steps.py:37\n'
+        '\n'
+        '  Examples:\n'
+        '    | username | password | email          | title             |\n'
+        '    | foo      | foo-bar  | foo@bar.com    | Foo \| My Website  |\n'
+        '\n'
+        '1 feature (1 passed)\n'
+        '1 scenario (1 passed)\n'
+        '8 steps (8 passed)\n'
+        '2 outline rows skipped by sampling\n'
+    )
+
+
+@with_setup(prepare_stderr)
+def test_negative_outline_sample_is_refused():
+    "A negative --outline-sample is refused before running anything"
+    import sys
+    from lettuce.bin import main
+
+    assert_raises(SystemExit, main,
+                  ['--outline-sample=-1', feature_name('success_outline')])
+    assert '--outline-sample must not be negative' in sys.stderr.getvalue()
+
+
+def test_output_with_success_colorful_to_a_file():
+    "Colored output written to a file does not rewrite lines"
+    import sys
+    import tempfile
+    from lettuce import registry
+    registry.clear()
+    output = tempfile.TemporaryFile()
+    old_stdout, sys.stdout = sys.stdout, output
+
+    try:
+        runner = Runner(join(abspath(dirname(__file__)), 'output_features', 'runner_features'), verbosity=4)
+        runner.run()
+    finally:
+        sys.stdout = old_stdout
+
+    output.seek(0)
+    lines = output.read().splitlines()
+    assert_equals(lines[6:8], [
+        "\033[1;37m  Scenario: Do nothing                   \033[1;30m# tests/functional/output_features/runner_features/first.feature:6\033[0m",
+        "\033[1;32m    Given I do nothing                   \033[1;30m# tests/functional/output_features/runner_features/dumb_steps.py:6\033[0m",
+    ])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import signal
+from mock import patch
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from lettuce.core import Step, StepDefinition
+from lettuce.plugins.sampler import Sampler, frame_name
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+def test_frame_name_fits_collapsed_stacks():
+    "The frames of collapsed stacks have no semicolons or line breaks"
+    assert_equals(frame_name(u'step: a;b\n  c'), u'step: a,b c')
+    assert_equals(frame_name('caf\xc3\xa9'), u'caf\xe9')
+
+
+def test_sampler_tags_stacks_with_the_step_ran():
+    "Each sampled stack starts with the feature, scenario and step ran"
+    sampler = Sampler()
+    sampler.context = [u'feature: Sampling', u'scenario: Once']
+
+    def sampled_step(step):
+        sampler.sample(None, sys._getframe())
+
+    step = Step.from_string(u'Given a step being sampled')
+    StepDefinition(step, sampled_step)()
+
+    assert_equals(sampler.samples, 1)
+    (stack, count), = sampler.stacks.items()
+    assert_equals(count, 1)
+    frames = stack.split(u';')
+    assert_equals(frames[:3], [u'feature: Sampling', u'scenario: Once',
+                               u'step: Given a step being sampled'])
+    assert frames[-1].startswith(u'sampled_step ('), frames[-1]
+    assert frames[-2].startswith(u'__call__ ('), frames[-2]
+
+
+def test_sampler_stops_when_the_previous_handler_is_unknown():
+    "The timer is disarmed even if the previous handler was not python's"
+    sampler = Sampler(interval=60)
+    previous = signal.getsignal(signal.SIGPROF)
+    try:
+        # what signal.signal gives for handlers installed from C
+        with patch('signal.signal', return_value=None):
+            sampler.start()
+            sampler.stop()
+
+        assert_equals(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+        assert not sampler.running
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_sampling_profile_writes_collapsed_stacks():
+    "--sampling-profile writes the stacks sampled during the run"
+    filename = os.path.join(mkdtemp(), 'run.folded')
+    Runner(ojoin('many_successful_scenarios'), verbosity=0,
+           sampling_profile=filename, sampling_interval=0.001).run()
+
+    assert os.path.exists(filename)
+    assert_equals(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+    for line in open(filename):
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert stack.startswith('feature: ') or ';' in stack, stack
+
+    assert 'stacks sampled every 1ms' in sys.stdout.getvalue()
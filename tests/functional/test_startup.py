@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import subprocess
+from os.path import dirname, abspath, join
+from nose.tools import assert_equals
+
+project_root = abspath(join(dirname(__file__), '..', '..'))
+
+LAZY_MODULES = (
+    'lettuce.core',
+    'lettuce.plugins.xunit_output',
+    'lettuce.plugins.autopdb',
+    'fuzzywuzzy',
+    'xml.dom.minidom',
+    'colorama',
+    'sqlite3',
+    'lettuce.history',
+)
+
+# generous enough for slow machines, yet far below what importing the
+# optional dependencies eagerly used to cost
+MAX_IMPORT_SECONDS = 0.5
+
+PROBE = '''
+import sys, time
+started = time.time()
+import %s
+print time.time() - started
+print ",".join(sorted(m for m in %r if sys.modules.get(m)))
+'''
+
+
+def import_in_subprocess(module):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [project_root, env.get('PYTHONPATH')]))
+    process = subprocess.Popen(
+        [sys.executable, '-c', PROBE % (module, LAZY_MODULES)],
+        cwd=project_root, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    assert_equals(process.returncode, 0, err)
+    elapsed, loaded = out.splitlines()
+    return float(elapsed), filter(None, loaded.split(','))
+
+
+def test_importing_lettuce_is_lean():
+    "import lettuce leaves optional dependencies and core unloaded"
+    elapsed, loaded = import_in_subprocess('lettuce')
+    assert_equals(loaded, [])
+    assert elapsed < MAX_IMPORT_SECONDS, \
+        'importing lettuce took %.3fs' % elapsed
+
+
+def test_importing_lettuce_bin_is_lean():
+    "import lettuce.bin leaves optional dependencies and core unloaded"
+    elapsed, loaded = import_in_subprocess('lettuce.bin')
+    assert_equals(loaded, [])
+    assert elapsed < MAX_IMPORT_SECONDS, \
+        'importing lettuce.bin took %.3fs' % elapsed
+
+
+def test_importing_lettuce_does_not_load_terrain():
+    "terrain is only loaded by the runner, not when importing lettuce"
+    feature_dir = join(dirname(__file__), 'simple_features', '1st_feature_dir')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = project_root
+    process = subprocess.Popen(
+        [sys.executable, '-c',
+         'from lettuce import world, Runner\n'
+         'assert not hasattr(world, "works_fine")\n'
+         'Runner(".")\n'
+         'assert hasattr(world, "works_fine")\n'],
+        cwd=feature_dir, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    assert_equals(process.returncode, 0, err)
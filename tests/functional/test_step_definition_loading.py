@@ -14,10 +14,15 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import shutil
+from mock import patch
 from os.path import dirname, abspath, join
 from nose.tools import assert_equals
 
 from lettuce import Runner
+from lettuce.fs import FeatureLoader, FileSystem
 from lettuce.terrain import before, world, after
 
 def test_loads_sum_steps():
@@ -60,3 +65,143 @@ def test_discard_invalid_filenames():
 
     runner = Runner(join(abspath(dirname(__file__)), 'invalid_module_name'), verbosity=0)
     runner.run()
+
+
+def _make_project(**files):
+    import tempfile
+    base = tempfile.mkdtemp()
+    for name, content in files.items():
+        path = join(base, *name.split('/'))
+        if not os.path.isdir(dirname(path)):
+            os.makedirs(dirname(path))
+        open(path, 'w').write(content)
+
+    return base
+
+COUNTING_STEPS = '''
+from lettuce import world
+world.step_module_loads = getattr(world, 'step_module_loads', 0) + 1
+'''
+
+
+def test_step_definitions_are_executed_once_per_run():
+    "Each step definitions module gets executed once per run"
+    base = _make_project(**{'once_per_run_steps.py': COUNTING_STEPS})
+    world.step_module_loads = 0
+
+    try:
+        FeatureLoader(base).find_and_load_step_definitions()
+        assert_equals(world.step_module_loads, 1)
+
+        FeatureLoader(base).find_and_load_step_definitions()
+        assert_equals(world.step_module_loads, 2)
+    finally:
+        shutil.rmtree(base)
+        sys.modules.pop('once_per_run_steps', None)
+
+
+def test_step_definitions_imported_by_each_other_are_executed_once():
+    "Step modules imported by another step module are not reloaded"
+    base = _make_project(**{
+        'a_importing_steps.py': 'import b_imported_steps\n',
+        'b_imported_steps.py': COUNTING_STEPS,
+    })
+    files = [join(base, 'a_importing_steps.py'),
+             join(base, 'b_imported_steps.py')]
+    world.step_module_loads = 0
+
+    try:
+        with patch.object(FeatureLoader, 'find_step_definitions',
+                          return_value=files):
+            FeatureLoader(base).find_and_load_step_definitions()
+            assert_equals(world.step_module_loads, 1)
+
+            FeatureLoader(base).find_and_load_step_definitions()
+            assert_equals(world.step_module_loads, 2)
+    finally:
+        shutil.rmtree(base)
+        sys.modules.pop('a_importing_steps', None)
+        sys.modules.pop('b_imported_steps', None)
+
+
+def test_step_definitions_of_the_same_name_are_all_loaded():
+    "Step files of the same name in different directories are all loaded"
+    base = _make_project(**{
+        'a/same_name_steps.py': 'from lettuce import world\n'
+                                'world.loaded_from.append("a")\n',
+        'b/same_name_steps.py': 'from lettuce import world\n'
+                                'world.loaded_from.append("b")\n',
+    })
+    world.loaded_from = []
+
+    try:
+        FeatureLoader(base).find_and_load_step_definitions()
+        assert_equals(sorted(world.loaded_from), ['a', 'b'])
+    finally:
+        shutil.rmtree(base)
+        for name, module in sys.modules.items():
+            if getattr(module, '__file__', '').startswith(base):
+                del sys.modules[name]
+
+
+def test_step_definitions_imported_beforehand_are_not_executed_again():
+    "Step modules already imported, say by terrain, are not run twice"
+    base = _make_project(**{'imported_by_terrain_steps.py': COUNTING_STEPS})
+    world.step_module_loads = 0
+    sys.path.insert(0, base)
+
+    try:
+        __import__('imported_by_terrain_steps')
+        FeatureLoader(base).find_and_load_step_definitions()
+        assert_equals(world.step_module_loads, 1)
+
+        FeatureLoader(base).find_and_load_step_definitions()
+        assert_equals(world.step_module_loads, 2)
+    finally:
+        sys.path.remove(base)
+        shutil.rmtree(base)
+        sys.modules.pop('imported_by_terrain_steps', None)
+
+
+def test_ignored_dirs_are_not_walked():
+    "Version control, virtualenvs and --ignore-dir patterns are skipped"
+    base = _make_project(**{
+        'steps.py': '',
+        '.git/hooks/hook.py': 'raise SystemExit("walked .git")',
+        'venv/lib/site.py': 'raise SystemExit("walked venv")',
+        'scripts/deploy.py': 'raise SystemExit("walked scripts")',
+        'nested/more_steps.py': '',
+    })
+
+    try:
+        files = FeatureLoader(base, ignored_dirs=['scr*']).find_step_definitions()
+        assert_equals(sorted(files), [
+            join(base, 'nested', 'more_steps.py'),
+            join(base, 'steps.py'),
+        ])
+    finally:
+        shutil.rmtree(base)
+
+
+def test_discovery_manifest_skips_walking_unchanged_trees():
+    "The discovery manifest is reused until a directory changes"
+    base = _make_project(**{'a/steps.py': ''})
+    manifest = join(base, 'manifest.json')
+
+    try:
+        expected = [join(base, 'a', 'steps.py')]
+        assert_equals(FeatureLoader(base, manifest_file=manifest).find_step_definitions(), expected)
+
+        with patch.object(FileSystem, 'walk') as walk:
+            assert_equals(FeatureLoader(base, manifest_file=manifest).find_step_definitions(), expected)
+            assert_equals(walk.call_count, 0)
+
+        os.mkdir(join(base, 'a', 'b'))
+        open(join(base, 'a', 'b', 'new_steps.py'), 'w').close()
+        os.utime(join(base, 'a'), (0, 0))
+
+        assert_equals(
+            sorted(FeatureLoader(base, manifest_file=manifest).find_step_definitions()),
+            sorted(expected + [join(base, 'a', 'b', 'new_steps.py')]))
+    finally:
+        shutil.rmtree(base)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+from os.path import join
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import ojoin
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_profile_steps_times_definitions_and_hooks():
+    "--profile-steps times each step definition and hook of the project"
+    from lettuce import after
+
+    @after.each_step
+    def a_project_hook(step):
+        pass
+
+    filename = join(mkdtemp(), 'profile.json')
+    Runner(ojoin('many_successful_scenarios'), verbosity=0,
+           profile_steps=True, profile_file=filename).run()
+
+    data = json.load(open(filename))
+    assert data['runtime'] > 0
+    by_kind = dict([(d['kind'], d) for d in data['definitions']])
+    assert_equals(by_kind['step']['name'], 'do_nothing')
+    assert_equals(by_kind['step']['calls'], 2)
+    assert by_kind['step']['location'].endswith('dumb_steps.py:6')
+    assert_equals(len(by_kind['step']['cpu_times']), 2)
+    assert_equals(by_kind['hook']['name'], 'a_project_hook')
+    assert_equals(by_kind['hook']['calls'], 2)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_step_definition_times_the_step():
+    "Running a step leaves on it the wall and CPU time it took"
+    from lettuce import step
+    from lettuce.core import Step
+
+    @step(u'a step that takes its time')
+    def takes_its_time(step):
+        pass
+
+    a_step = Step.from_string(u'Given a step that takes its time')
+    assert_equals(a_step.wall_time, None)
+    a_step.run(True)
+    assert a_step.wall_time >= 0
+    assert a_step.cpu_time >= 0
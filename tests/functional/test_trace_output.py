@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import json
+import shutil
+from os.path import join
+from tempfile import mkdtemp
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import registry
+from tests.asserts import prepare_stdout
+from tests.functional.test_runner import feature_name, bg_feature_name
+
+
+def run_with_trace(path):
+    directory = mkdtemp()
+    filename = join(directory, 'trace.json')
+    try:
+        Runner(path, trace_file=filename).run()
+        with open(filename) as stream:
+            return json.load(stream)
+    finally:
+        shutil.rmtree(directory)
+
+
+def assert_spans_nest(events):
+    opened = []
+    for event in events:
+        if event['ph'] == 'B':
+            opened.append(event)
+        elif event['ph'] == 'E':
+            began = opened.pop()
+            assert_equals(began['name'], event['name'])
+            assert began['ts'] <= event['ts']
+
+    assert_equals(opened, [])
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_trace_file_outlines():
+    "The trace has spans for features and scenarios, and outline examples"
+    events = run_with_trace(feature_name('success_outline'))
+
+    assert_spans_nest(events)
+    assert_equals(events[0]['ph'], 'M')
+    assert all([e['pid'] == os.getpid() for e in events])
+
+    spans = [(e['ph'], e['cat']) for e in events if e['ph'] in 'BE']
+    assert_equals(spans, [('B', 'feature'), ('B', 'scenario'),
+                          ('E', 'scenario'), ('E', 'feature')])
+
+    rows = [e for e in events if e['cat'] == 'outline']
+    assert_equals(len(rows), 3)
+    assert all([row['dur'] >= 0 for row in rows])
+
+    steps = [e for e in events if e['cat'] == 'step']
+    assert steps, 'no step traced'
+    assert all([e['ph'] == 'X' and 'definition' in e['args']
+                for e in steps])
+
+    hooks = [e['name'] for e in events if e['cat'] == 'hook']
+    assert 'start_trace' in hooks, hooks
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_trace_file_backgrounds():
+    "The trace has a span for each background ran"
+    from lettuce import step
+
+    @step(ur'the variable "(\w+)" holds (\d+)')
+    @step(ur'the variable "(\w+)" is equal to (\d+)')
+    def just_pass(step, *args):
+        pass
+
+    events = run_with_trace(bg_feature_name('simple'))
+
+    assert_spans_nest(events)
+    backgrounds = [e['ph'] for e in events if e['cat'] == 'background']
+    assert_equals(backgrounds, ['B', 'E'])
+    steps = [e['name'] for e in events if e['cat'] == 'step']
+    assert_equals(len(steps), 2)
@@ -20,12 +20,14 @@ import sys
 import os
 import lettuce
 from StringIO import StringIO
+from os.path import join
+from tempfile import mkdtemp
 
 from nose.tools import assert_equals, assert_true, with_setup
 from sure import expect
 from lettuce import registry
 from lettuce import Runner
-from lettuce import xunit_output
+from lettuce.plugins import xunit_output
 from lxml import etree
 from tests.functional.test_runner import feature_name, bg_feature_name
 from tests.asserts import prepare_stdout
@@ -38,6 +40,16 @@ def assert_xsd_valid(filename, content):
     xmlschema.assertValid(etree.parse(StringIO(content)))
 
 
+def run_with_xunit(check, *args, **kw):
+    filename = kw.setdefault('xunit_filename', join(mkdtemp(), 'lettucetests.xml'))
+    Runner(*args, **kw).run()
+
+    try:
+        check(filename, open(filename).read())
+    finally:
+        os.remove(filename)
+
+
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_output_with_no_errors():
     'Test xunit output with no errors'
@@ -51,13 +63,9 @@ def test_xunit_output_with_no_errors():
         assert_equals(root.find("testcase").get("name"), "Given I do nothing")
         assert_true(float(root.find("testcase").get("time")) > 0)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('commented_feature'), enable_xunit=True)
-    runner.run()
+    run_with_xunit(assert_correct_xml, feature_name('commented_feature'), enable_xunit=True)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -79,13 +87,9 @@ def test_xunit_output_with_one_error():
         assert_true(float(failed.get("time")) > 0)
         assert_true(failed.find("failure") is not None)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('error_traceback'), enable_xunit=True)
-    runner.run()
+    run_with_xunit(assert_correct_xml, feature_name('error_traceback'), enable_xunit=True)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -97,14 +101,10 @@ def test_xunit_output_with_different_filename():
         assert_xsd_valid(filename, content)
         assert_equals(filename, "custom_filename.xml")
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('error_traceback'), enable_xunit=True,
+    run_with_xunit(assert_correct_xml, feature_name('error_traceback'), enable_xunit=True,
                     xunit_filename="custom_filename.xml")
-    runner.run()
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_output_with_unicode_characters_in_error_messages():
@@ -113,27 +113,19 @@ def test_xunit_output_with_unicode_characters_in_error_messages():
         called.append(True)
         assert_xsd_valid(filename, content)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('unicode_traceback'), enable_xunit=True,
+    run_with_xunit(assert_correct_xml, feature_name('unicode_traceback'), enable_xunit=True,
                     xunit_filename="custom_filename.xml")
-    runner.run()
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_does_not_throw_exception_when_missing_step_definition():
     def dummy_write(filename, content):
         pass
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = dummy_write
-    runner = Runner(feature_name('missing_steps'), enable_xunit=True,
+    run_with_xunit(dummy_write, feature_name('missing_steps'), enable_xunit=True,
                     xunit_filename="mising_steps.xml")
-    runner.run()
 
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -152,13 +144,9 @@ def test_xunit_output_with_no_steps():
         assert_equals(root.find("testcase/error").get("type"), "UndefinedStep(Given I do nothing)")
         assert_equals(float(root.find("testcase").get("time")), 0)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('no_steps_defined'), enable_xunit=True)
-    runner.run()
+    run_with_xunit(assert_correct_xml, feature_name('no_steps_defined'), enable_xunit=True)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -188,13 +176,9 @@ def test_xunit_output_with_background_section():
         pass
     
     filename = bg_feature_name('simple')
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(filename, enable_xunit=True)
-    runner.run()
+    run_with_xunit(assert_correct_xml, filename, enable_xunit=True)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -203,17 +187,13 @@ def test_xunit_xml_output_with_no_errors():
 
     called = []
 
-    def assert_correct_xml_output(filename, doc):
+    def assert_correct_xml_output(filename, content):
         called.append(True)
-        expect(doc.toxml).when.called.doesnt.throw(UnicodeDecodeError)
+        expect(content.decode).when.called_with('utf-8').doesnt.throw(UnicodeDecodeError)
+        etree.fromstring(content)
 
-    old = xunit_output.write_xml_doc
-    xunit_output.write_xml_doc = assert_correct_xml_output
-    runner = Runner(feature_name('xunit_unicode_and_bytestring_mixing'), enable_xunit=True)
-    try:
-        runner.run()
-    finally:
-        xunit_output.write_xml_doc = old
+    run_with_xunit(assert_correct_xml_output, feature_name('xunit_unicode_and_bytestring_mixing'), enable_xunit=True)
+    assert_equals(1, len(called), "Function not called")
 
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_output_with_outlines():
@@ -235,10 +215,67 @@ def test_xunit_output_with_outlines():
         assert_equals(root.find("testcase/error").get("type"), "UndefinedStep(When this test step is undefined)")
         assert_equals(root.find("testcase/skipped").get("type"), "SkippedStep(When the input is set to 1)")
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('xunit_outlines'), enable_xunit=True)
-    runner.run()
+    run_with_xunit(assert_correct_xml, feature_name('xunit_outlines'), enable_xunit=True)
+
+    assert_equals(1, len(called), "Function not called")
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_output_per_scenario():
+    'Test xunit output with a test case per scenario'
+    called = []
+    def assert_correct_xml(filename, content):
+        called.append(True)
+        assert_xsd_valid(filename, content)
+        root = etree.fromstring(content)
+        assert_equals(root.get("tests"), "2")
+        assert_equals(root.get("failures"), "1")
+        assert_true(float(root.get("time")) > 0)
+
+        passed, failed = root.findall("testcase")
+        assert_equals(passed.get("classname"), "Error traceback for output testing")
+        assert_equals(passed.get("name"), "It should pass")
+        assert_true(passed.find("failure") is None)
+        assert_equals(failed.get("name"), "It should raise an exception different of AssertionError")
+        assert_true(failed.find("failure") is not None)
 
+    run_with_xunit(assert_correct_xml, feature_name('error_traceback'),
+                   enable_xunit=True, xunit_per_scenario=True)
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_output_per_scenario_with_outlines():
+    'Test xunit output with a test case per outline example'
+    called = []
+    def assert_correct_xml(filename, content):
+        called.append(True)
+        assert_xsd_valid(filename, content)
+        root = etree.fromstring(content)
+        names = [tc.get("name") for tc in root.findall("testcase")]
+        assert_equals(len(names), int(root.get("tests")))
+        assert_true(any([" | " in name for name in names]))
+
+    run_with_xunit(assert_correct_xml, feature_name('xunit_outlines'),
+                   enable_xunit=True, xunit_per_scenario=True)
+    assert_equals(1, len(called), "Function not called")
+
+
+def test_xunit_report_is_written_as_test_cases_finish():
+    'Test xunit writes each test case as soon as it finishes'
+    filename = join(mkdtemp(), 'lettucetests.xml')
+    report = xunit_output.XUnitReport(filename)
+    report.start()
+
+    class Step(object):
+        failed = False
+        ran = True
+        defined_at = True
+
+    report.add(u'Feature : Scenario', u'Given a step', 0.5, [Step()])
+    assert '<testcase classname="Feature : Scenario" name="Given a step" time="0.500000"/>' in open(filename).read()
+
+    report.finish()
+    root = etree.parse(filename).getroot()
+    assert_equals(root.get("tests"), "1")
+    os.remove(filename)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import math
+from nose.tools import assert_equals
+
+from lettuce.baseline import Baseline, lanczos_lgamma, welch
+
+
+def baseline_with(**samples):
+    "A baseline of step definitions and their durations"
+    baseline = Baseline()
+    for key, durations in samples.items():
+        for seconds in durations:
+            baseline.add('step', key, key, seconds)
+
+    return baseline
+
+
+def test_lanczos_lgamma():
+    "The lgamma used without math.lgamma, on python 2.6, is as precise"
+    for x in (0.1, 0.5, 1, 2.5, 4, 30.5, 150):
+        assert_equals(round(lanczos_lgamma(x) - math.lgamma(x), 9), 0)
+
+
+def test_welch():
+    "welch tells the probability of a slowdown being noise"
+    before = [1.0, 1.1, 0.9, 1.05, 0.95]
+    slower = [1.3, 1.2, 1.4, 1.25, 1.35]
+    assert_equals(round(welch(before, slower), 6), 0.000162)
+    assert_equals(round(welch(slower, before), 6), 0.999838)
+    assert_equals(welch(before, [1.0]), 0.5)
+    assert_equals(welch([1.0], [2.0]), None)
+    assert_equals(welch([1.0, 1.0], [2.0]), 0.0)
+
+
+def test_extend_keeps_the_latest_samples():
+    "Adding to a baseline keeps the latest durations of each timing"
+    baseline = baseline_with(a=[1.0])
+    baseline.extend(baseline_with(a=[2.0] * 300, b=[3.0]))
+    assert_equals(len(baseline.timings['step']['a']['samples']), 200)
+    assert_equals(set(baseline.timings['step']['a']['samples']), set([2.0]))
+    assert_equals(baseline.timings['step']['b']['samples'], [3.0])
+
+
+def test_compare_ranks_the_changes():
+    "Only significant slowdowns beyond the allowed ones are regressions"
+    reference = baseline_with(
+        steady=[0.10, 0.11, 0.09, 0.10],
+        slower=[0.10, 0.11, 0.09, 0.10],
+        noisy=[0.01, 0.30, 0.02, 0.25],
+        gone=[0.10, 0.10])
+    current = baseline_with(
+        steady=[0.105, 0.10, 0.11, 0.10],
+        slower=[0.20, 0.21, 0.19, 0.20],
+        noisy=[0.30, 0.02, 0.28, 0.03],
+        new=[0.10, 0.10])
+
+    changes = current.compare(reference, 0.2)
+    assert_equals([change.key for change in changes],
+                  ['slower', 'noisy', 'steady'])
+    assert_equals([change.regression for change in changes],
+                  [True, False, False])
+    assert_equals(changes[0].samples, (4, 4))
+    assert u"REGRESSED" in unicode(changes[0])
+    assert_equals(current.compare(reference, 1.5)[0].regression, False)
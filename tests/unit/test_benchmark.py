@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_raises
+
+from lettuce import registry
+from lettuce.benchmark import Benchmark, Statistics
+from lettuce.benchmark import load_steps, statistic_should_be_under
+from lettuce.exceptions import LettuceSyntaxError
+
+
+class FakeStep(object):
+    def __init__(self, sentence, wall_time):
+        self.sentence = sentence
+        self.wall_time = wall_time
+
+
+def test_benchmark_from_tags():
+    "The @benchmark tag tells how many times to run a scenario"
+    assert_equals(Benchmark.from_tags(['slow']), None)
+    assert_equals(Benchmark.from_tags(None), None)
+
+    default = Benchmark.from_tags(['benchmark'])
+    assert_equals((default.runs, default.warmup), (10, 1))
+
+    benchmark = Benchmark.from_tags(['slow', 'benchmark'],
+                                    {'benchmark': 'runs=50,warmup=5'})
+    assert_equals((benchmark.runs, benchmark.warmup), (50, 5))
+
+    spaced = Benchmark.from_tags(['benchmark'],
+                                 {'benchmark': 'runs=50, warmup=5'})
+    assert_equals((spaced.runs, spaced.warmup), (50, 5))
+
+    assert_equals(Benchmark.from_tags(['slow'], {'slow': 'runs=50'}), None)
+    assert_raises(LettuceSyntaxError, Benchmark.from_tags,
+                  ['benchmark'], {'benchmark': 'runs=many'})
+
+
+def test_statistics():
+    "The statistics of a benchmark are taken from the durations sampled"
+    statistics = Statistics(4, 0)
+    for duration in (0.4, 0.1, 0.3, 0.2):
+        statistics.add([FakeStep(u'Given one', duration),
+                        FakeStep(u'Given two', duration / 2)])
+
+    assert_equals(statistics.statistic('min'), 0.15000000000000002)
+    assert_equals(statistics.statistic('max'), 0.6000000000000001)
+    assert_equals(statistics.statistic('p50'), 0.30000000000000004)
+    assert_equals(round(statistics.statistic('mean'), 6), 0.375)
+    assert_equals(statistics.statistic('median'),
+                  statistics.statistic('p50'))
+
+    data = statistics.to_dict()
+    assert_equals(data['runs'], 4)
+    assert_equals([s['step'] for s in data['steps']],
+                  [u'Given one', u'Given two'])
+    assert_equals(data['steps'][0]['samples'], [0.4, 0.1, 0.3, 0.2])
+    assert statistics.summary().startswith(u'4 runs after 0 warm-up: ')
+    assert_equals(Statistics(1, 0).statistic('p95'), None)
+
+
+def test_load_steps_registers_the_statistic_steps_once():
+    "load_steps leaves the step registry alone once the statistic steps are in"
+    registry.clear()
+    try:
+        load_steps()
+        version = registry.STEP_REGISTRY.version
+        load_steps()
+        assert_equals(registry.STEP_REGISTRY.version, version)
+        assert_equals(registry.STEP_REGISTRY.match(
+            u'Then p95 latency should be under 200ms')[1],
+            statistic_should_be_under)
+    finally:
+        registry.clear()
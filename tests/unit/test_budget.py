@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import time
+
+from nose.tools import assert_equals, assert_raises
+from lettuce.core import Feature
+from lettuce.budget import parse_duration, parse_percentage, History, TimeBudget
+
+FEATURE = """
+Feature: Budgeted
+  Scenario: Cheap and stable
+    Given I do nothing
+
+  Scenario: Slow and stable
+    Given I do nothing
+
+  Scenario: Recently broken
+    Given I do nothing
+
+  Scenario: Never ran
+    Given I do nothing
+"""
+
+
+def test_parse_duration():
+    "budget.parse_duration understands seconds, minutes and hours"
+    assert_equals(parse_duration('90'), 90)
+    assert_equals(parse_duration('90s'), 90)
+    assert_equals(parse_duration('5m'), 300)
+    assert_equals(parse_duration('1m30s'), 90)
+    assert_equals(parse_duration('1h'), 3600)
+    assert_equals(parse_duration('500ms'), 0.5)
+
+
+def test_parse_duration_rejects_garbage():
+    "budget.parse_duration raises ValueError for unknown units"
+    assert_raises(ValueError, parse_duration, '5 minutes')
+    assert_raises(ValueError, parse_duration, '')
+
+
+def test_parse_percentage():
+    "budget.parse_percentage takes the percentage with or without its sign"
+    assert_equals(parse_percentage('20%'), 0.2)
+    assert_equals(parse_percentage('5'), 0.05)
+    assert_raises(ValueError, parse_percentage, 'much')
+    assert_raises(ValueError, parse_percentage, '-5%')
+
+
+def test_history_keeps_a_moving_average_of_durations():
+    "History.record smoothes the recorded durations"
+    history = History('unused')
+    history.record('a', 10.0, failed=False)
+    assert_equals(history.duration_of('a'), 10.0)
+
+    history.record('a', 20.0, failed=True, when=42)
+    assert_equals(history.duration_of('a'), 13.0)
+    assert_equals(history.get('a')['runs'], 2)
+    assert_equals(history.get('a')['failed_at'], 42)
+    assert_equals(history.duration_of('b'), None)
+
+
+def test_budget_prefers_failures_and_unknowns_and_defers_the_rest():
+    "TimeBudget.plan picks the most valuable scenarios that fit"
+    feature = Feature.from_string(FEATURE)
+    cheap, slow, broken, never = [s.stable_id for s in feature.scenarios]
+
+    now = time.time()
+    history = History('unused')
+    for i in range(5):
+        history.record(cheap, 1.0, failed=False, when=now)
+        history.record(slow, 30.0, failed=False, when=now)
+
+    history.record(broken, 5.0, failed=True, when=now)
+
+    budget = TimeBudget(11, history)
+    plan = budget.plan([(feature, None)])
+
+    assert_equals(plan, [(feature, [1, 3, 4])])
+    assert_equals([c.scenario.name for c in budget.deferred],
+                  ['Slow and stable'])
+
+
+def test_budget_respects_scenario_and_tag_filters():
+    "TimeBudget.plan only considers scenarios selected by number"
+    feature = Feature.from_string(FEATURE)
+    budget = TimeBudget(60, History('unused'))
+
+    assert_equals(budget.plan([(feature, [2])]), [(feature, [2])])
+    assert_equals(budget.deferred, [])
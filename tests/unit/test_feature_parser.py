@@ -14,6 +14,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from mock import patch
 from sure import expect
 from sure.old import that
 from lettuce import step
@@ -794,3 +795,45 @@ def test_syntax_error_for_scenarios_with_no_name():
          'scenarios must have a name, make sure to declare '
          'a scenario like this: `Scenario: name of your scenario`')
     )
+
+def test_feature_max_length_is_measured_once():
+    "The max length of a feature is measured once, no matter how many " \
+    "steps get represented"
+
+    feature = Feature.from_string(FEATURE5)
+    expected = feature.max_length
+
+    with patch.object(Feature, '_measure_max_length') as measure:
+        for scenario in feature.scenarios:
+            scenario.represented()
+            for step in scenario.steps:
+                step.represent_string(step.sentence)
+
+        assert_equals(feature.max_length, expected)
+        assert_equals(measure.call_count, 0)
+
+
+def test_scenarios_of_the_same_name_have_distinct_stable_ids():
+    "Scenarios named after an earlier one get their position in the id"
+
+    feature = Feature.from_string(u'''
+Feature: Namesakes
+  Scenario: Do nothing
+    Given I do nothing
+
+  Scenario: Do something
+    Given I do something
+
+  Scenario: Do nothing
+    Given I do nothing again
+
+  Scenario: Do nothing
+    Given I do nothing once more
+''')
+
+    assert_equals([scenario.stable_id for scenario in feature.scenarios], [
+        u'Namesakes::Do nothing',
+        u'Namesakes::Do something',
+        u'Namesakes::Do nothing::2',
+        u'Namesakes::Do nothing::3',
+    ])
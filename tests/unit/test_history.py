@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals
+
+from lettuce.history import HistoryDatabase, slope
+
+
+def database_with(*runs):
+    """A database in memory holding `runs`, each a list of (scenario,
+    duration, passed) and (definition, duration) tuples"""
+    database = HistoryDatabase(':memory:')
+    for number, (scenarios, steps) in enumerate(runs):
+        database.save_run(1000.0 + number, 1.0, True, scenarios, [
+            (definition, u'Given something', duration, 'passed')
+            for definition, duration in steps])
+
+    return database
+
+
+def test_slope():
+    "slope fits a least squares line"
+    assert_equals(slope([(0, 1.0), (1, 3.0), (2, 5.0)]), 2.0)
+    assert_equals(slope([(1, 1.0), (1, 3.0)]), 0.0)
+
+
+def test_regressions():
+    "The scenarios much slower than usual on the last run have regressed"
+    steady = [(u'a::steady', 1.0, True), (u'a::slower', 1.0, True)]
+    database = database_with(
+        (steady, []), (steady, []), (steady, []),
+        ([(u'a::steady', 1.01, True), (u'a::slower', 2.0, True)], []))
+
+    regressed = database.regressions()
+    assert_equals([r.scenario for r in regressed], [u'a::slower'])
+    assert_equals(regressed[0].latest, 2.0)
+    assert_equals(regressed[0].runs, 3)
+
+
+def test_flaky_scenarios():
+    "The scenarios that keep going from passing to failing are flaky"
+    database = database_with(*[
+        ([(u'a::flaky', 1.0, passed), (u'a::broken', 1.0, number == 0)], [])
+        for number, passed in enumerate([True, False, True, False])])
+
+    flaky = database.flaky()
+    assert_equals([f.scenario for f in flaky], [u'a::flaky'])
+    assert_equals((flaky[0].flips, flaky[0].failures, flaky[0].runs),
+                  (3, 2, 4))
+
+
+def test_growing_definitions():
+    "The step definitions that get slower from run to run are found"
+    database = database_with(*[
+        ([], [(u'steps.py:1', 0.1 * number), (u'steps.py:9', 0.5)])
+        for number in range(4)])
+
+    growing = database.growing_definitions()
+    assert_equals([g.definition for g in growing], [u'steps.py:1'])
+    assert_equals(round(growing[0].per_run, 6), 0.1)
+
+
+def test_budget_history():
+    "The database gives the durations and failures --budget expects"
+    database = database_with(
+        ([(u'a::one', 1.0, False)], []),
+        ([(u'a::one', 3.0, True)], []))
+
+    history = database.budget_history()
+    assert_equals(history.duration_of(u'a::one'), 2.0)
+    assert_equals(history.get(u'a::one')['runs'], 2)
+    assert_equals(history.get(u'a::one')['failed_at'], 1000.0)
+    assert_equals(history.get(u'a::one')['ran_at'], 1001.0)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+from mock import Mock, patch
+from nose.tools import assert_equals
+
+from lettuce.plugins import non_verbose
+
+
+def with_root_level(level):
+    return patch.object(logging.getLogger(), 'level', level)
+
+
+def test_non_verbose_skips_representing_when_not_logging():
+    "non_verbose does not represent anything when INFO is not logged"
+    step = Mock()
+    step.subsequent_outline = False
+    scenario = Mock()
+
+    with with_root_level(logging.WARNING):
+        non_verbose.print_step_running(step)
+        non_verbose.print_step_ran(step)
+        non_verbose.print_scenario_running(scenario)
+
+    assert_equals(step.represent_string.call_count, 0)
+    assert_equals(scenario.represented.call_count, 0)
+
+
+def test_non_verbose_represents_when_logging():
+    "non_verbose represents steps when INFO gets logged"
+    step = Mock()
+    step.represent_string.return_value = u'    Given a step\n'
+
+    with with_root_level(logging.INFO):
+        with patch.object(logging, 'info') as info:
+            non_verbose.print_step_running(step)
+
+    info.assert_called_once_with(u'    Given a step\n')
@@ -32,3 +32,59 @@ def test_function_matches_compares_with_abs_path():
 
     assert _function_matches(fakecallback1, fakecallback2), \
         'the callbacks should have matched'
+
+
+def test_call_hook_tells_hook_listeners():
+    u"lettuce.registry.call_hook() should tell the hook listeners about each hook ran"
+    from lettuce import registry
+    from lettuce.terrain import before
+
+    heard = []
+    registry.clear()
+
+    @before.each_feature
+    def some_hook(feature):
+        pass
+
+    registry.HOOK_LISTENERS.append(
+        lambda kind, situation, callback, started, ended, cpu:
+        heard.append((kind, situation, callback, ended >= started,
+                      cpu >= 0)))
+
+    try:
+        registry.call_hook('before_each', 'feature', None)
+    finally:
+        registry.clear()
+
+    assert heard == [('feature', 'before_each', some_hook, True, True)], \
+        heard
+    assert registry.HOOK_LISTENERS == []
+
+
+def test_step_registry_caches_matches_until_it_changes():
+    u"lettuce.registry.STEP_REGISTRY looks each sentence up once per version"
+    from lettuce.registry import StepDict
+
+    def first(step):
+        pass
+
+    def second(step):
+        pass
+
+    steps = StepDict()
+    steps['I do (.*)'] = first
+    version = steps.version
+    pattern, function = steps.match(u'When I DO something')
+    assert function is first
+    assert pattern.search(u'When I DO something').group(1) == u'something'
+    assert steps.match(u'When I DO something') == (pattern, function)
+    assert steps.match(u'When I DO something', False) == (None, None)
+
+    del steps['I do (.*)']
+    assert steps.version > version
+    assert steps.match(u'When I DO something') == (None, None)
+
+    steps['I do something$'] = second
+    assert steps.match(u'When I DO something')[1] is second
+    steps.clear()
+    assert steps.match(u'When I DO something') == (None, None)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+from mock import patch
+from nose.tools import assert_equals, with_setup
+
+from lettuce import resources
+
+
+def stop_measuring():
+    resources.enable(False)
+
+
+def test_usage_difference():
+    "Subtracting usages gives amounts used, and levels with their growth"
+    earlier = resources.Usage(user_time=1.0, read_bytes=100, rss=1000,
+                              max_rss=2000)
+    later = resources.Usage(user_time=1.5, read_bytes=400, rss=3000,
+                            max_rss=2000)
+
+    used = later - earlier
+    assert_equals(used.user_time, 0.5)
+    assert_equals(used.read_bytes, 300)
+    assert_equals(used.rss, 3000)
+    assert_equals(used.rss_growth, 2000)
+    assert_equals(used.max_rss, 2000)
+    assert_equals(used.max_rss_growth, 0)
+    assert_equals(sorted(used.to_dict()), sorted(resources.FIELDS))
+
+
+@with_setup(teardown=stop_measuring)
+def test_snapshots_only_when_measuring():
+    "Snapshots are only taken once measuring is enabled"
+    resources.enable(False)
+    assert_equals(resources.snapshot(), None)
+    assert_equals(resources.since(None), None)
+
+    resources.enable()
+    earlier = resources.snapshot()
+    assert isinstance(earlier, resources.Usage)
+    assert earlier.rss > 0
+    used = resources.since(earlier)
+    assert used.user_time >= 0
+    assert_equals(used.max_rss, resources.Usage.now().max_rss)
+
+
+def test_importing_resources_does_not_need_os_uname():
+    "The unit of ru_maxrss is told from sys.platform, which Windows has"
+    with patch.object(os, 'uname', None):
+        reload(resources)
+
+    with patch.object(sys, 'platform', 'linux2'):
+        assert_equals(resources.rss_unit(), 1024)
+
+    with patch.object(sys, 'platform', 'darwin'):
+        assert_equals(resources.rss_unit(), 1)
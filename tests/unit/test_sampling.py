@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from itertools import combinations
+from nose.tools import assert_equals
+from lettuce import sampling
+
+
+def test_sample_is_seeded():
+    "sampling.sample picks the same rows for the same seed"
+    rows = range(100)
+    picked = sampling.sample(rows, 10, seed='some seed')
+
+    assert_equals(len(picked), 10)
+    assert_equals(picked, sorted(picked))
+    assert_equals(picked, sampling.sample(rows, 10, seed='some seed'))
+
+
+def test_sample_bigger_than_table_keeps_everything():
+    "sampling.sample returns every row when asked for more than there are"
+    assert_equals(sampling.sample(range(3), 5), [0, 1, 2])
+
+
+def test_pairwise_covers_every_pair_of_values():
+    "sampling.pairwise keeps every pair of column values covered"
+    keys = ['browser', 'os', 'locale']
+    outlines = []
+    for browser in ('firefox', 'chrome', 'safari'):
+        for os in ('linux', 'mac', 'windows'):
+            for locale in ('en', 'pt', 'ru'):
+                outlines.append(
+                    {'browser': browser, 'os': os, 'locale': locale})
+
+    indexes = sampling.pairwise(outlines, keys)
+    assert len(indexes) < len(outlines), \
+        'expected less than %d rows, got %d' % (len(outlines), len(indexes))
+
+    def pairs(rows):
+        found = set()
+        for row in rows:
+            for one, other in combinations(keys, 2):
+                found.add((one, row[one], other, row[other]))
+        return found
+
+    assert_equals(pairs([outlines[i] for i in indexes]), pairs(outlines))
+
+
+def test_pairwise_with_a_single_column_keeps_distinct_values():
+    "sampling.pairwise keeps one row per value of single column tables"
+    outlines = [{'n': '1'}, {'n': '2'}, {'n': '1'}, {'n': '3'}]
+    assert_equals(sampling.pairwise(outlines, ['n']), [0, 1, 3])
+
+
+def test_select_samples_after_pairwise_reduction():
+    "sampling.select applies the sample size on top of pairwise coverage"
+    outlines = [{'a': str(i), 'b': str(i)} for i in range(20)]
+    indexes = sampling.select(outlines, ['a', 'b'], size=5,
+                              use_pairwise=True, seed=1)
+    assert_equals(len(indexes), 5)
+    assert_equals(sampling.select(outlines, ['a', 'b']), range(20))
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from sure import expect
+from lettuce import strings
 from lettuce.core import Step
 from lettuce.core import Scenario
 from lettuce.core import Feature
@@ -481,6 +482,48 @@ def test_scenario_has_tags_singleline():
     ])
 
 
+def test_scenario_has_tags_with_spaced_arguments():
+    ("A scenario object should keep the arguments of a tag together, "
+     "spaces included")
+
+    scenario = Scenario.from_string(
+        SCENARIO1,
+        original_string=(
+            '@slow @benchmark(runs=50, warmup=5) @wip\n' + SCENARIO1.strip()))
+
+    expect(scenario.tags).to.equal([
+        'slow',
+        'benchmark',
+        'wip',
+    ])
+    expect(scenario.tag_arguments).to.equal({
+        'benchmark': 'runs=50, warmup=5',
+    })
+    assert scenario.matches_tags(['benchmark'])
+    assert not scenario.matches_tags(['-benchmark'])
+
+
+def test_feature_strips_spaced_tags_from_the_previous_scenario():
+    ("The tags of a scenario with spaced arguments are not taken as steps "
+     "of the scenario before it")
+
+    feature = Feature.from_string(u"""
+Feature: Spaced tags
+  Scenario: First
+    Given I do something
+
+  @benchmark(runs=50, warmup=5)
+  Scenario: Second
+    Given I do something else
+""")
+
+    first, second = feature.scenarios
+    assert_equals([step.sentence for step in first.steps],
+                  [u'Given I do something'])
+    assert_equals(second.tags, [u'benchmark'])
+    assert_equals(second.benchmark.runs, 50)
+
+
 def test_scenario_matches_tags():
     ("A scenario with tags should respond with True when "
      ".matches_tags() is called with a valid list of tags")
@@ -586,3 +629,14 @@ def test_scenario_with_hash_within_single_quotes():
 
     expect(step1.sentence).to.equal(u'Given I am logged in on twitter')
     expect(step2.sentence).to.equal(u"When I search for the hashtag '#hammer'")
+
+
+def test_scenario_represents_examples_row_by_row():
+    "Scenario.represent_example renders a row of the examples table"
+
+    scenario = Scenario.from_string(OUTLINED_SCENARIO)
+    lines = strings.dicts_to_string(scenario.outlines, scenario.keys).splitlines()
+
+    assert_equals(scenario.represent_examples_head(), lines[0])
+    for order in range(len(scenario.outlines)):
+        assert_equals(scenario.represent_example(order), lines[order + 1])
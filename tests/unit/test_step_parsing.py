@@ -291,3 +291,26 @@ def test_handy_function_for_table_members_fail_giving_assertionerror():
 
 
 
+
+def test_step_metadata_is_worked_out_when_asked_for():
+    "The table, location and proposed definition of a step are worked out on first use"
+
+    original = u"Feature: Lazy\n  Scenario: Lazy\n    %s\n" % I_HAVE_TASTY_BEVERAGES
+    step = Step.many_from_lines(I_HAVE_TASTY_BEVERAGES.splitlines(),
+                                'lazy.feature', original)[0]
+    for name in ('_hashes', '_proposal', '_described_at'):
+        assert name not in step.__dict__, name
+
+    assert_equals(step.keys, ('Name', 'Type', 'Price'))
+    assert_equals(len(step.hashes), 2)
+    assert step.hashes is step.hashes
+    assert_equals(step.described_at.file, 'lazy.feature')
+    assert_equals(step.described_at.line, 3)
+    assert_equals(step.proposed_method_name,
+                  'i_have_the_following_tasty_beverages_in_my_freezer(step)')
+    assert_equals(step.proposed_sentence,
+                  u'I have the following tasty beverages in my freezer:')
+
+    step.hashes = []
+    assert_equals(step.hashes, [])
+    assert_equals(step.keys, ('Name', 'Type', 'Price'))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals
+
+from lettuce.plugins.step_profile import StepProfile, percentile
+
+
+def test_percentile_is_nearest_rank():
+    "percentile picks the nearest ranked value"
+    values = range(1, 101)
+    assert_equals(percentile(values, 95), 95)
+    assert_equals(percentile(values, 50), 50)
+    assert_equals(percentile([3.0], 95), 3.0)
+    assert_equals(percentile([2, 1], 0), 1)
+
+
+def test_step_profile_orders_by_total_time():
+    "StepProfile ranks the definitions by the total time they took"
+    profile = StepProfile()
+    profile.add('step', 'steps.py:10', 'quick', 0.1, 0.1)
+    profile.add('step', 'steps.py:20', 'slow', 1.0, 0.5)
+    profile.add('step', 'steps.py:10', 'quick', 0.3, 0.1)
+    profile.add('hook', 'terrain.py:5', 'setup', 0.2, 0.0)
+
+    assert_equals([t.name for t in profile.slowest()],
+                  ['slow', 'quick', 'setup'])
+    assert_equals([t.name for t in profile.slowest(1)], ['slow'])
+
+    quick = profile.timings[('step', 'steps.py:10')]
+    assert_equals(quick.calls, 2)
+    assert_equals(round(quick.mean, 6), 0.2)
+    assert_equals(quick.p95, 0.3)
+
+
+def test_step_profile_report():
+    "StepProfile reports the share of the runtime of each definition"
+    profile = StepProfile()
+    profile.runtime = 4.0
+    profile.add('step', 'steps.py:20', 'slow', 1.0, 0.5)
+
+    report = profile.report(10)
+    assert 'out of 4.000s' in report, report
+    assert ' 25.0% ' in report, report
+    assert 'steps.py:20 (step slow)' in report, report
+    assert_equals(StepProfile().report(10), u"")
@@ -497,3 +497,30 @@ def test_invalid_regex_raise_an_error():
         def step_with_bad_regex(step):
             pass
     assert_raises(StepLoadingError, load_step)
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_behave_as_parses_each_string_once():
+    'Steps ran with behave_as are parsed once, and each call runs new copies of them'
+    ran = []
+
+    @step('I collect the table')
+    def collect_the_table(step):
+        ran.append(step)
+        step.hashes[0]['name'] = 'changed'
+
+    string = """When I collect the table
+        | name  |
+        | Gabe  |
+    """
+    runnable_step = Step.from_string('Given I have a defined step')
+    runnable_step.behave_as(string)
+    runnable_step.behave_as(string)
+
+    assert_equals(len(ran), 2)
+    assert ran[0] is not ran[1]
+    assert ran[1].ran
+    assert_equals(ran[1].hashes[0]['name'], 'changed')
+    parsed = Step.parsed_from(string)
+    assert_equals(parsed[0].hashes, [{'name': 'Gabe'}])
+    assert not parsed[0].ran
+    assert parsed[0].defined_at is None
@@ -143,6 +143,13 @@ def test_column_width_w_number_and_char():
         6
     )
     
+def test_column_width_ascii():
+    "strings.column_width of plain ascii text"
+    assert_equals(
+        strings.column_width("Given I have | 2 | cucumbers"),
+        28
+    )
+
 def test_rfill_simple():
     "strings.rfill simple case"
     assert_equals(
@@ -327,3 +334,26 @@ def test_parse_hashes_allow_empty():
 
     assert_equals(keys, got_keys)
     assert_equals(dicts, got_dicts)
+
+def test_column_sizes():
+    "strings.column_sizes measures every column of a table"
+
+    dicts = [
+        {'name': u'Gabriel | Falcão', 'age': 22},
+        {'name': 'Miguel'},
+    ]
+
+    assert_equals(
+        strings.column_sizes(dicts, ['name', 'age']),
+        {'name': 17, 'age': 4}
+    )
+
+def test_row_to_string():
+    "strings.row_to_string renders a single row of a table"
+
+    sizes = {'name': 17, 'age': 4}
+    assert_equals(
+        strings.row_to_string({'name': u'Gabriel | Falcão', 'age': 22},
+                              ['name', 'age'], sizes),
+        u"| Gabriel \\| Falcão | 22  |"
+    )
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_raises
+from lettuce import tags
+from lettuce.tags import TagExpression
+from lettuce.tags import tags_match
+
+
+def test_is_expression():
+    "tags.is_expression tells expressions apart from single tags"
+    assert tags.is_expression('@api and not @slow')
+    assert tags.is_expression('not slow')
+    assert tags.is_expression('(@a)')
+    assert not tags.is_expression('@api')
+    assert not tags.is_expression('-slow')
+    assert not tags.is_expression('~android')
+
+
+def test_expression_precedence():
+    "TagExpression binds \"not\" tighter than \"and\", and \"and\" than \"or\""
+    expression = TagExpression('@a or @b and not @c')
+
+    assert expression(['a', 'c'])
+    assert expression(['b'])
+    assert not expression(['b', 'c'])
+    assert not expression([])
+
+
+def test_expression_parenthesis():
+    "TagExpression respects parenthesis"
+    expression = TagExpression('(@a or @b) and not (@c or @d)')
+
+    assert expression(['a'])
+    assert expression(['b'])
+    assert not expression(['a', 'd'])
+    assert not expression(['c'])
+
+
+def test_expression_syntax_errors():
+    "TagExpression raises ValueError for malformed expressions"
+    assert_raises(ValueError, TagExpression, '@a and')
+    assert_raises(ValueError, TagExpression, '(@a or @b')
+    assert_raises(ValueError, TagExpression, '@a @b or')
+    assert_raises(ValueError, TagExpression, 'and @a')
+
+
+def test_parse_compiles_expressions_and_strips_single_tags():
+    "tags.parse compiles expressions and strips \"@\" from single tags"
+    parsed = tags.parse(['@api', 'wip', '@api and not @wip'])
+
+    assert_equals(parsed[:2], ['api', 'wip'])
+    assert isinstance(parsed[2], TagExpression)
+    assert_equals(tags.parse(None), None)
+
+
+def test_tags_match_combines_expressions_with_single_tags():
+    "tags_match requires every expression and the single tags to match"
+    expression = TagExpression('@api and not @slow')
+
+    assert tags_match(['api'], [expression])
+    assert not tags_match(['api', 'slow'], [expression])
+    assert tags_match(['api', 'smoke'], [expression, 'smoke'])
+    assert not tags_match(['api'], [expression, 'smoke'])
+
+
+def test_tags_with_arguments_are_single_tags():
+    "The arguments of a tag take no part in choosing what to run"
+    assert not tags.is_expression('@benchmark(runs=3, warmup=1)')
+    assert tags.is_expression('not(@a)')
+    assert_equals(tags.parse(['@benchmark(runs=3, warmup=1)']),
+                  ['benchmark'])
+    assert_equals(tags.parse(['-benchmark(runs=3)']), ['-benchmark'])
+
+    expression = tags.parse(['@benchmark(runs=3) and not @slow'])[0]
+    assert expression(['benchmark'])
+    assert not expression(['benchmark', 'slow'])
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+import tempfile
+from StringIO import StringIO
+from mock import patch
+from nose.tools import assert_equals
+
+from lettuce import terminal
+
+
+class FakeTTY(StringIO):
+    def isatty(self):
+        return True
+
+    def fileno(self):
+        return 1
+
+
+def with_stdout(stream):
+    return patch.object(sys, 'stdout', stream)
+
+
+def test_sink_buffers_until_flushed():
+    "OutputSink keeps what was written until it gets flushed"
+    stream = StringIO()
+    sink = terminal.OutputSink(interval=60)
+    with with_stdout(stream):
+        sink.write(u'Feature: ')
+        sink.write('buffering\n')
+        assert_equals(stream.getvalue(), '')
+
+        sink.flush()
+        assert_equals(stream.getvalue(), 'Feature: buffering\n')
+
+
+def test_sink_flushes_new_lines_on_terminals():
+    "OutputSink flushes each new line when stdout is a terminal"
+    stream = FakeTTY()
+    sink = terminal.OutputSink(interval=60)
+    with with_stdout(stream):
+        sink.write('Given ')
+        assert_equals(stream.getvalue(), '')
+        sink.write('a step\n')
+        assert_equals(stream.getvalue(), 'Given a step\n')
+        assert not sink.append_only
+
+
+def test_sink_flushes_old_buffers():
+    "OutputSink flushes once its buffer is older than the interval"
+    stream = StringIO()
+    sink = terminal.OutputSink(interval=0)
+    with with_stdout(stream):
+        sink.write('.')
+        assert_equals(stream.getvalue(), '.')
+
+
+def test_sink_follows_replaced_stdout():
+    "OutputSink flushes to the previous stdout when it gets replaced"
+    first, second = StringIO(), StringIO()
+    sink = terminal.OutputSink(interval=60)
+    with with_stdout(first):
+        sink.write('first')
+
+    with with_stdout(second):
+        sink.write('second')
+        sink.flush()
+
+    assert_equals(first.getvalue(), 'first')
+    assert_equals(second.getvalue(), 'second')
+
+
+def test_sink_is_append_only_on_files():
+    "OutputSink is append only when stdout is a file or a pipe"
+    sink = terminal.OutputSink()
+    with with_stdout(tempfile.TemporaryFile()):
+        sink.bind()
+        assert sink.append_only
+
+    with with_stdout(StringIO()):
+        sink.bind()
+        assert not sink.append_only
+
+
+def test_terminal_size_is_measured_once():
+    "terminal.get_size measures the terminal once until it gets resized"
+    with patch.object(terminal, '_size', None):
+        with patch.object(terminal, 'measure_size') as measure:
+            measure.return_value = (80, 25)
+            assert_equals(terminal.get_size(), (80, 25))
+            assert_equals(terminal.get_size(), (80, 25))
+            assert_equals(measure.call_count, 1)
@@ -141,6 +141,7 @@ def test_after_each_feature_is_executed_before_each_feature():
 def test_after_each_all_is_executed_before_each_all():
     "terrain.before.each_all and terrain.after.each_all decorators"
     import lettuce
+    import lettuce.core
     from lettuce.fs import FeatureLoader
     world.all_steps = []
 
@@ -150,16 +151,20 @@ def test_after_each_all_is_executed_before_each_all():
     mox.StubOutWithMock(lettuce.sys, 'path')
     mox.StubOutWithMock(lettuce, 'fs')
     mox.StubOutWithMock(lettuce.fs, 'FileSystem')
-    mox.StubOutWithMock(lettuce, 'Feature')
+    mox.StubOutWithMock(lettuce, 'load_terrain')
+    mox.StubOutWithMock(lettuce.core, 'Feature')
 
-    lettuce.fs.FeatureLoader('some_basepath').AndReturn(loader_mock)
+    lettuce.load_terrain()
+
+    lettuce.fs.FeatureLoader('some_basepath', ignored_dirs=None,
+                             manifest_file=None).AndReturn(loader_mock)
 
     lettuce.sys.path.insert(0, 'some_basepath')
     lettuce.sys.path.remove('some_basepath')
 
     loader_mock.find_and_load_step_definitions()
     loader_mock.find_feature_files().AndReturn(['some_basepath/foo.feature'])
-    lettuce.Feature.from_file('some_basepath/foo.feature'). \
+    lettuce.core.Feature.from_file('some_basepath/foo.feature'). \
         AndReturn(Feature.from_string(FEATURE2))
 
     mox.ReplayAll()